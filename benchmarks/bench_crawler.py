@@ -0,0 +1,127 @@
+"""
+DataGetter压测：在本地模拟服务器上运行DataGetter，统计吞吐量和延迟分布
+
+用法:
+    python benchmarks/bench_crawler.py --requests 2000 --concurrency 16 --latency 0.02 --throttle_rate 0.02
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from data_getter import DataGetter
+from mock_server import MockDouyinServer
+
+# 各类请求在压测中的占比
+WORKLOAD = [
+    ('video', 0.5),
+    ('user', 0.2),
+    ('search', 0.1),
+    ('trending', 0.1),
+    ('hashtag', 0.1)
+]
+
+
+def percentile(sorted_values, p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(p * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def build_requests(total: int, id_space: int, seed: int):
+    rng = random.Random(seed)
+    kinds = [kind for kind, _ in WORKLOAD]
+    weights = [weight for _, weight in WORKLOAD]
+    return [(rng.choices(kinds, weights)[0], str(rng.randint(1, id_space)), rng.randint(1, 5))
+            for _ in range(total)]
+
+
+def run_one(data_getter: DataGetter, kind: str, entity_id: str, page: int):
+    start = time.perf_counter()
+    if kind == 'video':
+        result = data_getter.get_video_data(entity_id)
+    elif kind == 'user':
+        result = data_getter.get_user_data(entity_id)
+    elif kind == 'search':
+        result = data_getter.search_videos(f"关键词{entity_id}", page=page)
+    elif kind == 'trending':
+        result = data_getter.get_trending_videos(page=page)
+    else:
+        result = data_getter.get_hashtag_data(f"话题{entity_id}", page=page)
+    return kind, time.perf_counter() - start, bool(result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='DataGetter压测')
+    parser.add_argument('--requests', type=int, default=1000, help='请求总数')
+    parser.add_argument('--concurrency', type=int, default=8, help='并发线程数')
+    parser.add_argument('--id_space', type=int, default=10000, help='视频/用户ID的取值范围，越小缓存命中越多')
+    parser.add_argument('--latency', type=float, default=0.01, help='模拟服务器基础延迟（秒）')
+    parser.add_argument('--latency_jitter', type=float, default=0.01, help='模拟服务器随机延迟上限（秒）')
+    parser.add_argument('--error_rate', type=float, default=0.0, help='模拟服务器返回500的概率')
+    parser.add_argument('--throttle_rate', type=float, default=0.0, help='模拟服务器返回429的概率')
+    parser.add_argument('--fixtures', type=str, default=None, help='录制的响应目录')
+    parser.add_argument('--cache', action='store_true', help='启用响应缓存')
+    parser.add_argument('--parser_backend', type=str, default='auto', help='HTML解析后端')
+    parser.add_argument('--seed', type=int, default=42, help='随机种子')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench_crawler_')
+    server = MockDouyinServer(
+        latency=args.latency, latency_jitter=args.latency_jitter, error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate, retry_after=0, fixtures_dir=args.fixtures, seed=args.seed
+    )
+    with server:
+        config = {
+            'base_url': server.url,
+            'video_base_url': server.url,
+            'timeout': 10,
+            'max_retries': 3,
+            'retry_backoff': 0.05,
+            'parser_backend': args.parser_backend,
+            'rate_limit': {
+                'initial_rate': 50,
+                'max_rate': 5000,
+                'initial_concurrency': args.concurrency,
+                'max_concurrency': args.concurrency
+            }
+        }
+        if args.cache:
+            config['cache'] = {'path': os.path.join(workdir, 'cache')}
+        config_path = os.path.join(workdir, 'data_getter_config.json')
+        with open(config_path, 'w', encoding='utf-8') as f:
+            json.dump(config, f)
+
+        data_getter = DataGetter(config_path)
+        workload = build_requests(args.requests, args.id_space, args.seed)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            results = list(executor.map(lambda item: run_one(data_getter, *item), workload))
+        elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for _, latency, _ in results)
+    failures = sum(1 for _, _, ok in results if not ok)
+    print(f"请求数: {len(results)}, 失败: {failures}, 耗时: {elapsed:.2f} 秒")
+    print(f"吞吐量: {len(results) / elapsed:.1f} 请求/秒")
+    print(f"延迟: p50 {percentile(latencies, 0.5) * 1000:.1f} 毫秒, "
+          f"p99 {percentile(latencies, 0.99) * 1000:.1f} 毫秒, 最大 {latencies[-1] * 1000:.1f} 毫秒")
+    for kind, _ in WORKLOAD:
+        kind_latencies = sorted(latency for k, latency, _ in results if k == kind)
+        if kind_latencies:
+            print(f"  {kind:>8}: {len(kind_latencies):6d} 次, p50 {percentile(kind_latencies, 0.5) * 1000:.1f} 毫秒, "
+                  f"p99 {percentile(kind_latencies, 0.99) * 1000:.1f} 毫秒")
+    print(f"模拟服务器: {server.stats()}")
+    print(f"DataGetter: {json.dumps(data_getter.get_stats(), ensure_ascii=False)}")
+
+
+if __name__ == "__main__":
+    main()
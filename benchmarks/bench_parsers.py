@@ -0,0 +1,91 @@
+"""
+HTML解析后端基准测试
+
+用法:
+    python benchmarks/bench_parsers.py --pages saved_pages/ --repeat 200
+
+saved_pages目录下的文件按文件名前缀区分页面类型（video_*.html, user_*.html），
+不指定--pages时使用生成的示例页面。
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from html_parser import VIDEO_PAGE_SPEC, USER_PAGE_SPEC, BACKENDS, available_backends
+
+SPECS = {
+    'video': VIDEO_PAGE_SPEC,
+    'user': USER_PAGE_SPEC
+}
+
+
+def synthetic_pages(padding: int = 2000):
+    """
+    生成目标字段前后都有大量无关节点的示例页面，模拟真实页面的体积
+    """
+    filler = ''.join(f'<div class="item"><a href="/v/{i}">推荐视频 {i}</a><span>{i}</span></div>'
+                     for i in range(padding))
+    video = ('<!DOCTYPE html><html><head><meta charset="utf-8"><title>示例视频</title>'
+             '<meta name="author" content="示例作者"></head><body>'
+             f'{filler}<div class="player"><span id="like-count">12,345</span><span id="comment-count">678</span>'
+             f'<span id="share-count">90</span></div>{filler}</body></html>')
+    user = ('<!DOCTYPE html><html><head><title>示例用户</title></head><body>'
+            f'{filler}<div class="profile-follow-info"><span>100,000</span><span>500</span></div>'
+            f'<div class="profile-video-info"><span>50</span></div>{filler}</body></html>')
+    return [('video', 'synthetic_video', video), ('user', 'synthetic_user', user)]
+
+
+def load_pages(pages_dir: str):
+    pages = []
+    for path in sorted(glob.glob(os.path.join(pages_dir, '*.html'))):
+        page_type = os.path.basename(path).split('_', 1)[0]
+        if page_type not in SPECS:
+            continue
+        with open(path, 'r', encoding='utf-8') as f:
+            pages.append((page_type, os.path.basename(path), f.read()))
+    return pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description='HTML解析后端基准测试')
+    parser.add_argument('--pages', type=str, default=None, help='保存的页面目录')
+    parser.add_argument('--repeat', type=int, default=100, help='每个页面的解析次数')
+    parser.add_argument('--backends', type=str, default=None, help='逗号分隔的后端列表，默认测试所有已安装的后端')
+    args = parser.parse_args()
+
+    pages = load_pages(args.pages) if args.pages else synthetic_pages()
+    if not pages:
+        print(f"{args.pages} 下没有可用的页面文件")
+        return
+
+    names = args.backends.split(',') if args.backends else available_backends()
+    total_bytes = sum(len(html.encode('utf-8')) for _, _, html in pages)
+    print(f"页面数: {len(pages)}, 总大小: {total_bytes / 1024:.1f} KB, 每页重复: {args.repeat}")
+
+    reference = None
+    for name in names:
+        backend = BACKENDS[name]()
+        results = [backend.extract(html, SPECS[page_type]) for page_type, _, html in pages]
+        if reference is None:
+            reference = results
+        elif results != reference:
+            print(f"警告: {name} 的抽取结果与 {names[0]} 不一致")
+
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            for page_type, _, html in pages:
+                backend.extract(html, SPECS[page_type])
+        elapsed = time.perf_counter() - start
+        parsed = args.repeat * len(pages)
+        print(f"{name:>10}: {parsed / elapsed:10.1f} 页/秒, "
+              f"{total_bytes * args.repeat / elapsed / 1024 / 1024:8.2f} MB/秒, "
+              f"平均 {elapsed / parsed * 1000:.3f} 毫秒/页")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+存储后端对比：在同一批合成记录上比较各StorageBase实现的逐条写入、批量写入和查询耗时
+
+用法:
+    python benchmarks/bench_storage.py --records 5000 --batch_size 500
+    python benchmarks/bench_storage.py --backends sqlite,mysql,mongodb \
+        --mysql_config config/mysql.json --mongodb_config config/mongodb.json
+
+MySQL和MongoDB需要可连接的服务，连接失败的后端会被跳过。
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from storage import StorageFactory
+
+
+def build_records(total: int, seed: int, prefix: str):
+    rng = random.Random(seed)
+    return [{
+        'id': f'{prefix}{index}',
+        'title': f'示例视频标题 {index}',
+        'author': f'作者{rng.randint(1, 200)}',
+        'view_count': rng.randint(0, 1000000),
+        'like_count': rng.randint(0, 100000),
+        'comment_count': rng.randint(0, 10000),
+        'created_at': f'2025-02-{rng.randint(1, 28):02d} {rng.randint(0, 23):02d}:00:00',
+        'username': f'用户{index}',
+        'follower_count': rng.randint(0, 5000000),
+        'following_count': rng.randint(0, 2000),
+        'video_count': rng.randint(0, 3000),
+        'description': '示例描述'
+    } for index in range(total)]
+
+
+def load_config(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def run_backend(name: str, config, records, batch_size: int, single_count: int):
+    storage = StorageFactory.create_storage(name, config)
+    storage.connect()
+    storage.create_tables()
+
+    # 逐条写入：每条记录一次往返和一次提交
+    single = records[:single_count]
+    start = time.perf_counter()
+    for record in single:
+        storage.store_data(record)
+    single_elapsed = time.perf_counter() - start
+
+    # 批量写入：每batch_size条记录一次往返和一次提交
+    batched = records[single_count:]
+    start = time.perf_counter()
+    for offset in range(0, len(batched), batch_size):
+        storage.store_many(batched[offset:offset + batch_size])
+    batch_elapsed = time.perf_counter() - start
+
+    if name == 'mongodb':
+        query = {'view_count': {'$gt': 500000}}
+    else:
+        query = "SELECT id, title, view_count FROM videos WHERE view_count > 500000"
+    start = time.perf_counter()
+    result = storage.retrieve_data(query)
+    query_elapsed = time.perf_counter() - start
+    rows = len(result['videos']) if isinstance(result, dict) else len(result)
+
+    if hasattr(storage, 'close'):
+        storage.close()
+    return {
+        'single_per_second': len(single) / single_elapsed if single_elapsed else 0.0,
+        'batch_per_second': len(batched) / batch_elapsed if batch_elapsed else 0.0,
+        'query_ms': query_elapsed * 1000,
+        'query_rows': rows
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='存储后端对比')
+    parser.add_argument('--backends', type=str, default='sqlite', help='逗号分隔：sqlite,mysql,mongodb')
+    parser.add_argument('--records', type=int, default=5000, help='每个后端写入的记录数')
+    parser.add_argument('--single', type=int, default=500, help='其中逐条写入的记录数')
+    parser.add_argument('--batch_size', type=int, default=500, help='批量写入每批记录数')
+    parser.add_argument('--mysql_config', type=str, default=None, help='MySQL配置文件')
+    parser.add_argument('--mongodb_config', type=str, default=None, help='MongoDB配置文件')
+    parser.add_argument('--sqlite_path', type=str, default=None, help='SQLite数据库文件，默认使用临时目录')
+    parser.add_argument('--seed', type=int, default=42, help='随机种子')
+    args = parser.parse_args()
+
+    logging.getLogger('storage').setLevel(logging.WARNING)
+    # 每次运行使用不同的id前缀，避免与已有数据的主键冲突
+    records = build_records(args.records, args.seed, prefix=f'bench{int(time.time())}_')
+    configs = {
+        'sqlite': {
+            'database': args.sqlite_path or os.path.join(tempfile.mkdtemp(prefix='bench_storage_'), 'douyin.sqlite'),
+            'batch_size': args.batch_size
+        },
+        'mysql': load_config(args.mysql_config) if args.mysql_config else None,
+        'mongodb': load_config(args.mongodb_config) if args.mongodb_config else None
+    }
+
+    print(f"记录数: {args.records}（逐条 {args.single}，批量 {args.records - args.single}，每批 {args.batch_size}）")
+    for name in args.backends.split(','):
+        name = name.strip()
+        if configs.get(name) is None:
+            print(f"  {name:>8}: 跳过，未提供配置")
+            continue
+        try:
+            result = run_backend(name, configs[name], records, args.batch_size, args.single)
+        except Exception as e:
+            print(f"  {name:>8}: 跳过，{str(e)}")
+            continue
+        print(f"  {name:>8}: 逐条写入 {result['single_per_second']:.0f} 条/秒, "
+              f"批量写入 {result['batch_per_second']:.0f} 条/秒, "
+              f"查询 {result['query_ms']:.1f} 毫秒（{result['query_rows']} 行）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+from pymongo import ASCENDING, UpdateOne
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+
+class _Owner:
+    """
+    同一次add_many加入的行：全部写入后调用on_written，其中任意一行被放弃时调用一次on_failed
+    """
+    __slots__ = ('remaining', 'on_written', 'on_failed', 'failed')
+
+    def __init__(self, rows: int, on_written: Optional[Callable[[], None]],
+                 on_failed: Optional[Callable[[Exception], None]]):
+        self.remaining = rows
+        self.on_written = on_written
+        self.on_failed = on_failed
+        self.failed = False
+
+
+class BufferedWriter:
+    def __init__(self, max_rows: int = 500, max_delay: float = 2.0, auto_flush: bool = True,
+                 max_retries: int = 3, dead_letter_path: Optional[str] = None):
+        """
+        按表缓冲待写入的行，行数或等待时间达到阈值时批量写入
+        写入失败的批次放回缓冲稍后重试；同一张表连续失败max_retries次后（以及关闭时的最后一次写入失败时）
+        把批次二分后分别重试，找出单独也无法写入的行并放弃，其余行正常写入，一行坏数据不会一直阻塞整张表
+        :param max_rows: 单表缓冲的行数阈值
+        :param max_delay: 缓冲中最早一行的最长等待时间（秒）
+        :param auto_flush: 是否启动后台线程按时间阈值刷新
+        :param max_retries: 整批重试的次数，超过后拆分批次
+        :param dead_letter_path: 放弃的行追加到这个JSONL文件（有on_failed回调的行交给回调处理）；为None时只记录日志
+        """
+        self.max_rows = max_rows
+        self.max_delay = max_delay
+        self.max_retries = max_retries
+        self.dead_letter_path = dead_letter_path
+        self.buffers: Dict[str, List[Any]] = {}
+        # 与缓冲中的行一一对应的_Owner（没有回调的行为None）
+        self.owners: Dict[str, List[Optional[_Owner]]] = {}
+        self.first_added: Dict[str, float] = {}
+        # 各表连续写入失败的次数
+        self.failures: Dict[str, int] = {}
+        self.lock = threading.Lock()
+        self.dead_letter_lock = threading.Lock()
+
+        self.rows_written = 0
+        self.flushes = 0
+        self.flush_time = 0.0
+        self.max_flush_latency = 0.0
+        self.errors = 0
+        self.dead_lettered = 0
+        self.started_at = time.monotonic()
+
+        self.closed = threading.Event()
+        self.flusher = None
+        if auto_flush and max_delay > 0:
+            self.flusher = threading.Thread(target=self._flush_loop, name='batch-writer', daemon=True)
+            self.flusher.start()
+
+    def _write(self, table: str, rows: List[Any]):
+        """
+        子类实现：把一批行写入存储，失败时抛出异常
+        """
+        raise NotImplementedError
+
+    def add(self, table: str, row: Any, on_written: Optional[Callable[[], None]] = None,
+            on_failed: Optional[Callable[[Exception], None]] = None):
+        self.add_many(table, [row], on_written, on_failed)
+
+    def add_many(self, table: str, rows: Sequence[Any], on_written: Optional[Callable[[], None]] = None,
+                 on_failed: Optional[Callable[[Exception], None]] = None):
+        """
+        :param on_written: 这些行全部写入成功后调用；写入失败时随行放回缓冲，重试成功后再调用
+        :param on_failed: 其中有行被放弃时以最后的异常调用一次，调用方可以转存这些数据；此时这些行不写入死信文件
+        """
+        if not rows:
+            if on_written is not None:
+                self._notify(table, [on_written])
+            return
+        owner = _Owner(len(rows), on_written, on_failed) if on_written or on_failed else None
+        with self.lock:
+            buffer = self.buffers.setdefault(table, [])
+            if not buffer:
+                self.first_added[table] = time.monotonic()
+            buffer.extend(rows)
+            self.owners.setdefault(table, []).extend([owner] * len(rows))
+            full = len(buffer) >= self.max_rows
+        if full:
+            try:
+                self.flush(table)
+            except Exception as e:
+                # 行已经放回缓冲，由定时刷新继续重试，不把写入失败报告给本次调用方
+                logger.error(f"批量写入 {table} 失败，将在下次刷新时重试: {str(e)}")
+
+    def write_now(self, table: str, rows: List[Any], on_written: Optional[Callable[[], None]] = None):
+        """
+        不经过缓冲直接批量写入
+        """
+        if rows:
+            self._timed_write(table, rows)
+        if on_written is not None:
+            self._notify(table, [on_written])
+
+    @staticmethod
+    def _notify(table: str, callbacks: List[Callable[[], None]]):
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                # 回调失败不影响其他回调，也不使写入被重试
+                logger.error(f"{table} 写入后的回调失败: {str(e)}")
+
+    def _timed_write(self, table: str, rows: List[Any]):
+        start = time.perf_counter()
+        try:
+            self._write(table, rows)
+        except Exception:
+            with self.lock:
+                self.errors += 1
+            raise
+        latency = time.perf_counter() - start
+        with self.lock:
+            self.rows_written += len(rows)
+            self.flushes += 1
+            self.flush_time += latency
+            self.max_flush_latency = max(self.max_flush_latency, latency)
+
+    def flush(self, table: Optional[str] = None):
+        """
+        写入缓冲中的行；写入失败的行放回缓冲并抛出异常，
+        连续失败超过max_retries次或已经关闭时改为拆分批次，放弃无法写入的行后不再抛出异常
+        """
+        with self.lock:
+            tables = [table] if table else list(self.buffers)
+        for name in tables:
+            # 在锁内取走缓冲，写入期间其他线程可以继续追加
+            with self.lock:
+                rows = self.buffers.get(name)
+                if not rows:
+                    continue
+                owners = self.owners.get(name, [])
+                self.buffers[name] = []
+                self.owners[name] = []
+            try:
+                self._timed_write(name, rows)
+            except Exception as e:
+                with self.lock:
+                    failures = self.failures.get(name, 0) + 1
+                    self.failures[name] = failures
+                    if failures <= self.max_retries and not self.closed.is_set():
+                        self.buffers[name] = rows + self.buffers[name]
+                        self.owners[name] = owners + self.owners[name]
+                        self.first_added[name] = time.monotonic()
+                        raise
+                    self.failures[name] = 0
+                logger.warning(f"批量写入 {name} 连续失败 {failures} 次，拆分 {len(rows)} 行查找无法写入的行: {str(e)}")
+                self._split_write(name, rows, owners, e)
+                continue
+            with self.lock:
+                self.failures[name] = 0
+            self._written(name, owners)
+
+    def _split_write(self, table: str, rows: List[Any], owners: List[Optional[_Owner]], error: Exception):
+        """
+        二分写入整批失败的行，单独一行仍然失败时放弃这一行
+        """
+        if len(rows) == 1:
+            self._give_up(table, rows[0], owners[0], error)
+            return
+        middle = len(rows) // 2
+        for part_rows, part_owners in ((rows[:middle], owners[:middle]), (rows[middle:], owners[middle:])):
+            try:
+                self._timed_write(table, part_rows)
+            except Exception as e:
+                self._split_write(table, part_rows, part_owners, e)
+            else:
+                self._written(table, part_owners)
+
+    def _written(self, table: str, owners: List[Optional[_Owner]]):
+        callbacks = []
+        with self.lock:
+            for owner in owners:
+                if owner is None:
+                    continue
+                owner.remaining -= 1
+                if owner.remaining == 0 and not owner.failed and owner.on_written is not None:
+                    callbacks.append(owner.on_written)
+        self._notify(table, callbacks)
+
+    def _give_up(self, table: str, row: Any, owner: Optional[_Owner], error: Exception):
+        with self.lock:
+            self.errors += 1
+            self.dead_lettered += 1
+            first_failure = owner is not None and not owner.failed
+            if owner is not None:
+                owner.failed = True
+        if owner is not None and owner.on_failed is not None:
+            logger.error(f"放弃写入 {table} 的一行，交给调用方处理: {str(error)}")
+            if first_failure:
+                self._notify(table, [functools.partial(owner.on_failed, error)])
+            return
+        if self.dead_letter_path is None:
+            logger.error(f"放弃写入 {table} 的一行: {str(error)}，内容: {row!r}")
+            return
+        line = json.dumps({'table': table, 'row': row, 'error': str(error), 'time': time.time()},
+                          ensure_ascii=False, default=str)
+        with self.dead_letter_lock:
+            directory = os.path.dirname(self.dead_letter_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.dead_letter_path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+        logger.error(f"放弃写入 {table} 的一行，已写入死信文件 {self.dead_letter_path}: {str(error)}")
+
+    def _flush_loop(self):
+        while not self.closed.wait(min(self.max_delay, 1.0)):
+            now = time.monotonic()
+            with self.lock:
+                due = [name for name, rows in self.buffers.items()
+                       if rows and now - self.first_added.get(name, now) >= self.max_delay]
+            for name in due:
+                try:
+                    self.flush(name)
+                except Exception as e:
+                    logger.error(f"定时批量写入 {name} 失败，将在下次刷新时重试: {str(e)}")
+
+    def pending_rows(self) -> int:
+        with self.lock:
+            return sum(len(rows) for rows in self.buffers.values())
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            elapsed = time.monotonic() - self.started_at
+            return {
+                'rows_written': self.rows_written,
+                'pending_rows': sum(len(rows) for rows in self.buffers.values()),
+                'flushes': self.flushes,
+                'errors': self.errors,
+                'dead_lettered': self.dead_lettered,
+                'rows_per_second': self.rows_written / elapsed if elapsed > 0 else 0.0,
+                'avg_flush_ms': self.flush_time / self.flushes * 1000 if self.flushes else 0.0,
+                'max_flush_ms': self.max_flush_latency * 1000
+            }
+
+    def close(self):
+        self.closed.set()
+        if self.flusher:
+            self.flusher.join()
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class MySQLBatchWriter(BufferedWriter):
+    def __init__(self, connection_provider: Callable, tables: Dict[str, Sequence[str]], **kwargs):
+        """
+        MySQL批量写入，每批行通过executemany合并为一条多行INSERT并只提交一次
+        :param connection_provider: 返回上下文管理器的函数，上下文中得到可用的连接
+        :param tables: 表名 -> 列名列表
+        """
+        self.connection_provider = connection_provider
+        self.statements = {
+            table: f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+            for table, columns in tables.items()
+        }
+        super().__init__(**kwargs)
+
+    def _write(self, table: str, rows: List[tuple]):
+        with self.connection_provider() as connection:
+            cursor = connection.cursor()
+            try:
+                cursor.executemany(self.statements[table], rows)
+                connection.commit()
+            except Exception:
+                connection.rollback()
+                raise
+            finally:
+                cursor.close()
+
+
+class MongoBulkWriter(BufferedWriter):
+    def __init__(self, db, keys: Dict[str, Sequence[str]], **kwargs):
+        """
+        MongoDB批量写入，每批文档按主键合并为一次无序bulk_write的UpdateOne(upsert=True)，
+        重复写入同一对象时更新已有文档而不是插入新文档
+        :param db: pymongo的Database
+        :param keys: 集合名 -> 主键字段列表
+        """
+        self.db = db
+        self.keys = {collection: list(fields) for collection, fields in keys.items()}
+        super().__init__(**kwargs)
+
+    def ensure_indexes(self):
+        """
+        为每个集合的主键建立唯一索引，使upsert按索引定位文档；
+        已有重复数据时唯一索引无法建立，退回普通索引
+        """
+        for collection, fields in self.keys.items():
+            index = [(field, ASCENDING) for field in fields]
+            try:
+                self.db[collection].create_index(index, unique=True)
+            except OperationFailure as e:
+                logger.warning(f"集合 {collection} 存在重复数据，无法建立唯一索引: {str(e)}")
+                self.db[collection].create_index(index)
+
+    def _write(self, collection: str, documents: List[Dict]):
+        fields = self.keys[collection]
+        # 同一批中主键相同的文档按先后顺序合并，与依次执行$set的结果一致；
+        # 无序写入时同一主键的多个upsert可能并发插入，合并后每个主键只有一个操作
+        merged: Dict[tuple, Dict] = {}
+        for document in documents:
+            key = tuple(document.get(field) for field in fields)
+            merged.setdefault(key, {}).update(
+                (name, value) for name, value in document.items() if name != '_id'
+            )
+        operations = [
+            UpdateOne(dict(zip(fields, key)), {'$set': document}, upsert=True)
+            for key, document in merged.items()
+        ]
+        self.db[collection].bulk_write(operations, ordered=False)
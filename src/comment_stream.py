@@ -0,0 +1,152 @@
+import argparse
+import csv
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterator, List, Optional
+import data
+
+logger = logging.getLogger(__name__)
+
+COMMENT_COLUMNS = ['cid', 'video_id', 'user', 'text', 'likes', 'create_time']
+
+
+def clean_comment(video_id: str, comment: Dict) -> Dict:
+    """
+    清洗单条评论：去除首尾空白，点赞数转换为非负整数
+    """
+    try:
+        likes = max(int(comment.get('likes') or 0), 0)
+    except (TypeError, ValueError):
+        likes = 0
+    return {
+        'cid': comment.get('cid'),
+        'video_id': video_id,
+        'user': (comment.get('user') or '').strip(),
+        'text': (comment.get('text') or '').strip(),
+        'likes': likes,
+        'create_time': comment.get('create_time')
+    }
+
+
+class CommentStreamIngestor:
+    def __init__(self, output_dir: str = 'data/comments', page_size: int = 50):
+        """
+        评论流式采集：沿游标逐页拉取评论，每页清洗后追加写入该视频的CSV文件，
+        并记录每个视频的游标，再次采集时从上次的游标继续，只拉取新增评论
+        :param output_dir: 评论CSV和游标数据库所在目录
+        :param page_size: 每页评论数
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        self.output_dir = output_dir
+        self.page_size = page_size
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(os.path.join(output_dir, 'cursors.sqlite'), check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS comment_cursors (
+                video_id TEXT PRIMARY KEY,
+                cursor INTEGER,
+                total INTEGER DEFAULT 0,
+                updated_at REAL
+            )
+        """)
+        self.conn.commit()
+
+    def file_path(self, video_id: str) -> str:
+        return os.path.join(self.output_dir, f'comments_{video_id}.csv')
+
+    def get_cursor(self, video_id: str):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT cursor FROM comment_cursors WHERE video_id = ?", (video_id,)
+            ).fetchone()
+        # 旧版本以TEXT保存游标，读取时统一转换为整数，与接口返回的游标比较时类型一致
+        return int(row[0]) if row and row[0] is not None else 0
+
+    def _save_cursor(self, video_id: str, cursor, added: int):
+        with self.lock:
+            self.conn.execute("""
+                INSERT INTO comment_cursors (video_id, cursor, total, updated_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT(video_id) DO UPDATE SET
+                    cursor = excluded.cursor,
+                    total = total + excluded.total,
+                    updated_at = excluded.updated_at
+            """, (video_id, int(cursor), added, time.time()))
+            self.conn.commit()
+
+    def _append(self, video_id: str, rows: List[Dict]):
+        path = self.file_path(video_id)
+        write_header = not os.path.exists(path) or os.path.getsize(path) == 0
+        with open(path, 'a', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=COMMENT_COLUMNS)
+            if write_header:
+                writer.writeheader()
+            writer.writerows(rows)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def stream(self, video_id: str, session=None, max_pages: Optional[int] = None) -> Iterator[List[Dict]]:
+        """
+        从上次的游标开始逐页产出清洗后的评论，每页先写入文件再推进游标，
+        中断后重新采集最多重复最后一页
+        """
+        cursor = self.get_cursor(video_id)
+        pages = data.iter_comments_data(video_id, cursor=cursor, count=self.page_size, session=session)
+        for page_number, (comments, next_cursor) in enumerate(pages, 1):
+            seen = set()
+            rows = []
+            for comment in comments:
+                row = clean_comment(video_id, comment)
+                if row['cid'] in seen:
+                    continue
+                seen.add(row['cid'])
+                rows.append(row)
+            if rows:
+                self._append(video_id, rows)
+            self._save_cursor(video_id, next_cursor, len(rows))
+            yield rows
+            if max_pages and page_number >= max_pages:
+                return
+
+    def ingest(self, video_id: str, session=None, max_pages: Optional[int] = None) -> int:
+        """
+        采集指定视频的新增评论
+        :return: 本次新写入的评论数
+        """
+        added = 0
+        for rows in self.stream(video_id, session=session, max_pages=max_pages):
+            added += len(rows)
+        logger.info(f"视频 {video_id} 新增评论 {added} 条，当前游标 {self.get_cursor(video_id)}")
+        return added
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='抖音评论流式采集')
+    parser.add_argument('video_ids', nargs='+', help='视频ID')
+    parser.add_argument('--output_dir', type=str, default='data/comments', help='评论输出目录')
+    parser.add_argument('--page_size', type=int, default=50, help='每页评论数')
+    parser.add_argument('--max_pages', type=int, default=None, help='每个视频最多拉取的页数')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    ingestor = CommentStreamIngestor(args.output_dir, page_size=args.page_size)
+    session = data.create_session()
+    try:
+        for video_id in args.video_ids:
+            try:
+                ingestor.ingest(video_id, session=session, max_pages=args.max_pages)
+            except Exception as e:
+                logger.error(f"采集视频 {video_id} 的评论失败: {str(e)}")
+    finally:
+        session.close()
+        ingestor.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+import argparse
+import json
+import logging
+
+from storage import MySQLStorage
+
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='压缩MySQL时序快照：原始快照汇总为小时数据，小时数据汇总为天数据')
+    parser.add_argument('config', help='MySQL配置文件（JSON，包含host/user/password/database）')
+    parser.add_argument('--raw_days', type=int, default=7, help='原始快照保留天数')
+    parser.add_argument('--hourly_days', type=int, default=90, help='小时汇总保留天数')
+    parser.add_argument('--partitions_ahead', type=int, default=7, help='提前创建的日期分区天数')
+    args = parser.parse_args()
+
+    with open(args.config, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+
+    storage = MySQLStorage(config)
+    storage.connect()
+    try:
+        storage.create_tables()
+        storage.ensure_partitions(args.partitions_ahead)
+        result = storage.compact_snapshots(args.raw_days, args.hourly_days)
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+    finally:
+        storage.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+import hashlib
+import json
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    def __init__(self, capacity: int = 1000000, error_rate: float = 0.001,
+                 bits: Optional[bytearray] = None, created_at: Optional[float] = None):
+        """
+        布隆过滤器，用固定大小的位数组记录已出现的键，存在极小的误判率但不会漏判
+        :param capacity: 预期元素数量
+        :param error_rate: 达到预期数量时的误判率
+        """
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, int(round(self.num_bits / capacity * math.log(2))))
+        self.bits = bits if bits is not None else bytearray((self.num_bits + 7) // 8)
+        self.created_at = created_at if created_at is not None else time.time()
+        self.count = 0
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, key: str):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def to_bytes(self) -> bytes:
+        header = json.dumps({
+            'capacity': self.capacity,
+            'error_rate': self.error_rate,
+            'created_at': self.created_at,
+            'count': self.count
+        }).encode('utf-8')
+        return header + b'\n' + bytes(self.bits)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'BloomFilter':
+        header, bits = data.split(b'\n', 1)
+        meta = json.loads(header)
+        bloom = cls(meta['capacity'], meta['error_rate'], bytearray(bits), meta['created_at'])
+        bloom.count = meta['count']
+        return bloom
+
+
+class SeenFilter:
+    def __init__(self, path: str, ttl: float = 24 * 3600, capacity: int = 1000000, error_rate: float = 0.001):
+        """
+        带有效期的"已抓取"过滤器
+        使用新旧两代布隆过滤器，当前代创建超过ttl后轮换，旧代丢弃，
+        因此记录至少保留ttl、最多保留2*ttl
+        """
+        self.path = path
+        self.ttl = ttl
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.generations: List[BloomFilter] = []
+        self._load()
+        if not self.generations:
+            self.generations = [BloomFilter(capacity, error_rate)]
+
+    def _load(self):
+        for index in range(2):
+            file_path = f'{self.path}.{index}'
+            if not os.path.exists(file_path):
+                continue
+            try:
+                with open(file_path, 'rb') as f:
+                    self.generations.append(BloomFilter.from_bytes(f.read()))
+            except (OSError, ValueError) as e:
+                logger.error(f"加载已抓取过滤器失败，将重新开始记录: {str(e)}")
+                self.generations = []
+                return
+        self._rotate()
+
+    def _rotate(self):
+        now = time.time()
+        self.generations = [bloom for bloom in self.generations if now - bloom.created_at < 2 * self.ttl]
+        if not self.generations or now - self.generations[0].created_at >= self.ttl:
+            self.generations.insert(0, BloomFilter(self.capacity, self.error_rate))
+        del self.generations[2:]
+
+    def add(self, key: str):
+        self._rotate()
+        self.generations[0].add(key)
+
+    def __contains__(self, key: str) -> bool:
+        return any(key in bloom for bloom in self.generations)
+
+    def save(self):
+        for index in range(2):
+            file_path = f'{self.path}.{index}'
+            if index >= len(self.generations):
+                if os.path.exists(file_path):
+                    os.remove(file_path)
+                continue
+            tmp_path = f'{file_path}.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(self.generations[index].to_bytes())
+            os.replace(tmp_path, file_path)
+
+
+class CrawlState:
+    def __init__(self, state_dir: str = 'data/crawl_state', seen_ttl: float = 24 * 3600,
+                 max_attempts: int = 3, seen_capacity: int = 1000000, save_interval: int = 100):
+        """
+        可断点续抓的抓取状态
+        持久化的待抓取队列保存在SQLite中，已抓取的ID记录在带有效期的布隆过滤器中
+        :param seen_ttl: 抓取成功后在多长时间内（秒）不再重复抓取
+        :param max_attempts: 单个ID最多失败次数，超过后移出队列
+        :param save_interval: 每标记多少个完成的ID保存一次过滤器，异常退出时最多重复抓取这么多个ID
+        """
+        os.makedirs(state_dir, exist_ok=True)
+        self.state_dir = state_dir
+        self.max_attempts = max_attempts
+        self.save_interval = save_interval
+        self.lock = threading.Lock()
+
+        self.conn = sqlite3.connect(os.path.join(state_dir, 'frontier.sqlite'), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS frontier (
+                kind TEXT,
+                entity_id TEXT,
+                attempts INTEGER DEFAULT 0,
+                added_at REAL,
+                PRIMARY KEY (kind, entity_id)
+            )
+        """)
+        self.conn.commit()
+
+        self.seen = SeenFilter(os.path.join(state_dir, 'seen.bloom'), ttl=seen_ttl, capacity=seen_capacity)
+        self.unsaved = 0
+        self.skipped = 0
+        self.completed = 0
+
+    @staticmethod
+    def _key(kind: str, entity_id: str) -> str:
+        return f'{kind}:{entity_id}'
+
+    def is_seen(self, kind: str, entity_id: str) -> bool:
+        with self.lock:
+            return self._key(kind, entity_id) in self.seen
+
+    def add_many(self, kind: str, entity_ids: Iterable[str]) -> int:
+        """
+        把发现的ID加入待抓取队列，有效期内已抓取过或已在队列中的ID被跳过
+        :return: 新加入队列的数量
+        """
+        added = 0
+        now = time.time()
+        with self.lock:
+            for entity_id in entity_ids:
+                if not entity_id:
+                    continue
+                if self._key(kind, entity_id) in self.seen:
+                    self.skipped += 1
+                    continue
+                cursor = self.conn.execute(
+                    "INSERT OR IGNORE INTO frontier (kind, entity_id, added_at) VALUES (?, ?, ?)",
+                    (kind, str(entity_id), now)
+                )
+                added += cursor.rowcount
+            self.conn.commit()
+        return added
+
+    def should_fetch(self, kind: str, entity_id: str) -> bool:
+        """
+        有效期内抓取过的ID返回False，否则确保其在队列中并返回True
+        """
+        self.add_many(kind, [entity_id])
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT 1 FROM frontier WHERE kind = ? AND entity_id = ?", (kind, str(entity_id))
+            ).fetchone()
+        return row is not None
+
+    def pending(self, kind: Optional[str] = None, limit: Optional[int] = None) -> List[Tuple[str, str]]:
+        """
+        按加入顺序返回待抓取的 (类型, ID)
+        """
+        sql = "SELECT kind, entity_id FROM frontier"
+        params: list = []
+        if kind:
+            sql += " WHERE kind = ?"
+            params.append(kind)
+        sql += " ORDER BY added_at, rowid"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def mark_done(self, kind: str, entity_id: str):
+        with self.lock:
+            self.conn.execute("DELETE FROM frontier WHERE kind = ? AND entity_id = ?", (kind, str(entity_id)))
+            self.conn.commit()
+            self.seen.add(self._key(kind, entity_id))
+            self.completed += 1
+            self.unsaved += 1
+            if self.unsaved >= self.save_interval:
+                self.seen.save()
+                self.unsaved = 0
+
+    def mark_failed(self, kind: str, entity_id: str):
+        with self.lock:
+            self.conn.execute(
+                "UPDATE frontier SET attempts = attempts + 1 WHERE kind = ? AND entity_id = ?",
+                (kind, str(entity_id))
+            )
+            cursor = self.conn.execute(
+                "DELETE FROM frontier WHERE kind = ? AND entity_id = ? AND attempts >= ?",
+                (kind, str(entity_id), self.max_attempts)
+            )
+            if cursor.rowcount:
+                logger.warning(f"{kind} {entity_id} 连续失败 {self.max_attempts} 次，已移出待抓取队列")
+            self.conn.commit()
+
+    def stats(self) -> Dict:
+        with self.lock:
+            rows = self.conn.execute("SELECT kind, COUNT(*) FROM frontier GROUP BY kind").fetchall()
+            return {
+                'pending': dict(rows),
+                'completed': self.completed,
+                'skipped': self.skipped
+            }
+
+    def close(self):
+        with self.lock:
+            self.seen.save()
+            self.unsaved = 0
+            self.conn.close()
@@ -0,0 +1,226 @@
+import functools
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import Dict, Iterable, Optional, Tuple
+from html_parser import parse_page
+
+logger = logging.getLogger(__name__)
+
+
+class ConcurrentCrawler:
+    def __init__(self, data_getter, data_storage, max_workers: int = 8, crawl_state=None):
+        """
+        并发抓取视频详情
+        :param data_getter: DataGetter实例
+        :param data_storage: DataStorage实例
+        :param max_workers: 并发抓取的最大线程数
+        :param crawl_state: CrawlState实例，提供时记录每个视频的抓取结果以便断点续抓
+        """
+        if max_workers < 1:
+            raise ValueError("max_workers必须大于0")
+        self.data_getter = data_getter
+        self.data_storage = data_storage
+        self.max_workers = max_workers
+        self.crawl_state = crawl_state
+
+    def _fetch_video(self, video_id: str) -> Dict:
+        try:
+            return self.data_getter.get_video_data(video_id)
+        except Exception as e:
+            # get_video_data只处理网络异常，页面结构变化导致的解析异常在这里兜底
+            logger.error(f"抓取视频 {video_id} 失败: {str(e)}")
+            return {}
+
+    def _mark(self, video_id: str, success: bool):
+        if self.crawl_state is None:
+            return
+        if success:
+            self.crawl_state.mark_done('video', video_id)
+        else:
+            self.crawl_state.mark_failed('video', video_id)
+
+    def crawl_videos(self, video_ids: Iterable[str]) -> Dict:
+        """
+        并发抓取视频详情并保存
+        抓取线程池并行请求详情页，存储使用单独的单线程池（存储连接不是线程安全的），
+        抓取完成的视频立即交给存储线程，使抓取和存储互相重叠
+        :return: 抓取统计信息
+        """
+        stats = {'total': 0, 'fetched': 0, 'saved': 0, 'failed': 0}
+        start = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='fetch') as fetch_pool, \
+                ThreadPoolExecutor(max_workers=1, thread_name_prefix='store') as store_pool:
+            fetch_futures = {}
+            for video_id in video_ids:
+                fetch_futures[fetch_pool.submit(self._fetch_video, video_id)] = video_id
+            stats['total'] = len(fetch_futures)
+
+            store_futures = {}
+            for future in as_completed(fetch_futures):
+                video_id = fetch_futures[future]
+                video_data = future.result()
+                if not video_data:
+                    stats['failed'] += 1
+                    self._mark(video_id, False)
+                    continue
+                stats['fetched'] += 1
+                store_futures[store_pool.submit(self.data_storage.save_video_data, video_data)] = video_id
+
+            for future, video_id in store_futures.items():
+                saved = future.result()
+                stats['saved' if saved else 'failed'] += 1
+                self._mark(video_id, saved)
+
+        elapsed = time.perf_counter() - start
+        stats['elapsed'] = elapsed
+        stats['videos_per_second'] = stats['saved'] / elapsed if elapsed > 0 else 0.0
+        return stats
+
+
+class PipelineCrawler:
+    def __init__(self, data_getter, data_storage, io_workers: int = 8, parse_processes: Optional[int] = None,
+                 queue_size: int = 64, crawl_state=None):
+        """
+        下载与解析分离的两级流水线
+        下载线程只负责获取页面内容，解析在进程池中进行，不受GIL限制，解析吞吐量随CPU核数扩展；
+        各级之间通过有界队列衔接，下载快于解析时自动阻塞，内存占用受queue_size限制
+        :param io_workers: 下载线程数
+        :param parse_processes: 解析进程数，默认等于CPU核数
+        :param queue_size: 各级队列的容量
+        """
+        if io_workers < 1:
+            raise ValueError("io_workers必须大于0")
+        self.data_getter = data_getter
+        self.data_storage = data_storage
+        self.io_workers = io_workers
+        self.parse_processes = parse_processes
+        self.queue_size = queue_size
+        self.crawl_state = crawl_state
+
+    def _save(self, kind: str, record: Dict) -> bool:
+        if kind == 'video':
+            return self.data_storage.save_video_data(record)
+        return self.data_storage.save_user_data(record)
+
+    def crawl(self, items: Iterable[Tuple[str, str]]) -> Dict:
+        """
+        抓取并保存一批页面
+        :param items: (类型, ID) 序列，类型为video或user
+        :return: 抓取统计信息
+        """
+        stats = {'total': 0, 'downloaded': 0, 'cached': 0, 'parsed': 0, 'saved': 0, 'failed': 0}
+        id_queue = queue.Queue(maxsize=self.queue_size)
+        raw_queue = queue.Queue(maxsize=self.queue_size)
+        # 结果队列的长度受parse_slots限制，无需再设上限
+        record_queue = queue.Queue()
+        parse_slots = threading.BoundedSemaphore(self.queue_size)
+        start = time.perf_counter()
+
+        def feed():
+            for item in items:
+                stats['total'] += 1
+                id_queue.put(item)
+            for _ in range(self.io_workers):
+                id_queue.put(None)
+
+        def download():
+            while True:
+                item = id_queue.get()
+                if item is None:
+                    raw_queue.put(None)
+                    return
+                kind, entity_id = item
+                try:
+                    page = self.data_getter.download_page(kind, entity_id)
+                except Exception as e:
+                    logger.error(f"下载 {kind} {entity_id} 失败: {str(e)}")
+                    page = {}
+                if not page:
+                    record_queue.put(({'kind': kind, 'id': entity_id}, None, False))
+                    continue
+                raw_queue.put(page)
+
+        def on_parsed(page: Dict, future):
+            try:
+                fields = future.result()
+            except Exception as e:
+                logger.error(f"解析 {page['kind']} {page['id']} 失败: {str(e)}")
+                fields = None
+            record_queue.put((page, fields, True))
+
+        def store():
+            while True:
+                entry = record_queue.get()
+                if entry is None:
+                    return
+                page, result, parsed = entry
+                if parsed:
+                    parse_slots.release()
+                if result is None:
+                    stats['failed'] += 1
+                    self._mark(page['kind'], page['id'], False)
+                    continue
+                if parsed:
+                    stats['parsed'] += 1
+                    record = self.data_getter.finish_page(page, result)
+                else:
+                    stats['cached'] += 1
+                    record = result
+                saved = self._save(page['kind'], record)
+                stats['saved' if saved else 'failed'] += 1
+                self._mark(page['kind'], page['id'], saved)
+
+        threads = [threading.Thread(target=feed, name='pipeline-feed', daemon=True)]
+        threads += [threading.Thread(target=download, name=f'pipeline-io-{index}', daemon=True)
+                    for index in range(self.io_workers)]
+        store_thread = threading.Thread(target=store, name='pipeline-store', daemon=True)
+        for thread in threads + [store_thread]:
+            thread.start()
+
+        # 下载线程已在运行，使用spawn启动解析进程，避免fork复制其他线程持有的锁
+        with ProcessPoolExecutor(max_workers=self.parse_processes,
+                                 mp_context=multiprocessing.get_context('spawn')) as parse_pool:
+            finished = 0
+            while finished < self.io_workers:
+                page = raw_queue.get()
+                if page is None:
+                    finished += 1
+                    continue
+                stats['downloaded'] += 1
+                if 'record' in page:
+                    record_queue.put((page, page['record'], False))
+                    continue
+                parse_slots.acquire()
+                html = page.pop('html')
+                try:
+                    future = parse_pool.submit(parse_page, page['kind'], html, self.data_getter.parser_backend)
+                except Exception as e:
+                    # 进程池损坏（如解析进程被杀死）后提交会失败：释放槽位并记为失败，
+                    # 继续读取下载结果，使下载线程和存储线程正常退出
+                    logger.error(f"提交解析 {page['kind']} {page['id']} 失败: {str(e)}")
+                    parse_slots.release()
+                    record_queue.put((page, None, False))
+                    continue
+                future.add_done_callback(functools.partial(on_parsed, page))
+        # 进程池退出时所有解析任务和回调均已完成
+        record_queue.put(None)
+        for thread in threads + [store_thread]:
+            thread.join()
+
+        elapsed = time.perf_counter() - start
+        stats['elapsed'] = elapsed
+        stats['pages_per_second'] = stats['saved'] / elapsed if elapsed > 0 else 0.0
+        return stats
+
+    def _mark(self, kind: str, entity_id: str, success: bool):
+        if self.crawl_state is None:
+            return
+        if success:
+            self.crawl_state.mark_done(kind, entity_id)
+        else:
+            self.crawl_state.mark_failed(kind, entity_id)
@@ -1,25 +1,99 @@
-import requests
-
-def get_video_data(video_id):
-    url = f"https://api.douyin.com/video/{video_id}"
-    response = requests.get(url)
-    if response.status_code == 200:
-        return response.json()
-    else:
-        raise Exception(f"Failed to get video data: {response.status_code}")
-
-def get_account_data(account_id):
-    url = f"https://api.douyin.com/account/{account_id}"
-    response = requests.get(url)
-    if response.status_code == 200:
-        return response.json()
-    else:
-        raise Exception(f"Failed to get account data: {response.status_code}")
-
-def get_comments_data(video_id):
-    url = f"https://api.douyin.com/video/{video_id}/comments"
-    response = requests.get(url)
-    if response.status_code == 200:
-        return response.json()
-    else:
-        raise Exception(f"Failed to get comments data: {response.status_code}")
+import requests
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from requests.adapters import HTTPAdapter
+
+# 接口地址，可指向本地模拟服务器
+API_BASE_URL = "https://api.douyin.com"
+
+def create_session(pool_size=10):
+    # 共享的长连接会话，连接池大小决定可复用的并发连接数
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+def get_video_data(video_id, session=None):
+    url = f"{API_BASE_URL}/video/{video_id}"
+    response = (session or requests).get(url)
+    if response.status_code == 200:
+        return response.json()
+    else:
+        raise Exception(f"Failed to get video data: {response.status_code}")
+
+def get_account_data(account_id, session=None):
+    url = f"{API_BASE_URL}/account/{account_id}"
+    response = (session or requests).get(url)
+    if response.status_code == 200:
+        return response.json()
+    else:
+        raise Exception(f"Failed to get account data: {response.status_code}")
+
+def get_comments_data(video_id, session=None):
+    url = f"{API_BASE_URL}/video/{video_id}/comments"
+    response = (session or requests).get(url)
+    if response.status_code == 200:
+        return response.json()
+    else:
+        raise Exception(f"Failed to get comments data: {response.status_code}")
+
+def get_comments_page(video_id, cursor=0, count=20, session=None):
+    url = f"{API_BASE_URL}/video/{video_id}/comments"
+    response = (session or requests).get(url, params={'cursor': cursor, 'count': count})
+    if response.status_code == 200:
+        return response.json()
+    else:
+        raise Exception(f"Failed to get comments data: {response.status_code}")
+
+def iter_comments_data(video_id, cursor=0, count=20, session=None):
+    # 沿游标逐页产出 (评论列表, 下一页游标)，调用方保存游标即可从中断处继续
+    while True:
+        page = get_comments_page(video_id, cursor, count, session)
+        comments = page.get('comments') or []
+        next_cursor = page.get('cursor', cursor)
+        yield comments, next_cursor
+        if not page.get('has_more') or not comments or next_cursor == cursor:
+            return
+        cursor = next_cursor
+
+def _get_batch(fetch, ids, session=None, max_workers=8, pool_size=None):
+    # 按完成顺序产出 (id, 数据, 异常)，单个ID失败不影响其他ID
+    own_session = session is None
+    if own_session:
+        session = create_session(pool_size or max_workers)
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            ids = iter(ids)
+            in_flight = {}
+
+            def submit_next():
+                for item_id in ids:
+                    in_flight[executor.submit(fetch, item_id, session)] = item_id
+                    return True
+                return False
+
+            # 最多同时提交max_workers个请求，ID序列按需读取
+            for _ in range(max_workers):
+                if not submit_next():
+                    break
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    item_id = in_flight.pop(future)
+                    try:
+                        yield item_id, future.result(), None
+                    except Exception as e:
+                        yield item_id, None, e
+                    submit_next()
+    finally:
+        if own_session:
+            session.close()
+
+def get_video_data_batch(video_ids, session=None, max_workers=8, pool_size=None):
+    return _get_batch(get_video_data, video_ids, session, max_workers, pool_size)
+
+def get_account_data_batch(account_ids, session=None, max_workers=8, pool_size=None):
+    return _get_batch(get_account_data, account_ids, session, max_workers, pool_size)
+
+def get_comments_data_batch(video_ids, session=None, max_workers=8, pool_size=None):
+    return _get_batch(get_comments_data, video_ids, session, max_workers, pool_size)
@@ -1,210 +1,418 @@
-import requests
-import json
-import os
-import logging
-from datetime import datetime
-from typing import Dict, List, Optional
-from bs4 import BeautifulSoup
-
-class DataGetter:
-    def __init__(self, config_path: str = "config/data_getter_config.json"):
-        # 加载配置文件
-        with open(config_path, 'r', encoding='utf-8') as f:
-            self.config = json.load(f)
-        
-        # 配置日志
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler('data_getter.log'),
-                logging.StreamHandler()
-            ]
-        )
-        self.logger = logging.getLogger(__name__)
-        
-        # 初始化会话
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
-        
-        # 设置超时时间
-        self.timeout = self.config.get('timeout', 10)
-        
-        # 设置重试次数
-        self.max_retries = self.config.get('max_retries', 3)
-        
-        # 初始化代理（如果需要）
-        if 'proxy' in self.config:
-            self.session.proxies.update(self.config['proxy'])
-            
-    def get_video_data(self, video_id: str) -> Dict:
-        """
-        获取指定视频的详细数据
-        """
-        try:
-            url = f"https://v.douyin.com/video/{video_id}/"
-            response = self.session.get(url, timeout=self.timeout)
-            response.raise_for_status()
-            
-            # 使用BeautifulSoup解析HTML内容
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # 提取视频信息
-            video_info = {
-                'video_id': video_id,
-                'title': soup.find('title').text.strip(),
-                'author': soup.find('meta', attrs={'name': 'author'}).get('content', ''),
-                'likes': int(soup.find('span', {'id': 'like-count'}).text.replace(',', '')),
-                'comments': int(soup.find('span', {'id': 'comment-count'}).text.replace(',', '')),
-                'shares': int(soup.find('span', {'id': 'share-count'}).text.replace(',', '')),
-                'timestamp': datetime.now().isoformat()
-            }
-            
-            return video_info
-            
-        except requests.exceptions.RequestException as e:
-            self.logger.error(f"获取视频数据失败: {str(e)}")
-            return {}
-            
-    def search_videos(self, keyword: str, page: int = 1, count: int = 20) -> List[Dict]:
-        """
-        搜索视频
-        """
-        try:
-            url = "https://www.douyin.com/search/item/"
-            params = {
-                'keyword': keyword,
-                'page': page,
-                'count': count
-            }
-            
-            response = self.session.get(url, params=params, timeout=self.timeout)
-            response.raise_for_status()
-            
-            # 解析JSON响应
-            data = response.json()
-            
-            # 提取视频信息
-            videos = []
-            for item in data.get('items', []):
-                video_info = {
-                    'id': item.get('id'),
-                    'title': item.get('title'),
-                    'author': item.get('author'),
-                    'thumbnail': item.get('thumbnail'),
-                    'duration': item.get('duration'),
-                    'play_count': item.get('play_count')
-                }
-                videos.append(video_info)
-                
-            return videos
-            
-        except requests.exceptions.RequestException as e:
-            self.logger.error(f"搜索视频失败: {str(e)}")
-            return []
-            
-    def get_user_data(self, user_id: str) -> Dict:
-        """
-        获取用户数据
-        """
-        try:
-            url = f"https://www.douyin.com/user/{user_id}/"
-            response = self.session.get(url, timeout=self.timeout)
-            response.raise_for_status()
-            
-            # 使用BeautifulSoup解析HTML内容
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # 提取用户信息
-            user_info = {
-                'user_id': user_id,
-                'username': soup.find('title').text.strip(),
-                'follower_count': int(soup.find('div', {'class': 'profile-follow-info'}).find('span').text.replace(',', '')),
-                'following_count': int(soup.find('div', {'class': 'profile-follow-info'}).find_next('span').text.replace(',', '')),
-                'video_count': int(soup.find('div', {'class': 'profile-video-info'}).find('span').text.replace(',', '')),
-                'timestamp': datetime.now().isoformat()
-            }
-            
-            return user_info
-            
-        except requests.exceptions.RequestException as e:
-            self.logger.error(f"获取用户数据失败: {str(e)}")
-            return {}
-            
-    def get_trending_videos(self, page: int = 1, count: int = 20) -> List[Dict]:
-        """
-        获取热门视频
-        """
-        try:
-            url = "https://www.douyin.com/trending/"
-            params = {
-                'page': page,
-                'count': count
-            }
-            
-            response = self.session.get(url, params=params, timeout=self.timeout)
-            response.raise_for_status()
-            
-            # 解析响应内容
-            data = response.json()
-            
-            videos = []
-            for item in data.get('items', []):
-                video_info = {
-                    'id': item.get('id'),
-                    'title': item.get('title'),
-                    'author': item.get('author'),
-                    'thumbnail': item.get('thumbnail'),
-                    'duration': item.get('duration'),
-                    'play_count': item.get('play_count')
-                }
-                videos.append(video_info)
-                
-            return videos
-            
-        except requests.exceptions.RequestException as e:
-            self.logger.error(f"获取热门视频失败: {str(e)}")
-            return []
-            
-    def get_hashtag_data(self, hashtag: str, page: int = 1, count: int = 20) -> List[Dict]:
-        """
-        获取话题数据
-        """
-        try:
-            url = f"https://www.douyin.com/tag/{hashtag}/"
-            params = {
-                'page': page,
-                'count': count
-            }
-            
-            response = self.session.get(url, params=params, timeout=self.timeout)
-            response.raise_for_status()
-            
-            # 解析响应内容
-            data = response.json()
-            
-            hashtag_info = {
-                'hashtag': hashtag,
-                'challenge_name': data.get('challenge_name'),
-                'challenge_id': data.get('challenge_id'),
-                'videos': []
-            }
-            
-            for item in data.get('items', []):
-                video_info = {
-                    'id': item.get('id'),
-                    'title': item.get('title'),
-                    'author': item.get('author'),
-                    'thumbnail': item.get('thumbnail'),
-                    'duration': item.get('duration'),
-                    'play_count': item.get('play_count')
-                }
-                hashtag_info['videos'].append(video_info)
-                
-            return hashtag_info
-            
-        except requests.exceptions.RequestException as e:
-            self.logger.error(f"获取话题数据失败: {str(e)}")
-            return {}
+import requests
+import json
+import os
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional
+from urllib.parse import urlparse
+from rate_limiter import AdaptiveRateLimiter
+from http_cache import ResponseCache
+from html_parser import VIDEO_PAGE_SPEC, USER_PAGE_SPEC, create_backend
+from single_flight import SingleFlight
+
+class DataGetter:
+    def __init__(self, config_path: str = "config/data_getter_config.json"):
+        # 加载配置文件
+        with open(config_path, 'r', encoding='utf-8') as f:
+            self.config = json.load(f)
+        
+        # 配置日志
+        logging.basicConfig(
+            level=logging.INFO,
+            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+            handlers=[
+                logging.FileHandler('data_getter.log'),
+                logging.StreamHandler()
+            ]
+        )
+        self.logger = logging.getLogger(__name__)
+        
+        # 初始化会话
+        self.session = requests.Session()
+        self.session.headers.update({
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+        })
+        
+        # 设置接口地址，可指向本地模拟服务器
+        self.video_base_url = self.config.get('video_base_url', 'https://v.douyin.com').rstrip('/')
+        self.base_url = self.config.get('base_url', 'https://www.douyin.com').rstrip('/')
+        
+        # 设置超时时间
+        self.timeout = self.config.get('timeout', 10)
+        
+        # 设置重试次数
+        self.max_retries = self.config.get('max_retries', 3)
+        self.retry_backoff = self.config.get('retry_backoff', 1.0)
+        
+        # 初始化按主机的自适应限流器
+        self.rate_limiter = AdaptiveRateLimiter(self.config.get('rate_limit'))
+        
+        # 合并相同资源的并发请求
+        self.single_flight = SingleFlight()
+        
+        # 初始化HTML解析后端
+        self.parser_backend = self.config.get('parser_backend', 'auto')
+        self.html_parser = create_backend(self.parser_backend)
+        
+        # 初始化代理（如果需要）
+        if 'proxy' in self.config:
+            self.session.proxies.update(self.config['proxy'])
+            
+        # 初始化响应缓存（如果需要）
+        self.cache = None
+        if 'cache' in self.config:
+            cache_config = self.config['cache']
+            self.cache = ResponseCache(
+                cache_dir=cache_config.get('path', 'cache/http'),
+                max_size_bytes=int(cache_config.get('max_size_mb', 256) * 1024 * 1024),
+                ttl=cache_config.get('ttl')
+            )
+            
+    def _get(self, url: str, **kwargs) -> requests.Response:
+        """
+        经过限流器发送GET请求，遇到429/5xx或连接失败时退避重试
+        """
+        host = urlparse(url).netloc
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire(host)
+            start = time.monotonic()
+            status_code = None
+            try:
+                response = self.session.get(url, timeout=self.timeout, **kwargs)
+                status_code = response.status_code
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if attempt >= self.max_retries:
+                    raise
+                response = None
+            finally:
+                self.rate_limiter.release(host, time.monotonic() - start, status_code)
+                
+            if response is not None and status_code != 429 and status_code < 500:
+                return response
+            if attempt >= self.max_retries:
+                return response
+                
+            # 优先使用服务端给出的Retry-After，否则指数退避
+            delay = self.retry_backoff * (2 ** attempt)
+            if response is not None and response.headers.get('Retry-After', '').isdigit():
+                delay = int(response.headers['Retry-After'])
+            self.logger.warning(f"请求 {url} 失败(状态码: {status_code})，{delay:.1f} 秒后第 {attempt + 1} 次重试")
+            time.sleep(delay)
+            
+    def get_rate_stats(self) -> Dict[str, Dict]:
+        """
+        获取各主机当前的请求速率、并发上限和延迟
+        """
+        return self.rate_limiter.stats()
+            
+    def _fetch_response(self, url: str, params: Optional[Dict] = None):
+        """
+        请求指定URL，启用缓存时优先使用缓存
+        缓存未过期直接返回；过期则携带ETag/Last-Modified重新验证，304时复用已解析的记录
+        :return: (缓存的记录, 响应, 缓存键)，使用缓存记录时响应为None
+        """
+        if self.cache is None:
+            response = self._get(url, params=params)
+            response.raise_for_status()
+            return None, response, None
+            
+        key = self.cache.make_key(url, params)
+        entry = self.cache.get(key)
+        if entry and self.cache.is_fresh(entry):
+            self.cache.record_hit()
+            return entry['record'], None, key
+            
+        headers = {}
+        if entry:
+            if entry['etag']:
+                headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                headers['If-Modified-Since'] = entry['last_modified']
+                
+        response = self._get(url, params=params, headers=headers)
+        if entry and response.status_code == 304:
+            self.cache.touch(key)
+            self.cache.record_revalidated()
+            return entry['record'], None, key
+            
+        response.raise_for_status()
+        self.cache.record_miss()
+        return None, response, key
+        
+    def _cache_record(self, key: Optional[str], endpoint: str, url: str, record, headers: Dict):
+        if self.cache is None or key is None:
+            return
+        self.cache.put(
+            key, endpoint, url, record,
+            etag=headers.get('ETag'),
+            last_modified=headers.get('Last-Modified')
+        )
+        
+    def _fetch_record(self, endpoint: str, url: str, parse, params: Optional[Dict] = None):
+        """
+        获取并解析指定URL，解析结果写入缓存
+        """
+        record, response, key = self._fetch_response(url, params)
+        if response is None:
+            return record
+        record = parse(response)
+        self._cache_record(key, endpoint, url, record, response.headers)
+        return record
+        
+    def _page_url(self, kind: str, entity_id: str) -> str:
+        if kind == 'video':
+            return f"{self.video_base_url}/video/{entity_id}/"
+        if kind == 'user':
+            return f"{self.base_url}/user/{entity_id}/"
+        raise ValueError(f"不支持的页面类型: {kind}")
+        
+    def _build_record(self, kind: str, entity_id: str, fields: Dict) -> Dict:
+        record = {f'{kind}_id': entity_id}
+        record.update(fields)
+        record['timestamp'] = datetime.now().isoformat()
+        return record
+        
+    def download_page(self, kind: str, entity_id: str) -> Dict:
+        """
+        只下载视频或用户页面而不解析，供下载与解析分离的流水线使用
+        命中缓存时返回的字典包含record，否则包含待解析的html；请求失败返回空字典
+        """
+        try:
+            url = self._page_url(kind, entity_id)
+            record, response, key = self._fetch_response(url)
+        except requests.exceptions.RequestException as e:
+            self.logger.error(f"下载{kind}页面失败: {str(e)}")
+            return {}
+            
+        page = {'kind': kind, 'id': entity_id, 'url': url}
+        if response is None:
+            page['record'] = record
+        else:
+            page['html'] = response.text
+            page['cache_key'] = key
+            page['headers'] = {name: response.headers[name] for name in ('ETag', 'Last-Modified')
+                               if name in response.headers}
+        return page
+        
+    def finish_page(self, page: Dict, fields: Dict) -> Dict:
+        """
+        用解析出的字段生成完整记录并写入缓存
+        """
+        record = self._build_record(page['kind'], page['id'], fields)
+        self._cache_record(page.get('cache_key'), page['kind'], page['url'], record, page.get('headers', {}))
+        return record
+        
+    def get_cache_stats(self) -> Dict:
+        """
+        获取响应缓存的命中统计
+        """
+        return self.cache.stats() if self.cache else {}
+        
+    def get_stats(self) -> Dict:
+        """
+        获取限流、缓存和请求合并的统计信息
+        """
+        return {
+            'rate_limiter': self.get_rate_stats(),
+            'cache': self.get_cache_stats(),
+            'single_flight': self.single_flight.stats()
+        }
+        
+    def _parse_video_items(self, data: Dict) -> List[Dict]:
+        videos = []
+        for item in data.get('items', []):
+            video_info = {
+                'id': item.get('id'),
+                'title': item.get('title'),
+                'author': item.get('author'),
+                'thumbnail': item.get('thumbnail'),
+                'duration': item.get('duration'),
+                'play_count': item.get('play_count')
+            }
+            videos.append(video_info)
+        return videos
+            
+    def _parse_video_page(self, video_id: str, response: requests.Response) -> Dict:
+        # 按抽取规范一次遍历提取视频信息
+        return self._build_record('video', video_id, self.html_parser.extract(response.text, VIDEO_PAGE_SPEC))
+        
+    def _parse_user_page(self, user_id: str, response: requests.Response) -> Dict:
+        # 按抽取规范一次遍历提取用户信息
+        return self._build_record('user', user_id, self.html_parser.extract(response.text, USER_PAGE_SPEC))
+        
+    def _parse_hashtag_page(self, hashtag: str, response: requests.Response) -> Dict:
+        # 解析响应内容
+        data = response.json()
+        
+        return {
+            'hashtag': hashtag,
+            'challenge_name': data.get('challenge_name'),
+            'challenge_id': data.get('challenge_id'),
+            'videos': self._parse_video_items(data)
+        }
+            
+    def get_video_data(self, video_id: str) -> Dict:
+        """
+        获取指定视频的详细数据
+        """
+        try:
+            url = self._page_url('video', video_id)
+            return self._fetch_record('video', url, lambda response: self._parse_video_page(video_id, response))
+            
+        except requests.exceptions.RequestException as e:
+            self.logger.error(f"获取视频数据失败: {str(e)}")
+            return {}
+            
+    def search_videos(self, keyword: str, page: int = 1, count: int = 20) -> List[Dict]:
+        """
+        搜索视频
+        """
+        try:
+            url = f"{self.base_url}/search/item/"
+            params = {
+                'keyword': keyword,
+                'page': page,
+                'count': count
+            }
+            
+            # 解析JSON响应并提取视频信息
+            return self._fetch_record('search', url, lambda response: self._parse_video_items(response.json()), params)
+            
+        except requests.exceptions.RequestException as e:
+            self.logger.error(f"搜索视频失败: {str(e)}")
+            return []
+            
+    def get_user_data(self, user_id: str) -> Dict:
+        """
+        获取用户数据
+        """
+        try:
+            url = self._page_url('user', user_id)
+            return self._fetch_record('user', url, lambda response: self._parse_user_page(user_id, response))
+            
+        except requests.exceptions.RequestException as e:
+            self.logger.error(f"获取用户数据失败: {str(e)}")
+            return {}
+            
+    def get_trending_videos(self, page: int = 1, count: int = 20) -> List[Dict]:
+        """
+        获取热门视频
+        """
+        try:
+            url = f"{self.base_url}/trending/"
+            params = {
+                'page': page,
+                'count': count
+            }
+            
+            # 解析响应内容
+            return self._fetch_record('trending', url, lambda response: self._parse_video_items(response.json()), params)
+            
+        except requests.exceptions.RequestException as e:
+            self.logger.error(f"获取热门视频失败: {str(e)}")
+            return []
+            
+    def get_hashtag_data(self, hashtag: str, page: int = 1, count: int = 20) -> List[Dict]:
+        """
+        获取话题数据
+        """
+        try:
+            url = f"{self.base_url}/tag/{hashtag}/"
+            params = {
+                'page': page,
+                'count': count
+            }
+            
+            return self._fetch_record('hashtag', url, lambda response: self._parse_hashtag_page(hashtag, response), params)
+            
+        except requests.exceptions.RequestException as e:
+            self.logger.error(f"获取话题数据失败: {str(e)}")
+            return {}
+            
+    def _iter_pages(self, fetch_page: Callable[[int, int], List[Dict]], max_items: Optional[int] = None,
+                    page_size: int = 20) -> Iterator[Dict]:
+        """
+        逐条产出分页结果，调用方处理第N页时在后台预取第N+1页
+        任意时刻最多只持有当前页和预取页，内存占用与总页数无关
+        """
+        yielded = 0
+        page = 1
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix='prefetch') as executor:
+            future = executor.submit(fetch_page, page, page_size)
+            while future is not None:
+                items = future.result()
+                future = None
+                
+                # 本页不满说明已是最后一页，或者本页已足够凑满max_items，不再预取
+                remaining = None if max_items is None else max_items - yielded
+                if len(items) >= page_size and (remaining is None or len(items) < remaining):
+                    future = executor.submit(fetch_page, page + 1, page_size)
+                    
+                for item in items:
+                    yield item
+                    yielded += 1
+                    if max_items is not None and yielded >= max_items:
+                        return
+                page += 1
+                
+    def iter_search(self, keyword: str, max_items: Optional[int] = None, page_size: int = 20) -> Iterator[Dict]:
+        """
+        逐条产出搜索结果，自动翻页
+        """
+        return self._iter_pages(
+            lambda page, count: self.search_videos(keyword, page=page, count=count),
+            max_items, page_size
+        )
+        
+    def iter_trending(self, max_items: Optional[int] = None, page_size: int = 20) -> Iterator[Dict]:
+        """
+        逐条产出热门视频，自动翻页
+        """
+        return self._iter_pages(
+            lambda page, count: self.get_trending_videos(page=page, count=count),
+            max_items, page_size
+        )
+        
+    def iter_hashtag(self, hashtag: str, max_items: Optional[int] = None, page_size: int = 20) -> Iterator[Dict]:
+        """
+        逐条产出话题下的视频，自动翻页
+        """
+        return self._iter_pages(
+            lambda page, count: self.get_hashtag_data(hashtag, page=page, count=count).get('videos', []),
+            max_items, page_size
+        )
+        
+    def get_data(self, params: Dict):
+        """
+        按请求参数获取数据，相同资源的并发请求合并为一次上游请求
+        params['type']取值: video, user, search, trending, hashtag
+        """
+        data_type = params.get('type')
+        page = int(params.get('page', 1))
+        count = int(params.get('count', 20))
+        if data_type == 'video':
+            key = (params.get('video_id') or params.get('id'),)
+            fetch = lambda: self.get_video_data(key[0])
+        elif data_type == 'user':
+            key = (params.get('user_id') or params.get('id'),)
+            fetch = lambda: self.get_user_data(key[0])
+        elif data_type == 'search':
+            key = (params.get('keyword'), page, count)
+            fetch = lambda: self.search_videos(key[0], page=page, count=count)
+        elif data_type == 'trending':
+            key = (page, count)
+            fetch = lambda: self.get_trending_videos(page=page, count=count)
+        elif data_type == 'hashtag':
+            key = (params.get('hashtag'), page, count)
+            fetch = lambda: self.get_hashtag_data(key[0], page=page, count=count)
+        else:
+            self.logger.error(f"不支持的数据类型: {data_type}")
+            return None
+            
+        if key[0] is None:
+            self.logger.error(f"缺少{data_type}数据的标识参数")
+            return None
+            
+        return self.single_flight.do((data_type,) + key, fetch)
@@ -1,215 +1,485 @@
-import json
-import os
-import logging
-from datetime import datetime
-from typing import Dict, List, Optional
-import mysql.connector
-from pymongo import MongoClient
-
-class DataStorage:
-    def __init__(self, storage_type: str = 'file', storage_path: str = 'data/', db_config: Optional[Dict] = None):
-        # 初始化存储类型（file, mysql, mongodb）
-        self.storage_type = storage_type
-        
-        # 配置日志
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler('data_storage.log'),
-                logging.StreamHandler()
-            ]
-        )
-        self.logger = logging.getLogger(__name__)
-        
-        # 初始化存储路径
-        self.storage_path = storage_path
-        if not os.path.exists(self.storage_path):
-            os.makedirs(self.storage_path, exist_ok=True)
-            
-        # 初始化数据库连接（如果需要）
-        self.db_config = db_config
-        if storage_type == 'mysql':
-            self.mysql_conn = mysql.connector.connect(
-                host=db_config.get('host', 'localhost'),
-                user=db_config.get('user', 'root'),
-                password=db_config.get('password', ''),
-                database=db_config.get('database', 'douyin_data')
-            )
-        elif storage_type == 'mongodb':
-            self.mongo_client = MongoClient(
-                host=db_config.get('host', 'localhost'),
-                port=db_config.get('port', 27017)
-            )
-            self.db = self.mongo_client[db_config.get('database', 'douyin_data')]
-            
-    def save_video_data(self, video_data: Dict, storage_id: str = None):
-        """
-        保存视频数据
-        """
-        try:
-            if storage_id:
-                file_path = os.path.join(self.storage_path, f'video_{storage_id}.json')
-            else:
-                file_path = os.path.join(self.storage_path, f'video_{video_data.get("video_id", "unknown")}.json')
-            
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(video_data, f, ensure_ascii=False, indent=2)
-            
-            if self.storage_type == 'mysql':
-                cursor = self.mysql_conn.cursor()
-                cursor.execute('''
-                    INSERT INTO videos (video_id, title, author, likes, comments, shares, timestamp)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s)
-                ''', (
-                    video_data.get('video_id'),
-                    video_data.get('title'),
-                    video_data.get('author'),
-                    video_data.get('likes', 0),
-                    video_data.get('comments', 0),
-                    video_data.get('shares', 0),
-                    datetime.now().isoformat()
-                ))
-                self.mysql_conn.commit()
-                
-            elif self.storage_type == 'mongodb':
-                self.db.videos.insert_one(video_data)
-                
-            self.logger.info(f"成功保存视频数据到{file_path}")
-            return True
-            
-        except Exception as e:
-            self.logger.error(f"保存视频数据失败: {str(e)}")
-            return False
-            
-    def save_user_data(self, user_data: Dict, storage_id: str = None):
-        """
-        保存用户数据
-        """
-        try:
-            if storage_id:
-                file_path = os.path.join(self.storage_path, f'user_{storage_id}.json')
-            else:
-                file_path = os.path.join(self.storage_path, f'user_{user_data.get("user_id", "unknown")}.json')
-            
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(user_data, f, ensure_ascii=False, indent=2)
-            
-            if self.storage_type == 'mysql':
-                cursor = self.mysql_conn.cursor()
-                cursor.execute('''
-                    INSERT INTO users (user_id, username, follower_count, following_count, video_count, timestamp)
-                    VALUES (%s, %s, %s, %s, %s, %s)
-                ''', (
-                    user_data.get('user_id'),
-                    user_data.get('username'),
-                    user_data.get('follower_count', 0),
-                    user_data.get('following_count', 0),
-                    user_data.get('video_count', 0),
-                    datetime.now().isoformat()
-                ))
-                self.mysql_conn.commit()
-                
-            elif self.storage_type == 'mongodb':
-                self.db.users.insert_one(user_data)
-                
-            self.logger.info(f"成功保存用户数据到{file_path}")
-            return True
-            
-        except Exception as e:
-            self.logger.error(f"保存用户数据失败: {str(e)}")
-            return False
-            
-    def save_trending_videos(self, videos_data: List[Dict]):
-        """
-        保存热门视频数据
-        """
-        try:
-            file_path = os.path.join(self.storage_path, f'trending_videos_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json')
-            
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(videos_data, f, ensure_ascii=False, indent=2)
-            
-            if self.storage_type == 'mysql':
-                cursor = self.mysql_conn.cursor()
-                for video in videos_data:
-                    cursor.execute('''
-                        INSERT INTO trending_videos (video_id, title, author, play_count, timestamp)
-                        VALUES (%s, %s, %s, %s, %s)
-                    ''', (
-                        video.get('id'),
-                        video.get('title'),
-                        video.get('author'),
-                        video.get('play_count', 0),
-                        datetime.now().isoformat()
-                    ))
-                self.mysql_conn.commit()
-                
-            elif self.storage_type == 'mongodb':
-                self.db.trending_videos.insert_many(videos_data)
-                
-            self.logger.info(f"成功保存热门视频数据到{file_path}")
-            return True
-            
-        except Exception as e:
-            self.logger.error(f"保存热门视频数据失败: {str(e)}")
-            return False
-            
-    def save_hashtag_data(self, hashtag_data: Dict):
-        """
-        保存话题数据
-        """
-        try:
-            file_path = os.path.join(self.storage_path, f'hashtag_{hashtag_data.get("hashtag", "unknown")}.json')
-            
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(hashtag_data, f, ensure_ascii=False, indent=2)
-            
-            if self.storage_type == 'mysql':
-                cursor = self.mysql_conn.cursor()
-                cursor.execute('''
-                    INSERT INTO hashtags (hashtag, challenge_name, challenge_id, timestamp)
-                    VALUES (%s, %s, %s, %s)
-                ''', (
-                    hashtag_data.get('hashtag'),
-                    hashtag_data.get('challenge_name'),
-                    hashtag_data.get('challenge_id'),
-                    datetime.now().isoformat()
-                ))
-                self.mysql_conn.commit()
-                
-                # 保存相关视频数据
-                for video in hashtag_data.get('videos', []):
-                    cursor.execute('''
-                        INSERT INTO hashtag_videos (hashtag, video_id, title, author, play_count, timestamp)
-                        VALUES (%s, %s, %s, %s, %s, %s)
-                    ''', (
-                        hashtag_data.get('hashtag'),
-                        video.get('id'),
-                        video.get('title'),
-                        video.get('author'),
-                        video.get('play_count', 0),
-                        datetime.now().isoformat()
-                    ))
-                self.mysql_conn.commit()
-                
-            elif self.storage_type == 'mongodb':
-                self.db.hashtags.insert_one(hashtag_data)
-                
-            self.logger.info(f"成功保存话题数据到{file_path}")
-            return True
-            
-        except Exception as e:
-            self.logger.error(f"保存话题数据失败: {str(e)}")
-            return False
-            
-    def load_from_file(self, file_path: str) -> Optional[Dict]:
-        """
-        从文件加载数据
-        """
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except Exception as e:
-            self.logger.error(f"从文件加载数据失败: {str(e)}")
-            return None
+import json
+import os
+import logging
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+from batch_writer import MongoBulkWriter, MySQLBatchWriter
+from segment_log import SegmentLog
+from db_pool import MySQLPool, create_mongo_client
+from delta_store import DeltaStore
+from file_index import FileIndex, parse_file_name
+from read_cache import create_read_cache
+
+# 各MySQL表的写入列
+MYSQL_TABLES = {
+    'videos': ['video_id', 'title', 'author', 'likes', 'comments', 'shares', 'timestamp'],
+    'users': ['user_id', 'username', 'follower_count', 'following_count', 'video_count', 'timestamp'],
+    'trending_videos': ['video_id', 'title', 'author', 'play_count', 'timestamp'],
+    'hashtags': ['hashtag', 'challenge_name', 'challenge_id', 'timestamp'],
+    'hashtag_videos': ['hashtag', 'video_id', 'title', 'author', 'play_count', 'timestamp']
+}
+
+# 各MongoDB集合的主键字段，重复抓取时按主键更新
+MONGO_KEYS = {
+    'videos': ['video_id'],
+    'users': ['user_id'],
+    'trending_videos': ['id'],
+    'hashtags': ['hashtag']
+}
+
+class DataStorage:
+    def __init__(self, storage_type: str = 'file', storage_path: str = 'data/', db_config: Optional[Dict] = None,
+                 write_buffer: Optional[Dict] = None, delta_config: Optional[Dict] = None,
+                 index_files: bool = True, read_cache: Optional[Dict] = None):
+        """
+        :param write_buffer: 数据库批量写入配置（max_rows, max_delay, max_retries, dead_letter_path），为None时每次保存立即写入；
+                             多次重试仍无法写入的行默认追加到storage_path/dead_letter.jsonl
+        :param delta_config: 变化检测配置（path, base_interval, history），启用后内容未变化的视频和用户数据不再写入。
+                             file和mongodb类型只保留每个对象的最新状态，变化的记录以增量形式保存为历史，可按时间点重建；
+                             log、parquet和mysql类型本身保存每次快照，默认只保存指纹，不重复保存历史
+        :param index_files: 是否为JSON快照文件维护二级索引（storage_path/index.sqlite），用于find_files()
+        :param read_cache: 读取缓存配置（max_mb, ttl, default_ttl），启用后load_latest/load_from_file先查内存缓存，
+                           save_*写入后使对应对象的缓存失效
+        """
+        # 初始化存储类型（file, log, parquet, mysql, mongodb）
+        # log类型把快照追加到分段日志，parquet类型写入按日期分区的列式快照，其他类型每个对象保存一个JSON文件
+        self.storage_type = storage_type
+        self.buffered = write_buffer is not None
+        
+        # 配置日志
+        logging.basicConfig(
+            level=logging.INFO,
+            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+            handlers=[
+                logging.FileHandler('data_storage.log'),
+                logging.StreamHandler()
+            ]
+        )
+        self.logger = logging.getLogger(__name__)
+        
+        # 初始化存储路径
+        self.storage_path = storage_path
+        if not os.path.exists(self.storage_path):
+            os.makedirs(self.storage_path, exist_ok=True)
+            
+        # log和parquet类型不写JSON文件，有各自的索引
+        self.file_index = None
+        if index_files and storage_type not in ('log', 'parquet'):
+            self.file_index = FileIndex(os.path.join(storage_path, 'index.sqlite'))
+            
+        self.read_cache = create_read_cache(read_cache)
+            
+        self.delta_store = None
+        if delta_config is not None:
+            self.delta_store = DeltaStore(
+                delta_config.get('path', os.path.join(storage_path, 'deltas.sqlite')),
+                base_interval=delta_config.get('base_interval', 20),
+                keep_history=delta_config.get('history', storage_type in ('file', 'mongodb'))
+            )
+            
+        # 初始化数据库连接（如果需要）
+        self.db_config = db_config
+        # 多次重试仍无法写入的行追加到死信文件
+        dead_letter_path = os.path.join(storage_path, 'dead_letter.jsonl')
+        buffer_config = dict(write_buffer or {})
+        buffer_config.setdefault('dead_letter_path', dead_letter_path)
+        # 数据库连接由连接池管理，每次写入时借出连接，多个请求线程可以共享同一个DataStorage
+        if storage_type == 'mysql':
+            self.mysql_pool = MySQLPool(
+                db_config,
+                pool_size=db_config.get('pool_size', 8),
+                checkout_timeout=db_config.get('pool_timeout', 10.0),
+                reconnect_attempts=db_config.get('reconnect_attempts', 3)
+            )
+            self.writer = MySQLBatchWriter(
+                self.mysql_pool.connection,
+                MYSQL_TABLES,
+                auto_flush=self.buffered,
+                **buffer_config
+            )
+        elif storage_type == 'mongodb':
+            self.mongo_client, self.mongo_pool = create_mongo_client(db_config)
+            self.db = self.mongo_client[db_config.get('database', 'douyin_data')]
+            self.writer = MongoBulkWriter(
+                self.db,
+                MONGO_KEYS,
+                auto_flush=self.buffered,
+                **buffer_config
+            )
+            self.writer.ensure_indexes()
+        elif storage_type == 'log':
+            log_config = db_config or {}
+            self.log = SegmentLog(
+                os.path.join(storage_path, 'log'),
+                segment_size=int(log_config.get('segment_size_mb', 64) * 1024 * 1024),
+                compress=log_config.get('compress', False),
+                fsync=log_config.get('fsync', False)
+            )
+        elif storage_type == 'parquet':
+            from parquet_store import ParquetSnapshotStore
+            parquet_config = db_config or {}
+            self.parquet = ParquetSnapshotStore(
+                parquet_config.get('path', os.path.join(storage_path, 'parquet')),
+                max_rows=parquet_config.get('max_rows', 10000),
+                max_delay=parquet_config.get('max_delay', 60.0),
+                compression=parquet_config.get('compression', 'zstd'),
+                dead_letter_path=parquet_config.get('dead_letter_path', dead_letter_path)
+            )
+            
+    def _write_db(self, table: str, rows: List, on_written: Optional[Callable[[], None]] = None,
+                  on_failed: Optional[Callable[[Exception], None]] = None):
+        # 启用缓冲时先加入缓冲，达到阈值后批量写入；否则本次调用的所有行一次写入
+        # on_written在这些行真正写入数据库后调用，on_failed在缓冲中的行最终被放弃时调用
+        if self.buffered:
+            self.writer.add_many(table, rows, on_written, on_failed)
+        else:
+            self.writer.write_now(table, rows, on_written)
+            
+    def _unchanged(self, kind: str, entity_id: str, data: Dict) -> bool:
+        # 启用变化检测时，内容与上次保存的相同则跳过写入
+        if self.delta_store is not None and self.delta_store.is_unchanged(kind, entity_id, data):
+            self.logger.debug(f"{kind} {entity_id} 未变化，跳过写入")
+            return True
+        return False
+            
+    def _delta_callback(self, kind: str, entity_id: str, data: Dict) -> Optional[Callable[[], None]]:
+        # 返回更新指纹并保存增量的回调，在记录写入成功后调用（启用缓冲时为所在批次刷新成功后），
+        # 写入失败的记录指纹不变，下次仍会被写入
+        if self.delta_store is None:
+            return None
+        return lambda: self.delta_store.put(kind, entity_id, data, data.get('timestamp'))
+            
+    def _save_snapshot(self, kind: str, entity_id: str, file_name: str, data,
+                       on_written: Optional[Callable[[], None]] = None,
+                       on_failed: Optional[Callable[[Exception], None]] = None) -> str:
+        """
+        保存一份快照
+        :param on_written: 快照写入后调用，Parquet快照在缓冲刷新后调用
+        :param on_failed: 缓冲中的Parquet快照最终无法写入时调用
+        :return: 快照的保存位置，用于日志
+        """
+        if self.storage_type == 'log':
+            segment, offset = self.log.append(kind, entity_id, data)
+            self._invalidate(kind, entity_id)
+            location = f'日志段{segment}（偏移 {offset}）'
+        elif self.storage_type == 'parquet':
+            location = self.parquet.add_snapshot(kind, data, on_written=on_written, on_failed=on_failed)
+            self._invalidate(kind, entity_id)
+            return f'Parquet快照 {location}'
+        else:
+            location = self._save_file(kind, entity_id, file_name, data)
+        if on_written is not None:
+            on_written()
+        return location
+            
+    def _save_file(self, kind: str, entity_id: str, file_name: str, data) -> str:
+        file_path = os.path.join(self.storage_path, file_name)
+        with open(file_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        self._invalidate(kind, os.path.abspath(file_path))
+        if self.file_index is not None:
+            try:
+                self.file_index.update(file_name, kind, entity_id, data)
+            except Exception as e:
+                # 文件已经写入，索引可以之后用 python file_index.py <数据目录> --rebuild 重建
+                self.logger.warning(f"更新文件索引失败 {file_name}: {str(e)}")
+        return file_path
+            
+    def find_files(self, **filters) -> List[Dict]:
+        """
+        通过文件索引查询快照文件，条件见FileIndex.find（kind, author, hashtag, id_prefix, start, end, limit）
+        返回的file可直接用load_from_file(os.path.join(storage_path, file))加载
+        """
+        if self.file_index is None:
+            raise RuntimeError("未启用文件索引")
+        return self.file_index.find(**filters)
+            
+    def _invalidate(self, kind: str, key: str):
+        # 写入后使缓存失效：JSON文件按文件路径缓存，日志和Parquet按对象ID缓存
+        if self.read_cache is not None:
+            self.read_cache.invalidate(kind, key)
+            
+    def load_latest(self, kind: str, entity_id: str) -> Optional[Dict]:
+        """
+        加载对象的最新快照
+        :param kind: video, user 或 hashtag
+        """
+        if self.storage_type == 'log':
+            load = lambda: self.log.get(kind, entity_id)
+        elif self.storage_type == 'parquet' and kind in ('video', 'user'):
+            load = lambda: self.parquet.get_latest(f'{kind}s', {f'{kind}_id': entity_id})
+        else:
+            return self.load_from_file(os.path.join(self.storage_path, f'{kind}_{entity_id}.json'))
+        if self.read_cache is None:
+            return load()
+        return self.read_cache.get_or_load(kind, entity_id, load)
+            
+    def flush(self):
+        """
+        写入所有缓冲中的数据
+        """
+        if self.storage_type in ('mysql', 'mongodb'):
+            self.writer.flush()
+        elif self.storage_type == 'log':
+            self.log.flush()
+        elif self.storage_type == 'parquet':
+            self.parquet.flush()
+            
+    def get_write_stats(self) -> Dict:
+        """
+        获取批量写入的吞吐量和刷新延迟
+        """
+        stats = {}
+        if self.storage_type in ('mysql', 'mongodb'):
+            stats = self.writer.stats()
+        elif self.storage_type == 'log':
+            stats = self.log.stats()
+        elif self.storage_type == 'parquet':
+            stats = self.parquet.stats()
+        if self.delta_store is not None:
+            stats['delta'] = self.delta_store.stats()
+        return stats
+            
+    def get_cache_stats(self) -> Dict:
+        """
+        获取读取缓存的命中率、淘汰和失效统计，未启用缓存时返回空字典
+        """
+        return self.read_cache.stats() if self.read_cache is not None else {}
+            
+    def get_pool_stats(self) -> Dict:
+        """
+        获取数据库连接池的借出次数、等待时间和超时统计
+        """
+        if self.storage_type == 'mysql':
+            return self.mysql_pool.get_stats()
+        if self.storage_type == 'mongodb':
+            stats = self.mongo_pool.stats.snapshot()
+            stats['size'] = self.mongo_client.options.pool_options.max_pool_size
+            return stats
+        return {}
+            
+    def ping(self) -> bool:
+        """
+        检查数据库连接是否可用
+        """
+        if self.storage_type == 'mysql':
+            return self.mysql_pool.ping()
+        if self.storage_type == 'mongodb':
+            try:
+                self.mongo_client.admin.command('ping')
+                return True
+            except Exception as e:
+                self.logger.error(f"MongoDB健康检查失败: {str(e)}")
+                return False
+        return True
+            
+    def close(self):
+        """
+        写入缓冲中的数据并关闭数据库连接
+        最后一次写入失败时仍然关闭连接池和索引，异常在全部关闭后抛出
+        """
+        try:
+            if self.storage_type == 'log':
+                self.log.close()
+            elif self.storage_type == 'parquet':
+                self.parquet.close()
+            elif self.storage_type == 'mysql':
+                try:
+                    self.writer.close()
+                finally:
+                    self.mysql_pool.close()
+            elif self.storage_type == 'mongodb':
+                try:
+                    self.writer.close()
+                finally:
+                    self.mongo_client.close()
+        finally:
+            # 最后一次写入成功后的回调会更新指纹，变化检测存储在写入之后关闭
+            if self.delta_store is not None:
+                self.delta_store.close()
+            if self.file_index is not None:
+                self.file_index.close()
+            
+    def __enter__(self):
+        return self
+        
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+            
+    def save_video_data(self, video_data: Dict, storage_id: str = None,
+                        on_failed: Optional[Callable[[Exception], None]] = None):
+        """
+        保存视频数据
+        :param on_failed: 启用写入缓冲时，保存返回True后数据才在批量写入中写入数据库；
+                          多次重试仍无法写入而被放弃时以异常调用，调用方可以转存这条记录，否则写入死信文件
+        """
+        try:
+            entity_id = storage_id or video_data.get("video_id", "unknown")
+            if self._unchanged('video', entity_id, video_data):
+                return True
+            # 写入数据库时以数据库写入成功为准更新指纹
+            record = self._delta_callback('video', entity_id, video_data)
+            in_db = self.storage_type in ('mysql', 'mongodb')
+            file_path = self._save_snapshot('video', entity_id, f'video_{entity_id}.json', video_data,
+                                            None if in_db else record, on_failed)
+            
+            if self.storage_type == 'mysql':
+                self._write_db('videos', [(
+                    video_data.get('video_id'),
+                    video_data.get('title'),
+                    video_data.get('author'),
+                    video_data.get('likes', 0),
+                    video_data.get('comments', 0),
+                    video_data.get('shares', 0),
+                    datetime.now().isoformat()
+                )], record, on_failed)
+                
+            elif self.storage_type == 'mongodb':
+                self._write_db('videos', [video_data], record, on_failed)
+                
+            self.logger.info(f"成功保存视频数据到{file_path}")
+            return True
+            
+        except Exception as e:
+            self.logger.error(f"保存视频数据失败: {str(e)}")
+            return False
+            
+    def save_user_data(self, user_data: Dict, storage_id: str = None,
+                        on_failed: Optional[Callable[[Exception], None]] = None):
+        """
+        保存用户数据
+        :param on_failed: 同save_video_data
+        """
+        try:
+            entity_id = storage_id or user_data.get("user_id", "unknown")
+            if self._unchanged('user', entity_id, user_data):
+                return True
+            # 写入数据库时以数据库写入成功为准更新指纹
+            record = self._delta_callback('user', entity_id, user_data)
+            in_db = self.storage_type in ('mysql', 'mongodb')
+            file_path = self._save_snapshot('user', entity_id, f'user_{entity_id}.json', user_data,
+                                            None if in_db else record, on_failed)
+            
+            if self.storage_type == 'mysql':
+                self._write_db('users', [(
+                    user_data.get('user_id'),
+                    user_data.get('username'),
+                    user_data.get('follower_count', 0),
+                    user_data.get('following_count', 0),
+                    user_data.get('video_count', 0),
+                    datetime.now().isoformat()
+                )], record, on_failed)
+                
+            elif self.storage_type == 'mongodb':
+                self._write_db('users', [user_data], record, on_failed)
+                
+            self.logger.info(f"成功保存用户数据到{file_path}")
+            return True
+            
+        except Exception as e:
+            self.logger.error(f"保存用户数据失败: {str(e)}")
+            return False
+            
+    def save_trending_videos(self, videos_data: List[Dict],
+                        on_failed: Optional[Callable[[Exception], None]] = None):
+        """
+        保存热门视频数据
+        :param on_failed: 同save_video_data
+        """
+        try:
+            captured_at = datetime.now().strftime("%Y%m%d_%H%M%S")
+            file_path = self._save_snapshot('trending', captured_at, f'trending_videos_{captured_at}.json', videos_data,
+                                           on_failed=on_failed)
+            
+            if self.storage_type == 'mysql':
+                timestamp = datetime.now().isoformat()
+                self._write_db('trending_videos', [(
+                    video.get('id'),
+                    video.get('title'),
+                    video.get('author'),
+                    video.get('play_count', 0),
+                    timestamp
+                ) for video in videos_data], on_failed=on_failed)
+                
+            elif self.storage_type == 'mongodb':
+                self._write_db('trending_videos', videos_data, on_failed=on_failed)
+                
+            self.logger.info(f"成功保存热门视频数据到{file_path}")
+            return True
+            
+        except Exception as e:
+            self.logger.error(f"保存热门视频数据失败: {str(e)}")
+            return False
+            
+    def save_hashtag_data(self, hashtag_data: Dict,
+                        on_failed: Optional[Callable[[Exception], None]] = None):
+        """
+        保存话题数据
+        :param on_failed: 同save_video_data
+        """
+        try:
+            hashtag = hashtag_data.get("hashtag", "unknown")
+            file_path = self._save_snapshot('hashtag', hashtag, f'hashtag_{hashtag}.json', hashtag_data,
+                                           on_failed=on_failed)
+            
+            if self.storage_type == 'mysql':
+                timestamp = datetime.now().isoformat()
+                self._write_db('hashtags', [(
+                    hashtag_data.get('hashtag'),
+                    hashtag_data.get('challenge_name'),
+                    hashtag_data.get('challenge_id'),
+                    timestamp
+                )], on_failed=on_failed)
+                
+                # 保存相关视频数据
+                self._write_db('hashtag_videos', [(
+                    hashtag_data.get('hashtag'),
+                    video.get('id'),
+                    video.get('title'),
+                    video.get('author'),
+                    video.get('play_count', 0),
+                    timestamp
+                ) for video in hashtag_data.get('videos', [])], on_failed=on_failed)
+                
+            elif self.storage_type == 'mongodb':
+                self._write_db('hashtags', [hashtag_data], on_failed=on_failed)
+                
+            self.logger.info(f"成功保存话题数据到{file_path}")
+            return True
+            
+        except Exception as e:
+            self.logger.error(f"保存话题数据失败: {str(e)}")
+            return False
+            
+    def store_data(self, data) -> bool:
+        """
+        按数据内容保存：列表为热门视频，含video_id为视频，含user_id为用户，含hashtag为话题
+        """
+        if isinstance(data, list):
+            return self.save_trending_videos(data)
+        if 'video_id' in data:
+            return self.save_video_data(data)
+        if 'user_id' in data:
+            return self.save_user_data(data)
+        if 'hashtag' in data:
+            return self.save_hashtag_data(data)
+        self.logger.error("无法识别的数据类型")
+        return False
+            
+    def load_from_file(self, file_path: str) -> Optional[Dict]:
+        """
+        从文件加载数据
+        """
+        if self.read_cache is None:
+            return self._read_file(file_path)
+        parsed = parse_file_name(os.path.basename(file_path))
+        return self.read_cache.get_or_load(parsed[0] if parsed else 'file', os.path.abspath(file_path),
+                                           lambda: self._read_file(file_path))
+            
+    def _read_file(self, file_path: str) -> Optional[Dict]:
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            self.logger.error(f"从文件加载数据失败: {str(e)}")
+            return None
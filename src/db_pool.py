@@ -0,0 +1,211 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Tuple
+import mysql.connector
+from mysql.connector import pooling
+from pymongo import MongoClient, monitoring
+
+logger = logging.getLogger(__name__)
+
+
+class PoolStats:
+    def __init__(self):
+        """
+        连接池的借出统计：借出次数、等待时间、超时和正在使用的连接数
+        """
+        self.lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.reconnects = 0
+        self.in_use = 0
+        self.wait_time = 0.0
+        self.max_wait = 0.0
+
+    def checked_out(self, wait: float):
+        with self.lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.wait_time += wait
+            self.max_wait = max(self.max_wait, wait)
+
+    def checked_in(self):
+        with self.lock:
+            self.in_use = max(self.in_use - 1, 0)
+
+    def timed_out(self):
+        with self.lock:
+            self.timeouts += 1
+
+    def reconnected(self):
+        with self.lock:
+            self.reconnects += 1
+
+    def snapshot(self) -> Dict:
+        with self.lock:
+            return {
+                'checkouts': self.checkouts,
+                'in_use': self.in_use,
+                'timeouts': self.timeouts,
+                'reconnects': self.reconnects,
+                'avg_wait_ms': self.wait_time / self.checkouts * 1000 if self.checkouts else 0.0,
+                'max_wait_ms': self.max_wait * 1000
+            }
+
+
+class MySQLPool:
+    def __init__(self, config: Dict, pool_size: int = 8, checkout_timeout: float = 10.0,
+                 reconnect_attempts: int = 3, reconnect_delay: float = 0.5, pool_name: str = 'douyin'):
+        """
+        MySQL连接池
+        mysql.connector的连接池在连接耗尽时直接报错，这里用信号量让借出方最多等待checkout_timeout秒；
+        连接池在借出时检查连接是否存活并自动重连，重连失败时按reconnect_delay退避重试
+        :param pool_size: 连接数，mysql.connector限制最多32
+        """
+        self.pool_size = pool_size
+        self.checkout_timeout = checkout_timeout
+        self.reconnect_attempts = reconnect_attempts
+        self.reconnect_delay = reconnect_delay
+        self.slots = threading.BoundedSemaphore(pool_size)
+        self.stats = PoolStats()
+        self.pool = pooling.MySQLConnectionPool(
+            pool_name=pool_name,
+            pool_size=pool_size,
+            pool_reset_session=True,
+            host=config.get('host', 'localhost'),
+            port=config.get('port', 3306),
+            user=config.get('user', 'root'),
+            password=config.get('password', ''),
+            database=config.get('database', 'douyin_data'),
+            connection_timeout=config.get('connect_timeout', 10)
+        )
+
+    def _get_connection(self):
+        for attempt in range(self.reconnect_attempts):
+            try:
+                return self.pool.get_connection()
+            except (mysql.connector.InterfaceError, mysql.connector.OperationalError) as e:
+                # 借出时检测到连接失效且重连失败，连接已放回池中，稍后重试
+                if attempt == self.reconnect_attempts - 1:
+                    raise
+                self.stats.reconnected()
+                logger.warning(f"MySQL连接失效，{self.reconnect_delay * (attempt + 1):.1f} 秒后重连: {str(e)}")
+                time.sleep(self.reconnect_delay * (attempt + 1))
+
+    @contextmanager
+    def connection(self):
+        """
+        借出一个连接，退出时回滚未提交的事务并归还
+        """
+        start = time.perf_counter()
+        if not self.slots.acquire(timeout=self.checkout_timeout):
+            self.stats.timed_out()
+            raise TimeoutError(f"等待MySQL连接超过 {self.checkout_timeout} 秒")
+        try:
+            connection = self._get_connection()
+        except Exception:
+            self.slots.release()
+            raise
+        self.stats.checked_out(time.perf_counter() - start)
+        try:
+            yield connection
+        except Exception:
+            try:
+                connection.rollback()
+            except mysql.connector.Error:
+                pass
+            raise
+        finally:
+            connection.close()
+            self.stats.checked_in()
+            self.slots.release()
+
+    def ping(self) -> bool:
+        """
+        健康检查：借出一个连接执行SELECT 1
+        """
+        try:
+            with self.connection() as connection:
+                cursor = connection.cursor()
+                cursor.execute("SELECT 1")
+                cursor.fetchall()
+                cursor.close()
+            return True
+        except Exception as e:
+            logger.error(f"MySQL健康检查失败: {str(e)}")
+            return False
+
+    def get_stats(self) -> Dict:
+        stats = self.stats.snapshot()
+        stats['size'] = self.pool_size
+        return stats
+
+    def close(self):
+        self.pool._remove_connections()
+
+
+class MongoPoolListener(monitoring.ConnectionPoolListener):
+    def __init__(self):
+        """
+        通过pymongo的连接池事件统计借出等待时间
+        """
+        self.stats = PoolStats()
+        self.local = threading.local()
+
+    def connection_check_out_started(self, event):
+        self.local.started = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        self.stats.checked_out(time.perf_counter() - getattr(self.local, 'started', time.perf_counter()))
+
+    def connection_check_out_failed(self, event):
+        if event.reason == monitoring.ConnectionCheckOutFailedReason.TIMEOUT:
+            self.stats.timed_out()
+
+    def connection_checked_in(self, event):
+        self.stats.checked_in()
+
+    def pool_cleared(self, event):
+        # 服务器检测失败时连接池被清空，之后的借出会重新建立连接
+        self.stats.reconnected()
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        pass
+
+
+def create_mongo_client(config: Dict) -> Tuple[MongoClient, MongoPoolListener]:
+    """
+    创建带连接池参数和借出统计的MongoClient
+    MongoClient本身线程安全，连接池由所有线程共享，每次操作时借出连接
+    """
+    listener = MongoPoolListener()
+    client = MongoClient(
+        host=config.get('host', 'localhost'),
+        port=config.get('port', 27017),
+        maxPoolSize=config.get('pool_size', 50),
+        minPoolSize=config.get('min_pool_size', 0),
+        maxIdleTimeMS=int(config.get('max_idle_time', 300) * 1000),
+        waitQueueTimeoutMS=int(config.get('pool_timeout', 10) * 1000),
+        serverSelectionTimeoutMS=int(config.get('server_selection_timeout', 10) * 1000),
+        heartbeatFrequencyMS=int(config.get('health_check_interval', 10) * 1000),
+        retryWrites=True,
+        retryReads=True,
+        event_listeners=[listener]
+    )
+    return client, listener
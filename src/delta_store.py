@@ -0,0 +1,281 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# 不参与变化判断的字段
+IGNORED_FIELDS = ('timestamp',)
+
+
+def _to_epoch(value: Union[float, int, str, datetime, None]) -> Optional[float]:
+    if value is None or isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.timestamp()
+
+
+class DeltaStore:
+    def __init__(self, path: str = 'data/deltas.sqlite', base_interval: int = 20,
+                 ignored_fields: Iterable[str] = IGNORED_FIELDS, keep_history: bool = True):
+        """
+        变化检测的增量快照存储
+        每个对象保存最后一次状态的指纹，内容未变化的记录直接跳过；变化的记录只保存变化的字段，
+        每累积base_interval个增量保存一次完整的基准快照，按时间点读取时从最近的基准快照依次应用增量
+        :param base_interval: 两个基准快照之间最多的增量数
+        :param ignored_fields: 不参与变化判断、也不保存的字段（如抓取时间戳）
+        :param keep_history: 为False时只保存指纹用于变化检测，不保存状态和增量，
+                             用于本身已保存每次快照的存储（日志、Parquet、MySQL），避免同一份历史保存两次
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.base_interval = base_interval
+        self.keep_history = keep_history
+        self.ignored_fields = set(ignored_fields)
+        self.lock = threading.Lock()
+        self.counts = {'unchanged': 0, 'delta': 0, 'base': 0, 'changed': 0}
+        self.full_bytes = 0
+        self.stored_bytes = 0
+
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS latest (
+                kind TEXT,
+                entity_id TEXT,
+                fingerprint BLOB,
+                state TEXT,
+                deltas_since_base INTEGER,
+                captured_at REAL,
+                checked_at REAL,
+                PRIMARY KEY (kind, entity_id)
+            ) WITHOUT ROWID
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS snapshots (
+                kind TEXT,
+                entity_id TEXT,
+                captured_at REAL,
+                is_base INTEGER,
+                payload TEXT
+            )
+        """)
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_snapshots_entity ON snapshots (kind, entity_id, captured_at)"
+        )
+        self.conn.commit()
+
+    def _state(self, record: Dict) -> Dict:
+        return {name: value for name, value in record.items() if name not in self.ignored_fields}
+
+    @staticmethod
+    def _encode(value) -> str:
+        return json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+
+    @staticmethod
+    def fingerprint(encoded_state: str) -> bytes:
+        return hashlib.blake2b(encoded_state.encode('utf-8'), digest_size=8).digest()
+
+    def put(self, kind: str, entity_id: str, record: Dict, captured_at=None) -> str:
+        """
+        记录一次抓取结果
+        :return: unchanged（内容未变化，未写入）、delta（写入增量）、base（写入基准快照）
+                 或 changed（不保存历史时，只更新了指纹）
+        """
+        entity_id = str(entity_id)
+        captured_at = _to_epoch(captured_at) or time.time()
+        state = self._state(record)
+        encoded = self._encode(state)
+        fingerprint = self.fingerprint(encoded)
+
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT fingerprint, state, deltas_since_base FROM latest WHERE kind = ? AND entity_id = ?",
+                (kind, entity_id)
+            ).fetchone()
+            self.full_bytes += len(encoded)
+            if row is not None and row[0] == fingerprint:
+                self.conn.execute(
+                    "UPDATE latest SET checked_at = ? WHERE kind = ? AND entity_id = ?",
+                    (captured_at, kind, entity_id)
+                )
+                self.conn.commit()
+                self.counts['unchanged'] += 1
+                return 'unchanged'
+
+            if not self.keep_history:
+                self.conn.execute("""
+                    INSERT OR REPLACE INTO latest
+                        (kind, entity_id, fingerprint, state, deltas_since_base, captured_at, checked_at)
+                    VALUES (?, ?, ?, NULL, 0, ?, ?)
+                """, (kind, entity_id, fingerprint, captured_at, captured_at))
+                self.conn.commit()
+                self.counts['changed'] += 1
+                return 'changed'
+
+            # 之前不保存历史的对象没有上一次的状态，从基准快照开始
+            if row is None or row[1] is None or row[2] + 1 >= self.base_interval:
+                result, payload, deltas_since_base = 'base', encoded, 0
+            else:
+                previous = json.loads(row[1])
+                delta = {
+                    'set': {name: value for name, value in state.items()
+                            if name not in previous or previous[name] != value},
+                    'unset': [name for name in previous if name not in state]
+                }
+                result, payload, deltas_since_base = 'delta', self._encode(delta), row[2] + 1
+
+            self.conn.execute(
+                "INSERT INTO snapshots (kind, entity_id, captured_at, is_base, payload) VALUES (?, ?, ?, ?, ?)",
+                (kind, entity_id, captured_at, result == 'base', payload)
+            )
+            self.conn.execute("""
+                INSERT OR REPLACE INTO latest
+                    (kind, entity_id, fingerprint, state, deltas_since_base, captured_at, checked_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (kind, entity_id, fingerprint, encoded, deltas_since_base, captured_at, captured_at))
+            self.conn.commit()
+            self.counts[result] += 1
+            self.stored_bytes += len(payload)
+            return result
+
+    def is_unchanged(self, kind: str, entity_id: str, record: Dict) -> bool:
+        """
+        只比较指纹，不写入；未变化的记录计入统计
+        """
+        encoded = self._encode(self._state(record))
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT fingerprint FROM latest WHERE kind = ? AND entity_id = ?", (kind, str(entity_id))
+            ).fetchone()
+            unchanged = row is not None and row[0] == self.fingerprint(encoded)
+            if unchanged:
+                self.counts['unchanged'] += 1
+                self.full_bytes += len(encoded)
+            return unchanged
+
+    def _replay(self, kind: str, entity_id: str, start=None, end=None) -> Iterator[Tuple[float, Dict]]:
+        """
+        从不晚于start的最近基准快照开始依次应用增量，产出 (抓取时间, 完整状态)
+        """
+        entity_id = str(entity_id)
+        start, end = _to_epoch(start), _to_epoch(end)
+        with self.lock:
+            anchor = start if start is not None else end
+            base = None
+            if anchor is not None:
+                base = self.conn.execute(
+                    "SELECT MAX(captured_at) FROM snapshots "
+                    "WHERE kind = ? AND entity_id = ? AND is_base = 1 AND captured_at <= ?",
+                    (kind, entity_id, anchor)
+                ).fetchone()[0]
+            if base is None:
+                # 未指定时间或时间点早于第一个基准快照时从头开始
+                base = self.conn.execute(
+                    "SELECT MIN(captured_at) FROM snapshots WHERE kind = ? AND entity_id = ? AND is_base = 1",
+                    (kind, entity_id)
+                ).fetchone()[0]
+            if base is None:
+                return
+            sql = ("SELECT captured_at, is_base, payload FROM snapshots "
+                   "WHERE kind = ? AND entity_id = ? AND captured_at >= ?")
+            params = [kind, entity_id, base]
+            if end is not None:
+                sql += " AND captured_at <= ?"
+                params.append(end)
+            rows = self.conn.execute(sql + " ORDER BY captured_at, rowid", params).fetchall()
+
+        state: Dict = {}
+        for captured_at, is_base, payload in rows:
+            data = json.loads(payload)
+            if is_base:
+                state = data
+            else:
+                state = dict(state)
+                state.update(data['set'])
+                for name in data['unset']:
+                    state.pop(name, None)
+            yield captured_at, state
+
+    def get_state(self, kind: str, entity_id: str, at=None) -> Optional[Dict]:
+        """
+        重建对象在指定时间点（默认最新）的完整状态
+        :param at: 时间戳、ISO格式字符串或datetime
+        """
+        if at is None:
+            with self.lock:
+                row = self.conn.execute(
+                    "SELECT state FROM latest WHERE kind = ? AND entity_id = ?", (kind, str(entity_id))
+                ).fetchone()
+            return json.loads(row[0]) if row and row[0] is not None else None
+        state = None
+        for _, state in self._replay(kind, entity_id, end=at):
+            pass
+        return state
+
+    def history(self, kind: str, entity_id: str, start=None, end=None) -> Iterator[Tuple[float, Dict]]:
+        """
+        产出时间范围内每次变化后的完整状态
+        """
+        start_epoch = _to_epoch(start)
+        previous = None
+        for captured_at, state in self._replay(kind, entity_id, start, end):
+            if start_epoch is not None and captured_at < start_epoch:
+                previous = (captured_at, state)
+                continue
+            if previous is not None:
+                # 范围开始时的状态
+                yield previous
+                previous = None
+            yield captured_at, state
+        if previous is not None:
+            yield previous
+
+    def stats(self) -> Dict:
+        with self.lock:
+            snapshots = self.conn.execute("SELECT COUNT(*) FROM snapshots").fetchone()[0]
+            return {
+                'written': dict(self.counts),
+                'snapshots': snapshots,
+                'bytes_received': self.full_bytes,
+                'bytes_stored': self.stored_bytes,
+                'compression_ratio': self.full_bytes / self.stored_bytes if self.stored_bytes else 0.0
+            }
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='按时间点重建对象状态')
+    parser.add_argument('path', help='增量存储数据库路径')
+    parser.add_argument('kind', choices=['video', 'user'], help='对象类型')
+    parser.add_argument('entity_id', help='对象ID')
+    parser.add_argument('--at', type=str, default=None, help='时间点（ISO格式），默认最新')
+    parser.add_argument('--history', action='store_true', help='输出全部变化历史')
+    args = parser.parse_args()
+
+    store = DeltaStore(args.path)
+    try:
+        if args.history:
+            for captured_at, state in store.history(args.kind, args.entity_id, end=args.at):
+                print(datetime.fromtimestamp(captured_at).isoformat(), json.dumps(state, ensure_ascii=False))
+        else:
+            print(json.dumps(store.get_state(args.kind, args.entity_id, args.at), ensure_ascii=False, indent=2))
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+import argparse
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 文件名前缀对应的快照类型，较长的前缀在前
+FILE_KINDS = (
+    ('trending_videos_', 'trending'),
+    ('video_', 'video'),
+    ('user_', 'user'),
+    ('hashtag_', 'hashtag'),
+)
+
+# 标题中的话题
+HASHTAG_PATTERN = re.compile(r'#([^\s#]+)')
+
+
+def parse_file_name(file_name: str) -> Optional[Tuple[str, str]]:
+    """
+    从快照文件名解析 (快照类型, 对象ID)，不是快照文件时返回None
+    """
+    if not file_name.endswith('.json'):
+        return None
+    stem = file_name[:-len('.json')]
+    for prefix, kind in FILE_KINDS:
+        if stem.startswith(prefix):
+            return kind, stem[len(prefix):]
+    return None
+
+
+def _to_epoch(value, default: Optional[float]) -> Optional[float]:
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        for parse in (datetime.fromisoformat, lambda text: datetime.strptime(text, '%Y%m%d_%H%M%S')):
+            try:
+                return parse(value).timestamp()
+            except ValueError:
+                continue
+    return default
+
+
+def _video_rows(file_name: str, video: Dict, video_id, captured_at: float):
+    entry = (file_name, 'video', str(video_id), video.get('author'), captured_at)
+    tags = [(tag, str(video_id), file_name) for tag in HASHTAG_PATTERN.findall(video.get('title') or '')]
+    return entry, tags
+
+
+def index_rows(file_name: str, kind: str, entity_id: str, data, captured_at: float) -> Tuple[List, List]:
+    """
+    把一个快照文件展开为索引行
+    视频和用户文件各一行；热门和话题文件中列出的每个视频各一行（类型为video，文件为所在的列表文件），
+    话题文件本身另有一行。话题取自话题文件和视频标题中的#话题
+    :return: (entries行列表, tags行列表)
+    """
+    entries, tags = [], []
+    if kind == 'video':
+        entry, video_tags = _video_rows(file_name, data, entity_id, captured_at)
+        entries.append(entry)
+        tags.extend(video_tags)
+    elif kind == 'user':
+        entries.append((file_name, 'user', entity_id, None, captured_at))
+    elif kind in ('trending', 'hashtag'):
+        videos = data if kind == 'trending' else data.get('videos', [])
+        if kind == 'hashtag':
+            entries.append((file_name, 'hashtag', entity_id, None, captured_at))
+            tags.append((entity_id, entity_id, file_name))
+        for video in videos:
+            if not isinstance(video, dict) or video.get('id') is None:
+                continue
+            entry, video_tags = _video_rows(file_name, video, video['id'], captured_at)
+            entries.append(entry)
+            tags.extend(video_tags)
+            if kind == 'hashtag':
+                tags.append((entity_id, entry[2], file_name))
+    # 同一文件中重复出现的视频只保留一行
+    return list({entry[:3]: entry for entry in entries}.values()), list(set(tags))
+
+
+class FileIndex:
+    def __init__(self, path: str):
+        """
+        文件存储的二级索引，保存在数据目录旁的SQLite文件中
+        每次保存快照文件时增量更新，按作者、话题、ID前缀和抓取时间查询时无需遍历目录和读取JSON
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                file_name TEXT,
+                kind TEXT,
+                entity_id TEXT,
+                author TEXT,
+                captured_at REAL,
+                PRIMARY KEY (file_name, kind, entity_id)
+            ) WITHOUT ROWID
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS tags (
+                hashtag TEXT,
+                entity_id TEXT,
+                file_name TEXT,
+                PRIMARY KEY (hashtag, entity_id, file_name)
+            ) WITHOUT ROWID
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_entity ON entries (entity_id, kind)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_author ON entries (author, captured_at)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_captured_at ON entries (captured_at)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_tags_file ON tags (file_name)")
+        self.conn.commit()
+
+    def _replace(self, file_name: str, entries: List, tags: List):
+        self.conn.execute("DELETE FROM entries WHERE file_name = ?", (file_name,))
+        self.conn.execute("DELETE FROM tags WHERE file_name = ?", (file_name,))
+        self.conn.executemany("INSERT INTO entries VALUES (?, ?, ?, ?, ?)", entries)
+        self.conn.executemany("INSERT INTO tags VALUES (?, ?, ?)", tags)
+
+    def update(self, file_name: str, kind: str, entity_id: str, data, captured_at=None):
+        """
+        快照文件写入后更新索引，同名文件被覆盖时替换原有的索引行
+        :param captured_at: 抓取时间，默认取数据中的timestamp，没有时取当前时间
+        """
+        default = _to_epoch(captured_at, time.time())
+        if isinstance(data, dict):
+            default = _to_epoch(data.get('timestamp'), default)
+        entries, tags = index_rows(file_name, kind, str(entity_id), data, default)
+        with self.lock:
+            with self.conn:
+                self._replace(file_name, entries, tags)
+
+    def remove(self, file_name: str):
+        with self.lock:
+            with self.conn:
+                self._replace(file_name, [], [])
+
+    def rebuild(self, storage_path: str) -> int:
+        """
+        清空索引后重新扫描数据目录中的全部快照文件，用于已有数据目录或索引损坏时
+        :return: 索引的文件数
+        """
+        count = 0
+        with self.lock:
+            with self.conn:
+                self.conn.execute("DELETE FROM entries")
+                self.conn.execute("DELETE FROM tags")
+                for entry in os.scandir(storage_path):
+                    parsed = parse_file_name(entry.name)
+                    if parsed is None or not entry.is_file():
+                        continue
+                    kind, entity_id = parsed
+                    try:
+                        with open(entry.path, 'r', encoding='utf-8') as f:
+                            data = json.load(f)
+                    except (OSError, ValueError) as e:
+                        logger.warning(f"跳过无法读取的文件 {entry.name}: {str(e)}")
+                        continue
+                    # 热门视频文件名中带有抓取时间，其他文件没有timestamp时取修改时间
+                    default = _to_epoch(entity_id, entry.stat().st_mtime) if kind == 'trending' else entry.stat().st_mtime
+                    if isinstance(data, dict):
+                        default = _to_epoch(data.get('timestamp'), default)
+                    entries, tags = index_rows(entry.name, kind, entity_id, data, default)
+                    self._replace(entry.name, entries, tags)
+                    count += 1
+        logger.info(f"索引重建完成，共 {count} 个文件")
+        return count
+
+    def find(self, kind: Optional[str] = None, author: Optional[str] = None, hashtag: Optional[str] = None,
+             id_prefix: Optional[str] = None, start=None, end=None, limit: Optional[int] = None) -> List[Dict]:
+        """
+        按条件组合查询，按抓取时间倒序返回匹配的 {file, kind, id, author, captured_at}
+        :param kind: video, user 或 hashtag；热门和话题文件中列出的视频类型也是video
+        :param start: 抓取时间下限，时间戳、ISO格式字符串或datetime
+        """
+        sql = "SELECT DISTINCT e.file_name, e.kind, e.entity_id, e.author, e.captured_at FROM entries e"
+        conditions, params = [], []
+        if hashtag is not None:
+            sql += " JOIN tags t ON t.file_name = e.file_name AND t.entity_id = e.entity_id"
+            conditions.append("t.hashtag = ?")
+            params.append(hashtag.lstrip('#'))
+        if kind is not None:
+            conditions.append("e.kind = ?")
+            params.append(kind)
+        if author is not None:
+            conditions.append("e.author = ?")
+            params.append(author)
+        if id_prefix:
+            # 用范围条件代替LIKE，可以使用entity_id索引
+            conditions.append("e.entity_id >= ? AND e.entity_id < ?")
+            params += [id_prefix, id_prefix + '\U0010ffff']
+        for operator, value in (('>=', start), ('<=', end)):
+            if value is None:
+                continue
+            epoch = _to_epoch(value, None)
+            if epoch is None:
+                raise ValueError(f"无法解析的时间：{value}")
+            conditions.append(f"e.captured_at {operator} ?")
+            params.append(epoch)
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY e.captured_at DESC"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        with self.lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        return [{'file': file_name, 'kind': kind, 'id': entity_id, 'author': author, 'captured_at': captured_at}
+                for file_name, kind, entity_id, author, captured_at in rows]
+
+    def stats(self) -> Dict:
+        with self.lock:
+            return {
+                'files': self.conn.execute("SELECT COUNT(DISTINCT file_name) FROM entries").fetchone()[0],
+                'entries': self.conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0],
+                'hashtags': self.conn.execute("SELECT COUNT(DISTINCT hashtag) FROM tags").fetchone()[0]
+            }
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='文件存储的二级索引：重建和查询')
+    parser.add_argument('storage_path', help='数据目录')
+    parser.add_argument('--index', type=str, default=None, help='索引文件路径，默认为数据目录下的index.sqlite')
+    parser.add_argument('--rebuild', action='store_true', help='重新扫描数据目录重建索引')
+    parser.add_argument('--kind', type=str, default=None, choices=['video', 'user', 'hashtag'])
+    parser.add_argument('--author', type=str, default=None, help='作者')
+    parser.add_argument('--hashtag', type=str, default=None, help='话题')
+    parser.add_argument('--prefix', type=str, default=None, help='对象ID前缀')
+    parser.add_argument('--start', type=str, default=None, help='抓取时间下限（ISO格式）')
+    parser.add_argument('--end', type=str, default=None, help='抓取时间上限（ISO格式）')
+    parser.add_argument('--limit', type=int, default=100, help='最多输出的条数')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    index = FileIndex(args.index or os.path.join(args.storage_path, 'index.sqlite'))
+    try:
+        if args.rebuild:
+            index.rebuild(args.storage_path)
+            print(json.dumps(index.stats(), ensure_ascii=False))
+        if any(value is not None for value in (args.kind, args.author, args.hashtag, args.prefix,
+                                               args.start, args.end)):
+            for row in index.find(args.kind, args.author, args.hashtag, args.prefix, args.start, args.end,
+                                  args.limit):
+                row['captured_at'] = datetime.fromtimestamp(row['captured_at']).isoformat()
+                print(json.dumps(row, ensure_ascii=False))
+    finally:
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,64 +1,86 @@
-from flask import Flask, jsonify, request, render_template
-import json
-from datetime import *
-from ai import AIAnalyzer
-from data_getter import DataGetter
-from data_storage import DataStorage
-
-app = Flask(__name__)
-app.secret_key = "DouYin-Ai-Secret-Key-as1f5184fsa"
-
-# Initialize data components
-data_getter = DataGetter()
-data_storage = DataStorage()
-
-@app.route('/')
-def home():
-    return render_template('index.html')
-
-@app.route('/health', methods=['GET'])
-def health_check():
-    return jsonify({'status': 'ok', 'timestamp': datetime.datetime.now().isoformat()})
-
-@app.route('/data', methods=['POST'])
-def get_data():
-    params = request.json
-    if not params:
-        return jsonify({'error': 'No parameters provided'}), 400
-    
-    data = data_getter.get_data(params)
-    if data:
-        return jsonify(data), 200
-    else:
-        return jsonify({'error': 'Failed to retrieve data'}), 500
-
-@app.route('/analyze', methods=['POST'])
-def analyze():
-    data = request.json
-    if not data:
-        return jsonify({'error': 'No data provided'}), 400
-    
-    account_id = data.get('account_id')
-    if not account_id:
-        return jsonify({'error': 'Account ID is required'}), 400
-
-    result = AIAnalyzer.analyze_account(account_id)
-    if result:
-        return jsonify(result), 200
-    else:
-        return jsonify({'error': 'Failed to analyze account'}), 500
-
-@app.route('/storage', methods=['POST'])
-def store_data():
-    data = request.json
-    if not data:
-        return jsonify({'error': 'No data provided'}), 400
-    
-    result = data_storage.store_data(data)
-    if result:
-        return jsonify({'message': 'Data stored successfully'}), 200
-    else:
-        return jsonify({'error': 'Failed to store data'}), 500
-
-if __name__ == '__main__':
-    app.run(debug=True)
+from flask import Flask, jsonify, request, render_template
+import json
+import os
+from datetime import *
+from ai import AIAnalyzer
+from data_getter import DataGetter
+from data_storage import DataStorage
+
+app = Flask(__name__)
+app.secret_key = "DouYin-Ai-Secret-Key-as1f5184fsa"
+
+# Initialize data components
+# 存储类型和数据库配置通过环境变量指定；数据库连接由连接池管理，所有请求线程共享同一个DataStorage，
+# 每个请求写入时借出自己的连接。READ_CACHE_MB为读取缓存的内存预算，设为0时不启用
+def create_data_storage():
+    storage_type = os.environ.get('STORAGE_TYPE', 'file')
+    storage_config = None
+    if os.environ.get('STORAGE_CONFIG'):
+        with open(os.environ['STORAGE_CONFIG'], 'r', encoding='utf-8') as f:
+            storage_config = json.load(f)
+    cache_mb = float(os.environ.get('READ_CACHE_MB', 64))
+    return DataStorage(storage_type=storage_type, db_config=storage_config,
+                       read_cache={'max_mb': cache_mb} if cache_mb > 0 else None)
+
+data_getter = DataGetter()
+data_storage = create_data_storage()
+
+@app.route('/')
+def home():
+    return render_template('index.html')
+
+@app.route('/health', methods=['GET'])
+def health_check():
+    if not data_storage.ping():
+        return jsonify({'status': 'storage unavailable', 'timestamp': datetime.now().isoformat()}), 503
+    return jsonify({'status': 'ok', 'timestamp': datetime.now().isoformat()})
+
+@app.route('/data', methods=['POST'])
+def get_data():
+    params = request.json
+    if not params:
+        return jsonify({'error': 'No parameters provided'}), 400
+    
+    data = data_getter.get_data(params)
+    if data:
+        return jsonify(data), 200
+    else:
+        return jsonify({'error': 'Failed to retrieve data'}), 500
+
+@app.route('/stats', methods=['GET'])
+def get_stats():
+    stats = data_getter.get_stats()
+    stats['storage_pool'] = data_storage.get_pool_stats()
+    stats['read_cache'] = data_storage.get_cache_stats()
+    return jsonify(stats), 200
+
+@app.route('/analyze', methods=['POST'])
+def analyze():
+    data = request.json
+    if not data:
+        return jsonify({'error': 'No data provided'}), 400
+    
+    account_id = data.get('account_id')
+    if not account_id:
+        return jsonify({'error': 'Account ID is required'}), 400
+
+    result = AIAnalyzer.analyze_account(account_id)
+    if result:
+        return jsonify(result), 200
+    else:
+        return jsonify({'error': 'Failed to analyze account'}), 500
+
+@app.route('/storage', methods=['POST'])
+def store_data():
+    data = request.json
+    if not data:
+        return jsonify({'error': 'No data provided'}), 400
+    
+    result = data_storage.store_data(data)
+    if result:
+        return jsonify({'message': 'Data stored successfully'}), 200
+    else:
+        return jsonify({'error': 'Failed to store data'}), 500
+
+if __name__ == '__main__':
+    app.run(debug=True)
@@ -0,0 +1,457 @@
+from html.parser import HTMLParser
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+class ExtractionError(ValueError):
+    pass
+
+
+def to_int(text: str) -> int:
+    return int(text.strip().replace(',', ''))
+
+
+class Field:
+    def __init__(self, name: str, tag: str, attrs: Optional[Dict[str, str]] = None,
+                 within: Optional[Tuple[str, Dict[str, str]]] = None, index: int = 0,
+                 attr: Optional[str] = None, convert: Optional[Callable[[str], Any]] = None,
+                 default: Any = None, required: bool = True):
+        """
+        声明式字段抽取规则
+        :param tag: 目标元素标签
+        :param attrs: 目标元素需要匹配的属性，class按空格分隔的单个类名匹配
+        :param within: 祖先元素约束 (标签, 属性)
+        :param index: 取第几个匹配的元素（从0开始）
+        :param attr: 取属性值而不是文本，属性不存在时使用default
+        :param convert: 对抽取到的字符串做类型转换
+        """
+        self.name = name
+        self.tag = tag
+        self.attrs = attrs or {}
+        self.within = within
+        self.index = index
+        self.attr = attr
+        self.convert = convert
+        self.default = default
+        self.required = required
+
+
+def _match(tag: str, attrs: Dict[str, str], want_tag: str, want_attrs: Dict[str, str]) -> bool:
+    if tag != want_tag:
+        return False
+    for key, value in want_attrs.items():
+        actual = attrs.get(key)
+        if actual is None:
+            return False
+        if key == 'class':
+            if value not in actual.split():
+                return False
+        elif actual != value:
+            return False
+    return True
+
+
+def _field_value(field: Field, raw: Optional[str]) -> Any:
+    if raw is None:
+        return field.default
+    return field.convert(raw) if field.convert else raw
+
+
+def css_selector(field: Field) -> str:
+    """
+    把字段规则编译为CSS选择器，class按空格分隔的单个类名匹配（~=）
+    """
+    def compound(tag: str, attrs: Dict[str, str]) -> str:
+        parts = [tag]
+        for key, value in attrs.items():
+            escaped = value.replace('\\', '\\\\').replace('"', '\\"')
+            parts.append(f'[{key}~="{escaped}"]' if key == 'class' else f'[{key}="{escaped}"]')
+        return ''.join(parts)
+
+    selector = compound(field.tag, field.attrs)
+    if field.within:
+        selector = f'{compound(*field.within)} {selector}'
+    return selector
+
+
+def _xpath_literal(value: str) -> str:
+    if '"' not in value:
+        return f'"{value}"'
+    if "'" not in value:
+        return f"'{value}'"
+    return 'concat(' + ', \'"\', '.join(f'"{part}"' for part in value.split('"')) + ')'
+
+
+def xpath_selector(field: Field) -> str:
+    """
+    把字段规则编译为XPath表达式，直接取第index个匹配的元素
+    """
+    def step(tag: str, attrs: Dict[str, str]) -> str:
+        predicates = []
+        for key, value in attrs.items():
+            if key == 'class':
+                predicates.append(f"contains(concat(' ', normalize-space(@class), ' '), "
+                                  f"{_xpath_literal(f' {value} ')})")
+            else:
+                predicates.append(f'@{key}={_xpath_literal(value)}')
+        return f"//{tag}{''.join(f'[{predicate}]' for predicate in predicates)}"
+
+    path = step(field.tag, field.attrs)
+    if field.within:
+        path = step(*field.within) + path
+    return f'({path})[{field.index + 1}]'
+
+
+class PageSpec:
+    def __init__(self, name: str, fields: List[Field]):
+        """
+        页面抽取规范，所有字段在一次文档遍历中同时抽取
+        """
+        self.name = name
+        self.fields = fields
+
+
+# 视频详情页
+VIDEO_PAGE_SPEC = PageSpec('video', [
+    Field('title', 'title', convert=str.strip),
+    Field('author', 'meta', {'name': 'author'}, attr='content', default=''),
+    Field('likes', 'span', {'id': 'like-count'}, convert=to_int),
+    Field('comments', 'span', {'id': 'comment-count'}, convert=to_int),
+    Field('shares', 'span', {'id': 'share-count'}, convert=to_int),
+])
+
+# 用户主页
+USER_PAGE_SPEC = PageSpec('user', [
+    Field('username', 'title', convert=str.strip),
+    Field('follower_count', 'span', within=('div', {'class': 'profile-follow-info'}), index=0, convert=to_int),
+    Field('following_count', 'span', within=('div', {'class': 'profile-follow-info'}), index=1, convert=to_int),
+    Field('video_count', 'span', within=('div', {'class': 'profile-video-info'}), index=0, convert=to_int),
+])
+
+
+class _Extractor:
+    """
+    基于start/text/end事件的单遍抽取器，供不构建文档树的流式后端使用
+    """
+
+    def __init__(self, spec: PageSpec):
+        self.spec = spec
+        self.pending = list(spec.fields)
+        self.pending_tags = {field.tag for field in spec.fields}
+        self.counts = {field.name: 0 for field in spec.fields}
+        self.values: Dict[str, Any] = {}
+        self.stack: List[Tuple[str, Dict[str, str]]] = []
+        # 正在收集文本的字段: (字段, 元素所在的栈深度, 文本片段)
+        self.capturing: List[Tuple[Field, int, List[str]]] = []
+
+    @property
+    def done(self) -> bool:
+        return not self.pending and not self.capturing
+
+    def _inside(self, within: Tuple[str, Dict[str, str]], depth: int) -> bool:
+        tag, attrs = within
+        return any(_match(open_tag, open_attrs, tag, attrs) for open_tag, open_attrs in self.stack[:depth])
+
+    def start(self, tag: str, attrs: Dict[str, str], void: bool = False):
+        depth = len(self.stack)
+        if not void:
+            self.stack.append((tag, attrs))
+        if tag not in self.pending_tags:
+            return
+        for field in list(self.pending):
+            if not _match(tag, attrs, field.tag, field.attrs):
+                continue
+            if field.within and not self._inside(field.within, depth):
+                continue
+            count = self.counts[field.name]
+            self.counts[field.name] = count + 1
+            if count != field.index:
+                continue
+            self.pending.remove(field)
+            if field.attr:
+                self._set(field, attrs.get(field.attr))
+            elif void:
+                self._set(field, '')
+            else:
+                self.capturing.append((field, depth, []))
+        self.pending_tags = {field.tag for field in self.pending}
+
+    def text(self, data: str):
+        for _, _, parts in self.capturing:
+            parts.append(data)
+
+    def end(self, tag: str):
+        # 容错处理未闭合的标签：弹出到最近的同名标签
+        for position in range(len(self.stack) - 1, -1, -1):
+            if self.stack[position][0] == tag:
+                del self.stack[position:]
+                break
+        else:
+            return
+        depth = len(self.stack)
+        still_capturing = []
+        for field, field_depth, parts in self.capturing:
+            if field_depth >= depth:
+                self._set(field, ''.join(parts))
+            else:
+                still_capturing.append((field, field_depth, parts))
+        self.capturing = still_capturing
+
+    def _set(self, field: Field, raw: Optional[str]):
+        self.values[field.name] = _field_value(field, raw)
+
+    def result(self) -> Dict[str, Any]:
+        for field, _, parts in self.capturing:
+            self._set(field, ''.join(parts))
+        self.capturing = []
+        missing = [field.name for field in self.pending if field.required]
+        if missing:
+            raise ExtractionError(f"{self.spec.name}页面缺少字段: {', '.join(missing)}")
+        for field in self.pending:
+            self.values[field.name] = field.default
+        return self.values
+
+
+VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta',
+             'param', 'source', 'track', 'wbr'}
+
+
+class _StopParsing(Exception):
+    pass
+
+
+class _StreamingHTMLParser(HTMLParser):
+    def __init__(self, extractor: _Extractor):
+        super().__init__(convert_charrefs=True)
+        self.extractor = extractor
+
+    def handle_starttag(self, tag, attrs):
+        self.extractor.start(tag, {key: value or '' for key, value in attrs}, void=tag in VOID_TAGS)
+        if self.extractor.done:
+            raise _StopParsing()
+
+    def handle_startendtag(self, tag, attrs):
+        self.extractor.start(tag, {key: value or '' for key, value in attrs}, void=True)
+        if self.extractor.done:
+            raise _StopParsing()
+
+    def handle_data(self, data):
+        self.extractor.text(data)
+
+    def handle_endtag(self, tag):
+        self.extractor.end(tag)
+        if self.extractor.done:
+            raise _StopParsing()
+
+
+class ParserBackend:
+    name = 'base'
+
+    def extract(self, html: str, spec: PageSpec) -> Dict[str, Any]:
+        raise NotImplementedError
+
+
+class StreamingBackend(ParserBackend):
+    """
+    基于标准库HTMLParser的流式后端，不构建文档树，所有字段抽取完成后立即停止解析
+    """
+    name = 'stream'
+
+    def extract(self, html: str, spec: PageSpec) -> Dict[str, Any]:
+        extractor = _Extractor(spec)
+        parser = _StreamingHTMLParser(extractor)
+        try:
+            parser.feed(html)
+            parser.close()
+        except _StopParsing:
+            pass
+        return extractor.result()
+
+
+class _TreeBackend(ParserBackend):
+    """
+    构建文档树的后端，PageSpec按后端编译为原生选择器（selectolax为CSS，lxml为XPath）并按规范缓存，
+    由解析库完成匹配，不在Python中逐个节点遍历
+    """
+
+    def __init__(self):
+        self.compiled: Dict[int, List[Tuple[Field, Any]]] = {}
+
+    def _parse(self, html: str):
+        raise NotImplementedError
+
+    def _compile(self, field: Field):
+        raise NotImplementedError
+
+    def _select(self, root, field: Field, selector) -> Optional[Any]:
+        """
+        :return: 第field.index个匹配的元素，没有时返回None
+        """
+        raise NotImplementedError
+
+    def _text(self, node) -> str:
+        raise NotImplementedError
+
+    def _attr(self, node, name: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def extract(self, html: str, spec: PageSpec) -> Dict[str, Any]:
+        compiled = self.compiled.get(id(spec))
+        if compiled is None:
+            compiled = [(field, self._compile(field)) for field in spec.fields]
+            self.compiled[id(spec)] = compiled
+        root = self._parse(html)
+        values: Dict[str, Any] = {}
+        missing = []
+        for field, selector in compiled:
+            node = self._select(root, field, selector)
+            if node is None:
+                if field.required:
+                    missing.append(field.name)
+                values[field.name] = field.default
+                continue
+            values[field.name] = _field_value(field, self._attr(node, field.attr) if field.attr else self._text(node))
+        if missing:
+            raise ExtractionError(f"{spec.name}页面缺少字段: {', '.join(missing)}")
+        return values
+
+
+class LxmlBackend(_TreeBackend):
+    name = 'lxml'
+
+    def __init__(self):
+        import lxml.etree
+        import lxml.html
+        super().__init__()
+        self.lxml_html = lxml.html
+        self.xpath_class = lxml.etree.XPath
+
+    def _parse(self, html: str):
+        return self.lxml_html.document_fromstring(html)
+
+    def _compile(self, field: Field):
+        return self.xpath_class(xpath_selector(field))
+
+    def _select(self, root, field: Field, selector):
+        nodes = selector(root)
+        return nodes[0] if nodes else None
+
+    def _text(self, node) -> str:
+        return node.text_content()
+
+    def _attr(self, node, name: str) -> Optional[str]:
+        return node.get(name)
+
+
+class SelectolaxBackend(_TreeBackend):
+    name = 'selectolax'
+
+    def __init__(self):
+        try:
+            from selectolax.lexbor import LexborHTMLParser as SelectolaxParser
+        except ImportError:
+            from selectolax.parser import HTMLParser as SelectolaxParser
+        super().__init__()
+        self.parser_class = SelectolaxParser
+
+    def _parse(self, html: str):
+        return self.parser_class(html)
+
+    def _compile(self, field: Field):
+        return css_selector(field)
+
+    def _select(self, root, field: Field, selector):
+        if field.index == 0:
+            return root.css_first(selector)
+        nodes = root.css(selector)
+        return nodes[field.index] if len(nodes) > field.index else None
+
+    def _text(self, node) -> str:
+        return node.text(deep=True)
+
+    def _attr(self, node, name: str) -> Optional[str]:
+        attributes = node.attributes
+        if name not in attributes:
+            return None
+        return attributes[name] or ''
+
+
+class BeautifulSoupBackend(_TreeBackend):
+    name = 'bs4'
+
+    def __init__(self, features: str = 'html.parser'):
+        from bs4 import BeautifulSoup
+        super().__init__()
+        self.soup_class = BeautifulSoup
+        self.features = features
+
+    def _parse(self, html: str):
+        return self.soup_class(html, self.features)
+
+    def _compile(self, field: Field):
+        return css_selector(field)
+
+    def _select(self, root, field: Field, selector):
+        if field.index == 0:
+            return root.select_one(selector)
+        nodes = root.select(selector, limit=field.index + 1)
+        return nodes[field.index] if len(nodes) > field.index else None
+
+    def _text(self, node) -> str:
+        return node.get_text()
+
+    def _attr(self, node, name: str) -> Optional[str]:
+        value = node.get(name)
+        return ' '.join(value) if isinstance(value, list) else value
+
+
+BACKENDS = {
+    'selectolax': SelectolaxBackend,
+    'lxml': LxmlBackend,
+    'stream': StreamingBackend,
+    'bs4': BeautifulSoupBackend
+}
+
+
+def available_backends() -> List[str]:
+    names = []
+    for name, backend_class in BACKENDS.items():
+        try:
+            backend_class()
+        except ImportError:
+            continue
+        names.append(name)
+    return names
+
+
+PAGE_SPECS = {
+    'video': VIDEO_PAGE_SPEC,
+    'user': USER_PAGE_SPEC
+}
+
+# 每个解析进程内按后端名称复用的解析器实例
+_process_backends: Dict[str, ParserBackend] = {}
+
+
+def parse_page(kind: str, html: str, backend: str = 'auto') -> Dict[str, Any]:
+    """
+    按页面类型抽取字段，可直接提交给进程池执行
+    """
+    parser = _process_backends.get(backend)
+    if parser is None:
+        parser = create_backend(backend)
+        _process_backends[backend] = parser
+    return parser.extract(html, PAGE_SPECS[kind])
+
+
+def create_backend(name: str = 'auto') -> ParserBackend:
+    """
+    创建解析后端，auto按 selectolax > lxml > stream 的顺序选择已安装的最快后端
+    """
+    if name == 'auto':
+        for candidate in ('selectolax', 'lxml', 'stream'):
+            try:
+                return BACKENDS[candidate]()
+            except ImportError:
+                continue
+    if name not in BACKENDS:
+        raise ValueError(f"不支持的解析后端: {name}")
+    return BACKENDS[name]()
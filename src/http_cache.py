@@ -0,0 +1,198 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import urlencode
+
+logger = logging.getLogger(__name__)
+
+# 各类接口的默认缓存有效期（秒）
+DEFAULT_TTL = {
+    'video': 3600,
+    'user': 6 * 3600,
+    'search': 300,
+    'trending': 300,
+    'hashtag': 900
+}
+
+
+class ResponseCache:
+    def __init__(self, cache_dir: str = 'cache/http', max_size_bytes: int = 256 * 1024 * 1024,
+                 ttl: Optional[Dict[str, int]] = None):
+        """
+        持久化的HTTP响应缓存
+        缓存的是解析后的记录和ETag/Last-Modified校验信息，重新验证得到304时无需再次解析页面
+        :param cache_dir: 缓存目录
+        :param max_size_bytes: 缓存总大小上限，超出后按最近最少使用淘汰
+        :param ttl: 各接口类型的有效期（秒），未指定的使用DEFAULT_TTL
+        """
+        self.cache_dir = cache_dir
+        self.max_size_bytes = max_size_bytes
+        self.ttl = dict(DEFAULT_TTL)
+        if ttl:
+            self.ttl.update(ttl)
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(os.path.join(self.cache_dir, 'index.sqlite'), check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                endpoint TEXT,
+                url TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                stored_at REAL,
+                accessed_at REAL,
+                size INTEGER
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries (accessed_at)")
+        self.conn.commit()
+        self.total_size = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(url: str, params: Optional[Dict] = None) -> str:
+        """
+        根据URL和排序后的查询参数生成缓存键
+        """
+        if params:
+            url = f"{url}?{urlencode(sorted(params.items()))}"
+        return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+    def _body_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f'{key}.json')
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        读取缓存条目，不存在或已损坏时返回None
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT endpoint, etag, last_modified, stored_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            try:
+                with open(self._body_path(key), 'r', encoding='utf-8') as f:
+                    record = json.load(f)
+            except (OSError, ValueError):
+                self._delete(key)
+                self.conn.commit()
+                return None
+            self.conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self.conn.commit()
+        endpoint, etag, last_modified, stored_at = row
+        return {
+            'record': record,
+            'endpoint': endpoint,
+            'etag': etag,
+            'last_modified': last_modified,
+            'stored_at': stored_at
+        }
+
+    def is_fresh(self, entry: Dict[str, Any]) -> bool:
+        ttl = self.ttl.get(entry['endpoint'], 0)
+        return time.time() - entry['stored_at'] < ttl
+
+    def put(self, key: str, endpoint: str, url: str, record: Any,
+            etag: Optional[str] = None, last_modified: Optional[str] = None):
+        body = json.dumps(record, ensure_ascii=False).encode('utf-8')
+        path = self._body_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 每次写入使用独立的临时文件，并发写入同一个键时不会互相覆盖临时文件的内容
+        fd, tmp_path = tempfile.mkstemp(prefix=f'.{os.path.basename(path)}.', suffix='.tmp',
+                                        dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(body)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            if row:
+                self.total_size -= row[0]
+            self.conn.execute("""
+                INSERT OR REPLACE INTO entries (key, endpoint, url, etag, last_modified, stored_at, accessed_at, size)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (key, endpoint, url, etag, last_modified, now, now, len(body)))
+            self.total_size += len(body)
+            self._evict()
+            self.conn.commit()
+
+    def touch(self, key: str):
+        """
+        304重新验证成功后刷新条目的存储时间
+        """
+        now = time.time()
+        with self.lock:
+            self.conn.execute("UPDATE entries SET stored_at = ?, accessed_at = ? WHERE key = ?", (now, now, key))
+            self.conn.commit()
+
+    def _delete(self, key: str):
+        row = self.conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return
+        self.conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+        self.total_size -= row[0]
+        try:
+            os.remove(self._body_path(key))
+        except OSError:
+            pass
+
+    def _evict(self):
+        if self.total_size <= self.max_size_bytes:
+            return
+        rows = self.conn.execute("SELECT key FROM entries ORDER BY accessed_at").fetchall()
+        for (key,) in rows:
+            if self.total_size <= self.max_size_bytes:
+                break
+            self._delete(key)
+            self.evictions += 1
+
+    def record_hit(self):
+        with self.lock:
+            self.hits += 1
+
+    def record_miss(self):
+        with self.lock:
+            self.misses += 1
+
+    def record_revalidated(self):
+        with self.lock:
+            self.revalidated += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            entries = self.conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            lookups = self.hits + self.revalidated + self.misses
+            return {
+                'hits': self.hits,
+                'revalidated': self.revalidated,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': (self.hits + self.revalidated) / lookups if lookups else 0.0,
+                'entries': entries,
+                'size_bytes': self.total_size
+            }
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
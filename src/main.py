@@ -1,91 +1,178 @@
-import argparse
-import logging
-import json
-from data_getter import DataGetter
-from data_storage import DataStorage
-from typing import Dict, List, Optional
-
-def main():
-    # 配置日志
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler('main.log'),
-            logging.StreamHandler()
-        ]
-    )
-    logger = logging.getLogger(__name__)
-
-    # 解析命令行参数
-    parser = argparse.ArgumentParser(description='抖音数据分析工具')
-    parser.add_argument('--config', type=str, default='config/data_getter_config.json',
-                      help='数据获取器配置文件路径')
-    parser.add_argument('--storage_type', type=str, choices=['file', 'mysql', 'mongodb'], default='file',
-                      help='数据存储类型')
-    parser.add_argument('--storage_config', type=str, default=None,
-                      help='数据库配置文件路径')
-    args = parser.parse_args()
-
-    # 加载配置
-    try:
-        with open(args.config, 'r', encoding='utf-8') as f:
-            getter_config = json.load(f)
-    except Exception as e:
-        logger.error(f"加载配置文件失败: {str(e)}")
-        return
-
-    # 初始化数据获取和存储
-    storage_config = None
-    if args.storage_type != 'file' and args.storage_config:
-        try:
-            with open(args.storage_config, 'r', encoding='utf-8') as f:
-                storage_config = json.load(f)
-        except Exception as e:
-            logger.error(f"加载存储配置文件失败: {str(e)}")
-            return
-
-    data_getter = DataGetter(args.config)
-    data_storage = DataStorage(
-        storage_type=args.storage_type,
-        storage_path='data/',
-        db_config=storage_config
-    )
-
-    # 执行数据抓取和存储
-    try:
-        # 获取热门视频
-        trending_videos = data_getter.get_trending_videos()
-        if trending_videos:
-            data_storage.save_trending_videos(trending_videos)
-            logger.info(f"成功获取并保存热门视频数据，数量: {len(trending_videos)}")
-
-        # 获取示例搜索结果
-        search_results = data_getter.search_videos("抖音热搜", count=50)
-        if search_results:
-            for video in search_results:
-                video_data = data_getter.get_video_data(video['id'])
-                if video_data:
-                    data_storage.save_video_data(video_data)
-                    logger.info(f"成功保存视频数据: {video_data.get('video_id')}")
-            
-        # 获取示例用户数据
-        user_data = data_getter.get_user_data("123456789")  # 示例用户ID
-        if user_data:
-            data_storage.save_user_data(user_data)
-            logger.info(f"成功保存用户数据: {user_data.get('user_id')}")
-
-        # 获取示例话题数据
-        hashtag_data = data_getter.get_hashtag_data("热搜2024")  # 示例话题
-        if hashtag_data:
-            data_storage.save_hashtag_data(hashtag_data)
-            logger.info(f"成功保存话题数据: {hashtag_data.get('hashtag')}")
-            
-    except Exception as e:
-        logger.error(f"数据抓取和存储过程中发生错误: {str(e)}")
-        return
-
-    logger.info("数据抓取和存储完成")
-
-if __name__ == "__main__":
-    main()
+import argparse
+import itertools
+import logging
+import json
+import os
+from data_getter import DataGetter
+from data_storage import DataStorage
+from crawler import ConcurrentCrawler, PipelineCrawler
+from crawl_state import CrawlState
+from write_behind import WriteBehindStorage
+from typing import Dict, List, Optional
+
+def main():
+    # 配置日志
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler('main.log'),
+            logging.StreamHandler()
+        ]
+    )
+    logger = logging.getLogger(__name__)
+
+    # 解析命令行参数
+    parser = argparse.ArgumentParser(description='抖音数据分析工具')
+    parser.add_argument('--config', type=str, default='config/data_getter_config.json',
+                      help='数据获取器配置文件路径')
+    parser.add_argument('--storage_type', type=str, choices=['file', 'log', 'parquet', 'mysql', 'mongodb'], default='file',
+                      help='数据存储类型')
+    parser.add_argument('--storage_config', type=str, default=None,
+                      help='数据库配置文件路径')
+    parser.add_argument('--concurrent', action='store_true',
+                      help='并发抓取视频详情')
+    parser.add_argument('--workers', type=int, default=8,
+                      help='并发抓取的最大线程数')
+    parser.add_argument('--parse_processes', type=int, default=0,
+                      help='解析进程数，大于0时下载和解析分离，解析在进程池中进行')
+    parser.add_argument('--state_dir', type=str, default=None,
+                      help='抓取状态目录，指定后中断的抓取可从上次位置继续')
+    parser.add_argument('--seen_ttl', type=float, default=24,
+                      help='已抓取的ID在多少小时内不再重复抓取')
+    parser.add_argument('--batch_size', type=int, default=0,
+                      help='数据库批量写入的行数阈值，大于0时启用写入缓冲')
+    parser.add_argument('--batch_delay', type=float, default=2.0,
+                      help='数据库写入缓冲的最长等待时间（秒）')
+    parser.add_argument('--delta', action='store_true',
+                      help='启用变化检测，内容未变化的视频和用户数据不再写入')
+    parser.add_argument('--write_behind', type=int, default=0,
+                      help='异步写入线程数，大于0时保存操作放入队列后立即返回')
+    parser.add_argument('--write_queue', type=int, default=1000,
+                      help='异步写入队列容量，队列满时抓取线程等待')
+    args = parser.parse_args()
+
+    # 加载配置
+    try:
+        with open(args.config, 'r', encoding='utf-8') as f:
+            getter_config = json.load(f)
+    except Exception as e:
+        logger.error(f"加载配置文件失败: {str(e)}")
+        return
+
+    # 初始化数据获取和存储
+    storage_config = None
+    if args.storage_type != 'file' and args.storage_config:
+        try:
+            with open(args.storage_config, 'r', encoding='utf-8') as f:
+                storage_config = json.load(f)
+        except Exception as e:
+            logger.error(f"加载存储配置文件失败: {str(e)}")
+            return
+
+    data_getter = DataGetter(args.config)
+    data_storage = DataStorage(
+        storage_type=args.storage_type,
+        storage_path='data/',
+        db_config=storage_config,
+        write_buffer={'max_rows': args.batch_size, 'max_delay': args.batch_delay} if args.batch_size > 0 else None,
+        delta_config={} if args.delta else None
+    )
+    if args.write_behind > 0:
+        data_storage = WriteBehindStorage(
+            data_storage,
+            queue_size=args.write_queue,
+            workers=args.write_behind,
+            spill_path=os.path.join('data', 'write_behind_spill.jsonl')
+        )
+        # 上次运行中写入失败的记录先重新写入
+        data_storage.replay_spill()
+
+    crawl_state = None
+    if args.state_dir:
+        crawl_state = CrawlState(args.state_dir, seen_ttl=args.seen_ttl * 3600)
+        logger.info(f"已加载抓取状态: {crawl_state.stats()}")
+
+    # 执行数据抓取和存储
+    try:
+        # 获取热门视频
+        trending_videos = data_getter.get_trending_videos()
+        if trending_videos:
+            data_storage.save_trending_videos(trending_videos)
+            logger.info(f"成功获取并保存热门视频数据，数量: {len(trending_videos)}")
+
+        # 获取示例话题数据
+        hashtag = "热搜2024"  # 示例话题
+        hashtag_data = {}
+        if crawl_state is None or crawl_state.should_fetch('hashtag', hashtag):
+            hashtag_data = data_getter.get_hashtag_data(hashtag)
+            if hashtag_data and data_storage.save_hashtag_data(hashtag_data):
+                logger.info(f"成功保存话题数据: {hashtag_data.get('hashtag')}")
+                if crawl_state:
+                    crawl_state.mark_done('hashtag', hashtag)
+
+        # 获取示例搜索结果：与原来的search_videos(count=50)一样只请求一页50条
+        search_results = data_getter.iter_search("抖音热搜", max_items=50, page_size=50)
+        if crawl_state:
+            # 热门、话题和搜索结果一起去重入队，有效期内已抓取过的视频不再请求；
+            # 队列中还包含上次中断时未完成的视频
+            discovered = itertools.chain(trending_videos, hashtag_data.get('videos', []), search_results)
+            queued = crawl_state.add_many('video', (video['id'] for video in discovered))
+            video_ids = [video_id for _, video_id in crawl_state.pending('video')]
+            logger.info(f"新加入待抓取队列 {queued} 个视频，共 {len(video_ids)} 个待抓取")
+        else:
+            video_ids = (video['id'] for video in search_results)
+
+        if args.parse_processes > 0:
+            crawler = PipelineCrawler(data_getter, data_storage, io_workers=args.workers,
+                                      parse_processes=args.parse_processes, crawl_state=crawl_state)
+            stats = crawler.crawl(('video', video_id) for video_id in video_ids)
+            logger.info(f"流水线抓取完成: 保存 {stats['saved']}/{stats['total']} 个视频, "
+                        f"耗时 {stats['elapsed']:.2f} 秒, 吞吐量 {stats['pages_per_second']:.2f} 视频/秒")
+        elif args.concurrent:
+            crawler = ConcurrentCrawler(data_getter, data_storage, max_workers=args.workers, crawl_state=crawl_state)
+            stats = crawler.crawl_videos(video_ids)
+            logger.info(f"并发抓取完成: 保存 {stats['saved']}/{stats['total']} 个视频, "
+                        f"耗时 {stats['elapsed']:.2f} 秒, 吞吐量 {stats['videos_per_second']:.2f} 视频/秒")
+        else:
+            for video_id in video_ids:
+                video_data = data_getter.get_video_data(video_id)
+                saved = bool(video_data) and data_storage.save_video_data(video_data)
+                if saved:
+                    logger.info(f"成功保存视频数据: {video_data.get('video_id')}")
+                if crawl_state:
+                    if saved:
+                        crawl_state.mark_done('video', video_id)
+                    else:
+                        crawl_state.mark_failed('video', video_id)
+            
+        # 获取示例用户数据
+        user_id = "123456789"  # 示例用户ID
+        if crawl_state is None or crawl_state.should_fetch('user', user_id):
+            user_data = data_getter.get_user_data(user_id)
+            if user_data and data_storage.save_user_data(user_data):
+                logger.info(f"成功保存用户数据: {user_data.get('user_id')}")
+                if crawl_state:
+                    crawl_state.mark_done('user', user_id)
+            
+    except Exception as e:
+        logger.error(f"数据抓取和存储过程中发生错误: {str(e)}")
+        return
+    finally:
+        if crawl_state:
+            crawl_state.close()
+        try:
+            data_storage.flush()
+        except Exception as e:
+            # 写入失败的数据仍在缓冲中，close()会再写入一次，无法写入的行转存到死信文件
+            logger.error(f"写入缓冲中的数据失败: {str(e)}")
+        if args.storage_type != 'file' or args.delta:
+            logger.info(f"存储写入统计: {data_storage.get_write_stats()}")
+        if args.write_behind > 0:
+            logger.info(f"异步写入统计: {data_storage.stats()}")
+        data_storage.close()
+
+    logger.info("数据抓取和存储完成")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlparse
+
+logger = logging.getLogger(__name__)
+
+
+def _stable_int(seed: str, low: int, high: int) -> int:
+    """
+    根据种子生成稳定的整数，同一个ID每次请求得到相同的数据
+    """
+    digest = hashlib.md5(seed.encode('utf-8')).hexdigest()
+    return low + int(digest[:8], 16) % (high - low + 1)
+
+
+class MockDouyinServer:
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0,
+                 latency_jitter: float = 0.0, error_rate: float = 0.0, throttle_rate: float = 0.0,
+                 retry_after: int = 1, fixtures_dir: Optional[str] = None, total_items: int = 200,
+                 total_comments: int = 1000, seed: Optional[int] = None):
+        """
+        本地抖音模拟服务器，用于离线压测和回归测试
+        同时提供DataGetter使用的网页接口和data.py使用的/api接口
+        :param latency: 每个请求的基础延迟（秒）
+        :param latency_jitter: 在基础延迟上叠加的随机延迟上限（秒）
+        :param error_rate: 返回500的概率
+        :param throttle_rate: 返回429的概率
+        :param retry_after: 429响应携带的Retry-After（秒）
+        :param fixtures_dir: 录制的响应目录，存在对应文件时优先回放
+        :param total_items: 搜索、热门、话题列表的总条数
+        :param total_comments: 每个视频的评论总数
+        """
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.fixtures_dir = fixtures_dir
+        self.total_items = total_items
+        self.total_comments = total_comments
+        self.random = random.Random(seed)
+        self.random_lock = threading.Lock()
+
+        self.stats_lock = threading.Lock()
+        self.status_counts: Dict[int, int] = {}
+        self.requests = 0
+
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> 'MockDouyinServer':
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name='mock-douyin', daemon=True)
+        self.thread.start()
+        logger.info(f"模拟服务器已启动: {self.url}")
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self.thread:
+            self.thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def stats(self) -> Dict:
+        with self.stats_lock:
+            return {'requests': self.requests, 'status_counts': dict(self.status_counts)}
+
+    def _record(self, status: int):
+        with self.stats_lock:
+            self.requests += 1
+            self.status_counts[status] = self.status_counts.get(status, 0) + 1
+
+    def _roll(self) -> Tuple[float, float]:
+        with self.random_lock:
+            return self.random.random(), self.random.random()
+
+    def _load_fixture(self, path: str, query: Dict) -> Optional[Tuple[str, bytes]]:
+        """
+        回放录制的响应：<fixtures_dir>/<请求路径>[/page_<页码>].html|.json
+        """
+        if not self.fixtures_dir:
+            return None
+        name = path.strip('/')
+        if 'page' in query:
+            name = f"{name}/page_{query['page']}"
+        for ext, content_type in (('.html', 'text/html; charset=utf-8'), ('.json', 'application/json')):
+            file_path = os.path.join(self.fixtures_dir, name + ext)
+            if os.path.isfile(file_path):
+                with open(file_path, 'rb') as f:
+                    return content_type, f.read()
+        return None
+
+    def _video_items(self, prefix: str, query: Dict):
+        page = int(query.get('page', 1))
+        count = int(query.get('count', 20))
+        start = (page - 1) * count
+        end = min(start + count, self.total_items)
+        items = []
+        for index in range(start, end):
+            video_id = str(_stable_int(f"{prefix}:{index}", 10 ** 15, 10 ** 16 - 1))
+            items.append({
+                'id': video_id,
+                'title': f"示例视频 {index}",
+                'author': f"作者{_stable_int(video_id, 1, 500)}",
+                'thumbnail': f"https://example.com/thumb/{video_id}.jpg",
+                'duration': _stable_int(video_id + ':duration', 5, 300),
+                'play_count': _stable_int(video_id + ':play', 100, 10 ** 7)
+            })
+        return items
+
+    def _synthetic(self, path: str, query: Dict) -> Optional[Tuple[str, bytes]]:
+        html_type = 'text/html; charset=utf-8'
+        json_type = 'application/json'
+
+        match = re.fullmatch(r'/video/([^/]+)/', path)
+        if match:
+            video_id = match.group(1)
+            html = (f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>示例视频 {video_id}</title>'
+                    f'<meta name="author" content="作者{_stable_int(video_id, 1, 500)}"></head><body>'
+                    f'<div class="video-info"><span id="like-count">{_stable_int(video_id + ":like", 0, 10 ** 6):,}</span>'
+                    f'<span id="comment-count">{_stable_int(video_id + ":comment", 0, 10 ** 5):,}</span>'
+                    f'<span id="share-count">{_stable_int(video_id + ":share", 0, 10 ** 5):,}</span></div>'
+                    f'</body></html>')
+            return html_type, html.encode('utf-8')
+
+        match = re.fullmatch(r'/user/([^/]+)/', path)
+        if match:
+            user_id = match.group(1)
+            html = (f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>用户 {user_id}</title></head><body>'
+                    f'<div class="profile-follow-info"><span>{_stable_int(user_id + ":fans", 0, 10 ** 7):,}</span>'
+                    f'<span>{_stable_int(user_id + ":following", 0, 2000):,}</span></div>'
+                    f'<div class="profile-video-info"><span>{_stable_int(user_id + ":videos", 0, 3000):,}</span></div>'
+                    f'</body></html>')
+            return html_type, html.encode('utf-8')
+
+        if path == '/search/item/':
+            body = {'items': self._video_items(f"search:{query.get('keyword', '')}", query)}
+            return json_type, json.dumps(body, ensure_ascii=False).encode('utf-8')
+
+        if path == '/trending/':
+            body = {'items': self._video_items('trending', query)}
+            return json_type, json.dumps(body, ensure_ascii=False).encode('utf-8')
+
+        match = re.fullmatch(r'/tag/([^/]+)/', path)
+        if match:
+            hashtag = match.group(1)
+            body = {
+                'challenge_name': hashtag,
+                'challenge_id': str(_stable_int(f"tag:{hashtag}", 10 ** 9, 10 ** 10 - 1)),
+                'items': self._video_items(f"tag:{hashtag}", query)
+            }
+            return json_type, json.dumps(body, ensure_ascii=False).encode('utf-8')
+
+        match = re.fullmatch(r'/api/video/([^/]+)/comments', path)
+        if match:
+            return json_type, json.dumps(self._comments(match.group(1), query), ensure_ascii=False).encode('utf-8')
+
+        match = re.fullmatch(r'/api/video/([^/]+)', path)
+        if match:
+            video_id = match.group(1)
+            body = {
+                'id': video_id,
+                'title': f"示例视频 {video_id}",
+                'author': f"作者{_stable_int(video_id, 1, 500)}",
+                'views': _stable_int(video_id + ':play', 100, 10 ** 7),
+                'likes': _stable_int(video_id + ':like', 0, 10 ** 6),
+                'comments': _stable_int(video_id + ':comment', 0, 10 ** 5),
+                'shares': _stable_int(video_id + ':share', 0, 10 ** 5)
+            }
+            return json_type, json.dumps(body, ensure_ascii=False).encode('utf-8')
+
+        match = re.fullmatch(r'/api/account/([^/]+)', path)
+        if match:
+            account_id = match.group(1)
+            body = {
+                'id': account_id,
+                'username': f"用户 {account_id}",
+                'followers': _stable_int(account_id + ':fans', 0, 10 ** 7),
+                'following': _stable_int(account_id + ':following', 0, 2000),
+                'videos': _stable_int(account_id + ':videos', 0, 3000)
+            }
+            return json_type, json.dumps(body, ensure_ascii=False).encode('utf-8')
+
+        return None
+
+    def _comments(self, video_id: str, query: Dict) -> Dict:
+        # 评论按游标分页，游标为下一条评论的序号
+        cursor = int(query.get('cursor', 0))
+        count = int(query.get('count', 20))
+        end = min(cursor + count, self.total_comments)
+        comments = [{
+            'cid': f"{video_id}_{index}",
+            'text': f"评论 {index}",
+            'user': f"用户{_stable_int(f'{video_id}:{index}', 1, 10 ** 6)}",
+            'likes': _stable_int(f"{video_id}:{index}:like", 0, 5000),
+            'create_time': 1700000000 + index
+        } for index in range(cursor, end)]
+        return {'comments': comments, 'cursor': end, 'has_more': end < self.total_comments}
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+            def _send(self, status: int, content_type: str = 'text/plain; charset=utf-8',
+                      body: bytes = b'', headers: Optional[Dict[str, str]] = None):
+                server._record(status)
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                if body:
+                    self.wfile.write(body)
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                path = unquote(parsed.path)
+                query = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+
+                delay_roll, fault_roll = server._roll()
+                delay = server.latency + server.latency_jitter * delay_roll
+                if delay > 0:
+                    time.sleep(delay)
+
+                if fault_roll < server.throttle_rate:
+                    self._send(429, body=b'Too Many Requests', headers={'Retry-After': str(server.retry_after)})
+                    return
+                if fault_roll < server.throttle_rate + server.error_rate:
+                    self._send(500, body=b'Internal Server Error')
+                    return
+
+                response = server._load_fixture(path, query) or server._synthetic(path, query)
+                if response is None:
+                    self._send(404, body=b'Not Found')
+                    return
+
+                content_type, body = response
+                etag = f'"{hashlib.md5(body).hexdigest()}"'
+                if self.headers.get('If-None-Match') == etag:
+                    self._send(304, headers={'ETag': etag})
+                    return
+                self._send(200, content_type, body, headers={'ETag': etag})
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='抖音模拟服务器')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='监听地址')
+    parser.add_argument('--port', type=int, default=8000, help='监听端口')
+    parser.add_argument('--latency', type=float, default=0.0, help='基础延迟（秒）')
+    parser.add_argument('--latency_jitter', type=float, default=0.0, help='随机延迟上限（秒）')
+    parser.add_argument('--error_rate', type=float, default=0.0, help='返回500的概率')
+    parser.add_argument('--throttle_rate', type=float, default=0.0, help='返回429的概率')
+    parser.add_argument('--fixtures', type=str, default=None, help='录制的响应目录')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    server = MockDouyinServer(
+        host=args.host, port=args.port, latency=args.latency, latency_jitter=args.latency_jitter,
+        error_rate=args.error_rate, throttle_rate=args.throttle_rate, fixtures_dir=args.fixtures
+    )
+    logger.info(f"模拟服务器监听 {server.url}，DataGetter配置中的base_url和video_base_url指向该地址即可")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
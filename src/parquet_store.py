@@ -0,0 +1,388 @@
+import argparse
+import csv
+import json
+import logging
+import os
+import re
+import uuid
+from datetime import date, datetime
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from batch_writer import BufferedWriter
+
+logger = logging.getLogger(__name__)
+
+# 各实体类型的列式快照结构，captured_at为抓取时间，同时决定所在的日期分区
+SCHEMAS = {
+    'videos': pa.schema([
+        ('video_id', pa.string()),
+        ('title', pa.string()),
+        ('author', pa.string()),
+        ('likes', pa.int64()),
+        ('comments', pa.int64()),
+        ('shares', pa.int64()),
+        ('captured_at', pa.timestamp('us'))
+    ]),
+    'users': pa.schema([
+        ('user_id', pa.string()),
+        ('username', pa.string()),
+        ('follower_count', pa.int64()),
+        ('following_count', pa.int64()),
+        ('video_count', pa.int64()),
+        ('captured_at', pa.timestamp('us'))
+    ]),
+    'trending': pa.schema([
+        ('video_id', pa.string()),
+        ('rank', pa.int32()),
+        ('title', pa.string()),
+        ('author', pa.string()),
+        ('thumbnail', pa.string()),
+        ('duration', pa.int64()),
+        ('play_count', pa.int64()),
+        ('captured_at', pa.timestamp('us'))
+    ]),
+    'hashtag_videos': pa.schema([
+        ('hashtag', pa.string()),
+        ('challenge_name', pa.string()),
+        ('challenge_id', pa.string()),
+        ('video_id', pa.string()),
+        ('title', pa.string()),
+        ('author', pa.string()),
+        ('play_count', pa.int64()),
+        ('captured_at', pa.timestamp('us'))
+    ]),
+    'comments': pa.schema([
+        ('cid', pa.string()),
+        ('video_id', pa.string()),
+        ('user', pa.string()),
+        ('text', pa.string()),
+        ('likes', pa.int64()),
+        ('create_time', pa.string()),
+        ('captured_at', pa.timestamp('us'))
+    ])
+}
+
+# 各实体类型的主键，用于取每个对象的最新快照
+ENTITY_KEYS = {
+    'videos': ['video_id'],
+    'users': ['user_id'],
+    'trending': ['video_id'],
+    'hashtag_videos': ['hashtag', 'video_id'],
+    'comments': ['cid']
+}
+
+PARTITIONING = ds.partitioning(pa.schema([('date', pa.string())]), flavor='hive')
+
+
+def _int(value) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        try:
+            return int(float(value))
+        except (TypeError, ValueError):
+            return None
+
+
+def _str(value) -> Optional[str]:
+    return None if value is None else str(value)
+
+
+def _captured_at(record: Dict, default: Optional[datetime]) -> datetime:
+    timestamp = record.get('timestamp') if isinstance(record, dict) else None
+    if timestamp:
+        try:
+            return datetime.fromisoformat(timestamp)
+        except (TypeError, ValueError):
+            pass
+    return default or datetime.now()
+
+
+def to_rows(kind: str, data, captured_at: Optional[datetime] = None) -> Tuple[str, List[Dict]]:
+    """
+    把DataStorage保存的快照转换为对应实体类型的行
+    :param kind: video, user, trending, hashtag 或 comments
+    :return: (实体类型, 行列表)
+    """
+    if kind == 'video':
+        return 'videos', [{
+            'video_id': _str(data.get('video_id')),
+            'title': _str(data.get('title')),
+            'author': _str(data.get('author')),
+            'likes': _int(data.get('likes')),
+            'comments': _int(data.get('comments')),
+            'shares': _int(data.get('shares')),
+            'captured_at': _captured_at(data, captured_at)
+        }]
+    if kind == 'user':
+        return 'users', [{
+            'user_id': _str(data.get('user_id')),
+            'username': _str(data.get('username')),
+            'follower_count': _int(data.get('follower_count')),
+            'following_count': _int(data.get('following_count')),
+            'video_count': _int(data.get('video_count')),
+            'captured_at': _captured_at(data, captured_at)
+        }]
+    if kind == 'trending':
+        captured_at = captured_at or datetime.now()
+        return 'trending', [{
+            'video_id': _str(video.get('id')),
+            'rank': rank,
+            'title': _str(video.get('title')),
+            'author': _str(video.get('author')),
+            'thumbnail': _str(video.get('thumbnail')),
+            'duration': _int(video.get('duration')),
+            'play_count': _int(video.get('play_count')),
+            'captured_at': captured_at
+        } for rank, video in enumerate(data, 1)]
+    if kind == 'hashtag':
+        captured_at = _captured_at(data, captured_at)
+        return 'hashtag_videos', [{
+            'hashtag': _str(data.get('hashtag')),
+            'challenge_name': _str(data.get('challenge_name')),
+            'challenge_id': _str(data.get('challenge_id')),
+            'video_id': _str(video.get('id')),
+            'title': _str(video.get('title')),
+            'author': _str(video.get('author')),
+            'play_count': _int(video.get('play_count')),
+            'captured_at': captured_at
+        } for video in data.get('videos', [])]
+    if kind == 'comments':
+        captured_at = captured_at or datetime.now()
+        return 'comments', [{
+            'cid': _str(comment.get('cid')),
+            'video_id': _str(comment.get('video_id')),
+            'user': _str(comment.get('user')),
+            'text': _str(comment.get('text')),
+            'likes': _int(comment.get('likes')),
+            'create_time': _str(comment.get('create_time')),
+            'captured_at': captured_at
+        } for comment in data]
+    raise ValueError(f"不支持的快照类型: {kind}")
+
+
+def _date_value(value: Union[str, date, None]) -> Optional[str]:
+    if value is None or isinstance(value, str):
+        return value
+    return value.strftime('%Y-%m-%d')
+
+
+def read_snapshots(root: str, entity: str, columns: Optional[List[str]] = None,
+                   start_date: Union[str, date, None] = None, end_date: Union[str, date, None] = None,
+                   latest: bool = False) -> pd.DataFrame:
+    """
+    读取快照，只读取需要的列和日期分区
+    :param root: Parquet存储根目录
+    :param entity: 实体类型，见SCHEMAS
+    :param columns: 需要的列，为None时读取全部列
+    :param start_date: 起始日期（包含），格式YYYY-MM-DD
+    :param end_date: 结束日期（包含）
+    :param latest: 是否每个对象只保留最新一次快照
+    """
+    schema = SCHEMAS[entity]
+    wanted = list(columns) if columns else schema.names
+    read_columns = list(wanted)
+    if latest:
+        read_columns += [name for name in ENTITY_KEYS[entity] + ['captured_at'] if name not in read_columns]
+
+    path = os.path.join(root, entity)
+    if not os.path.isdir(path):
+        return pd.DataFrame(columns=wanted)
+
+    dataset = ds.dataset(path, schema=schema.append(pa.field('date', pa.string())), format='parquet',
+                         partitioning=PARTITIONING)
+    condition = None
+    for operator, value in (('>=', _date_value(start_date)), ('<=', _date_value(end_date))):
+        if value is None:
+            continue
+        expression = ds.field('date') >= value if operator == '>=' else ds.field('date') <= value
+        condition = expression if condition is None else condition & expression
+    frame = dataset.to_table(columns=read_columns, filter=condition).to_pandas()
+
+    if latest and not frame.empty:
+        frame = (frame.sort_values('captured_at', kind='stable')
+                 .drop_duplicates(ENTITY_KEYS[entity], keep='last')
+                 .reset_index(drop=True))
+    return frame[wanted]
+
+
+class ParquetSnapshotStore(BufferedWriter):
+    def __init__(self, root: str = 'data/parquet', max_rows: int = 10000, max_delay: float = 60.0,
+                 auto_flush: bool = True, compression: str = 'zstd', dead_letter_path: Optional[str] = None):
+        """
+        按实体类型和日期分区的Parquet快照存储
+        文件布局为 {root}/{实体类型}/date=YYYY-MM-DD/part-*.parquet，快照在内存中缓冲，
+        行数或等待时间达到阈值时每个分区写入一个文件
+        :param compression: Parquet压缩算法
+        :param dead_letter_path: 无法写入的快照追加到这个文件，见BufferedWriter
+        """
+        self.root = root
+        self.compression = compression
+        os.makedirs(root, exist_ok=True)
+        super().__init__(max_rows=max_rows, max_delay=max_delay, auto_flush=auto_flush,
+                         dead_letter_path=dead_letter_path)
+
+    def add_snapshot(self, kind: str, data, captured_at: Optional[datetime] = None,
+                     on_written: Optional[Callable[[], None]] = None,
+                     on_failed: Optional[Callable[[Exception], None]] = None) -> str:
+        """
+        缓冲一份快照
+        :param on_written: 快照写入Parquet文件后调用
+        :param on_failed: 快照最终无法写入而被放弃时调用
+        :return: 写入的实体类型
+        """
+        entity, rows = to_rows(kind, data, captured_at)
+        self.add_many(entity, rows, on_written, on_failed)
+        return entity
+
+    def _write(self, entity: str, rows: List[Dict]):
+        schema = SCHEMAS[entity]
+        partitions: Dict[str, List[Dict]] = {}
+        for row in rows:
+            partitions.setdefault(row['captured_at'].strftime('%Y-%m-%d'), []).append(row)
+        for day, day_rows in partitions.items():
+            table = pa.Table.from_pydict({name: [row.get(name) for row in day_rows] for name in schema.names},
+                                         schema=schema)
+            directory = os.path.join(self.root, entity, f'date={day}')
+            os.makedirs(directory, exist_ok=True)
+            file_name = f"part-{datetime.now().strftime('%H%M%S')}-{uuid.uuid4().hex[:8]}.parquet"
+            # 以.开头的临时文件不会被数据集读取，写完后原子替换
+            tmp_path = os.path.join(directory, f'.{file_name}.tmp')
+            pq.write_table(table, tmp_path, compression=self.compression)
+            os.replace(tmp_path, os.path.join(directory, file_name))
+
+    def read(self, entity: str, columns: Optional[List[str]] = None, start_date=None, end_date=None,
+             latest: bool = False) -> pd.DataFrame:
+        return read_snapshots(self.root, entity, columns, start_date, end_date, latest)
+
+    def get_latest(self, entity: str, key: Dict[str, str]) -> Optional[Dict]:
+        """
+        读取单个对象的最新快照
+        不刷新缓冲：缓冲中的快照直接从内存读取，文件按日期分区从新到旧查找，找到后不再读取更早的分区
+        :param key: 主键字段 -> 值
+        """
+        key = {name: str(value) for name, value in key.items()}
+        with self.lock:
+            pending = [row for row in self.buffers.get(entity, [])
+                       if all(str(row.get(name)) == value for name, value in key.items())]
+        # 同一时间的多份快照以后加入的为准
+        latest = max(reversed(pending), key=lambda row: row['captured_at']) if pending else None
+        if latest is not None:
+            schema = SCHEMAS[entity]
+            latest = pa.Table.from_pydict({name: [latest.get(name)] for name in schema.names},
+                                          schema=schema).to_pandas().iloc[0].to_dict()
+
+        path = os.path.join(self.root, entity)
+        if not os.path.isdir(path):
+            return latest
+        days = sorted((entry.name[len('date='):] for entry in os.scandir(path)
+                       if entry.is_dir() and entry.name.startswith('date=')), reverse=True)
+        condition = None
+        for name, value in key.items():
+            expression = ds.field(name) == value
+            condition = expression if condition is None else condition & expression
+        for day in days:
+            if latest is not None and day < latest['captured_at'].strftime('%Y-%m-%d'):
+                # 更早的分区不会比缓冲中的快照新
+                break
+            dataset = ds.dataset(os.path.join(path, f'date={day}'), schema=SCHEMAS[entity], format='parquet')
+            frame = dataset.to_table(filter=condition).to_pandas()
+            if frame.empty:
+                continue
+            found = frame.sort_values('captured_at', kind='stable').iloc[-1].to_dict()
+            if latest is None or found['captured_at'] > latest['captured_at']:
+                return found
+            return latest
+        return latest
+
+
+TRENDING_FILE = re.compile(r'^trending_videos_(\d{8}_\d{6})\.json$')
+
+
+def _iter_data_dir(data_dir: str) -> Iterator[Tuple[str, object, Optional[datetime]]]:
+    """
+    遍历旧数据目录中的快照，产出 (类型, 数据, 抓取时间)
+    """
+    for root, dirs, files in os.walk(data_dir):
+        # 跳过Parquet输出目录本身和分段日志目录（分段日志单独迁移）
+        dirs[:] = [name for name in dirs if name not in ('parquet', 'log')]
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            modified = datetime.fromtimestamp(os.path.getmtime(path))
+            if name.endswith('.json'):
+                match = TRENDING_FILE.match(name)
+                if match:
+                    kind, captured_at = 'trending', datetime.strptime(match.group(1), '%Y%m%d_%H%M%S')
+                elif name.startswith(('video_', 'user_', 'hashtag_')):
+                    kind, captured_at = name.split('_', 1)[0], modified
+                else:
+                    continue
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        yield kind, json.load(f), captured_at
+                except ValueError as e:
+                    logger.warning(f"跳过无法解析的文件 {path}: {str(e)}")
+            elif name.endswith('.csv'):
+                with open(path, 'r', encoding='utf-8', newline='') as f:
+                    reader = csv.DictReader(f)
+                    header = reader.fieldnames or []
+                    if 'cid' in header:
+                        yield 'comments', list(reader), modified
+                    elif 'video_id' in header or 'user_id' in header:
+                        kind = 'video' if 'video_id' in header else 'user'
+                        for row in reader:
+                            yield kind, row, modified
+                    else:
+                        logger.warning(f"跳过无法识别的CSV文件 {path}")
+
+
+def migrate_data_dir(data_dir: str, store: ParquetSnapshotStore) -> Dict[str, int]:
+    """
+    把旧的JSON/CSV数据目录（以及其中的分段日志）转换为Parquet快照
+    重复迁移同一目录会产生重复快照，迁移前请确认输出目录为空
+    :return: 各实体类型迁移的行数
+    """
+    counts: Dict[str, int] = {}
+
+    def add(kind, data, captured_at):
+        entity, rows = to_rows(kind, data, captured_at)
+        store.add_many(entity, rows)
+        counts[entity] = counts.get(entity, 0) + len(rows)
+
+    for kind, data, captured_at in _iter_data_dir(data_dir):
+        add(kind, data, captured_at)
+
+    log_dir = os.path.join(data_dir, 'log')
+    if os.path.isdir(log_dir):
+        from segment_log import SegmentLog
+        with SegmentLog(log_dir) as log:
+            for record in log.scan():
+                add(record['kind'], record['data'], datetime.fromtimestamp(record['ts']))
+
+    store.flush()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='把旧数据目录迁移为按日期分区的Parquet快照')
+    parser.add_argument('data_dir', help='旧数据目录（JSON/CSV文件和分段日志）')
+    parser.add_argument('--output', type=str, default=None, help='Parquet输出目录，默认为 {data_dir}/parquet')
+    parser.add_argument('--compression', type=str, default='zstd', help='Parquet压缩算法')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    output = args.output or os.path.join(args.data_dir, 'parquet')
+    if os.path.isdir(output) and os.listdir(output):
+        parser.error(f"输出目录 {output} 不为空，重复迁移会产生重复快照")
+
+    store = ParquetSnapshotStore(output, max_rows=50000, auto_flush=False, compression=args.compression)
+    counts = migrate_data_dir(args.data_dir, store)
+    store.close()
+    logger.info(f"迁移完成: {counts}")
+
+
+if __name__ == "__main__":
+    main()
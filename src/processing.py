@@ -1,34 +1,141 @@
-import sys
-import os
-sys.path.append(os.path.dirname(os.path.dirname(__file__)))
-
-import pandas as pd
-from src.storage import clean_data
-
-def clean_and_save_data(data, columns, file_path):
-    # 清洗数据
-    cleaned_data = clean_data(data, columns)
-    
-    # 保存清洗后的数据
-    cleaned_data.to_csv(file_path, index=False, encoding='utf-8')
-
-def process_video_data(file_path):
-    # 读取CSV文件
-    video_data = pd.read_csv(file_path)
-    
-    # 清洗并保存数据
-    clean_and_save_data(video_data, ['views', 'likes', 'comments', 'shares'], file_path)
-
-def process_account_data(file_path):
-    # 读取CSV文件
-    account_data = pd.read_csv(file_path)
-    
-    # 清洗并保存数据
-    clean_and_save_data(account_data, ['followers', 'following', 'videos'], file_path)
-
-def process_comments_data(file_path):
-    # 读取CSV文件
-    comments_data = pd.read_csv(file_path)
-    
-    # 清洗并保存数据
-    clean_and_save_data(comments_data, ['likes'], file_path)
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import csv
+import tempfile
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Sequence
+
+import pandas as pd
+from src.storage import clean_data
+
+# 分块清洗时每块的行数，峰值内存与块大小成正比，与文件大小无关
+DEFAULT_CHUNK_ROWS = 100000
+
+@contextmanager
+def atomic_csv(file_path):
+    """
+    写入同目录下的临时文件，成功后原子替换目标文件；中途失败时删除临时文件，原文件保持不变
+    """
+    directory = os.path.dirname(os.path.abspath(file_path))
+    fd, tmp_path = tempfile.mkstemp(prefix=f'.{os.path.basename(file_path)}.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(file_path):
+            # mkstemp创建的文件权限为0600，替换前沿用原文件的权限
+            os.chmod(tmp_path, os.stat(file_path).st_mode)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+def read_header(file_path) -> List[str]:
+    with open(file_path, 'r', encoding='utf-8-sig', newline='') as f:
+        return next(csv.reader(f), [])
+
+def iter_csv_chunks(file_path, usecols: Optional[Sequence[str]] = None,
+                    chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """
+    分块读取CSV，所有列按字符串读取，不做类型推断，数值转换由clean_data完成
+    优先使用pyarrow的流式CSV读取器（read_csv的pyarrow引擎不支持chunksize），未安装时使用pandas的C引擎
+    :param usecols: 只读取的列，按文件中的顺序输出
+    """
+    names = read_header(file_path)
+    columns = [name for name in names if usecols is None or name in usecols]
+    try:
+        import pyarrow as pa
+        from pyarrow import csv as pa_csv
+    except ImportError:
+        pa_csv = None
+
+    if pa_csv is None:
+        for chunk in pd.read_csv(file_path, usecols=columns, dtype=str, chunksize=chunk_rows, engine='c',
+                                 encoding='utf-8', keep_default_na=False, na_filter=False):
+            yield chunk
+        return
+
+    # pyarrow在后台预读多个块，块大小保持默认的1MB，预读占用的内存与文件大小无关；读出的块拼成chunk_rows行再产出
+    reader = pa_csv.open_csv(
+        file_path,
+        # 评论内容可能包含换行
+        parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+        convert_options=pa_csv.ConvertOptions(column_types={name: pa.string() for name in names},
+                                              include_columns=columns)
+    )
+    batches, rows = [], 0
+    for batch in reader:
+        batches.append(batch)
+        rows += batch.num_rows
+        if rows >= chunk_rows:
+            yield pa.Table.from_batches(batches).to_pandas()
+            batches, rows = [], 0
+    if batches:
+        yield pa.Table.from_batches(batches).to_pandas()
+
+def clean_csv_in_chunks(file_path, columns, usecols: Optional[Sequence[str]] = None,
+                        chunk_rows: int = DEFAULT_CHUNK_ROWS) -> int:
+    """
+    分块清洗CSV并原子替换原文件，适用于大于内存的文件
+    :return: 清洗后的行数
+    """
+    rows = 0
+    header = True
+    with atomic_csv(file_path) as f:
+        for chunk in iter_csv_chunks(file_path, usecols, chunk_rows):
+            cleaned = clean_data(chunk, columns)
+            cleaned.to_csv(f, index=False, header=header)
+            header = False
+            rows += len(cleaned)
+        if header:
+            # 只有表头的文件
+            pd.DataFrame(columns=[name for name in read_header(file_path)
+                                  if usecols is None or name in usecols]).to_csv(f, index=False)
+    return rows
+
+def clean_and_save_data(data, columns, file_path):
+    # 清洗数据
+    cleaned_data = clean_data(data, columns)
+
+    # 保存清洗后的数据，写入临时文件后替换，写入中途失败不会损坏原文件
+    with atomic_csv(file_path) as f:
+        cleaned_data.to_csv(f, index=False)
+
+def process_video_data(file_path, chunk_rows: Optional[int] = None):
+    # chunk_rows不为None时分块清洗
+    if chunk_rows:
+        return clean_csv_in_chunks(file_path, ['views', 'likes', 'comments', 'shares'], chunk_rows=chunk_rows)
+
+    # 读取CSV文件
+    video_data = pd.read_csv(file_path)
+
+    # 清洗并保存数据
+    clean_and_save_data(video_data, ['views', 'likes', 'comments', 'shares'], file_path)
+
+def process_account_data(file_path, chunk_rows: Optional[int] = None):
+    # chunk_rows不为None时分块清洗
+    if chunk_rows:
+        return clean_csv_in_chunks(file_path, ['followers', 'following', 'videos'], chunk_rows=chunk_rows)
+
+    # 读取CSV文件
+    account_data = pd.read_csv(file_path)
+
+    # 清洗并保存数据
+    clean_and_save_data(account_data, ['followers', 'following', 'videos'], file_path)
+
+def process_comments_data(file_path, chunk_rows: Optional[int] = DEFAULT_CHUNK_ROWS):
+    # 评论导出文件可能大于内存，默认分块清洗
+    if chunk_rows:
+        return clean_csv_in_chunks(file_path, ['likes'], chunk_rows=chunk_rows)
+
+    # 读取CSV文件
+    comments_data = pd.read_csv(file_path)
+
+    # 清洗并保存数据
+    clean_and_save_data(comments_data, ['likes'], file_path)
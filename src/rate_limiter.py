@@ -0,0 +1,218 @@
+import logging
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """
+        令牌桶限流器
+        :param rate: 每秒生成的令牌数
+        :param capacity: 桶容量，决定允许的突发请求数，默认等于rate
+        """
+        self.rate = float(rate)
+        self.fixed_capacity = capacity is not None
+        self.capacity = float(capacity if capacity is not None else max(rate, 1.0))
+        self.tokens = self.capacity
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now: float):
+        elapsed = now - self.last_refill
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.last_refill = now
+
+    def set_rate(self, rate: float):
+        with self.lock:
+            self._refill(time.monotonic())
+            self.rate = float(rate)
+            if not self.fixed_capacity:
+                self.capacity = max(self.rate, 1.0)
+                self.tokens = min(self.tokens, self.capacity)
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """
+        尝试获取令牌，不阻塞
+        :return: 获取成功返回0，否则返回还需等待的秒数
+        """
+        with self.lock:
+            self._refill(time.monotonic())
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return 0.0
+            return (tokens - self.tokens) / self.rate
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """
+        获取令牌，令牌不足时阻塞等待
+        :return: 等待的秒数
+        """
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return waited
+                delay = (tokens - self.tokens) / self.rate
+            # 在锁外休眠，避免阻塞其他线程更新速率
+            time.sleep(delay)
+            waited += delay
+
+
+class AIMDController:
+    def __init__(self, initial_rate: float = 5.0, min_rate: float = 0.5, max_rate: float = 50.0,
+                 initial_concurrency: float = 4.0, max_concurrency: float = 32.0,
+                 increase: float = 1.0, decrease: float = 0.5,
+                 latency_tolerance: float = 1.5, cooldown: float = 1.0, baseline_window: float = 5.0):
+        """
+        加性增/乘性减（AIMD）控制器，同时调节请求速率和并发上限
+        :param increase: 每个往返窗口内的加性增量
+        :param decrease: 被限流或服务端出错时的乘性减因子
+        :param latency_tolerance: 平滑延迟超过基线的倍数时停止增长
+        :param cooldown: 两次乘性减之间的最短间隔（秒），避免同一波错误重复降速
+        :param baseline_window: 延迟基线取最近多少秒内平滑延迟的最小值；延迟持续升高超过这个时间后基线随之升高，
+                                速率可以继续增长，不会被很久以前的最低延迟卡住
+        """
+        self.rate = float(initial_rate)
+        self.min_rate = float(min_rate)
+        self.max_rate = float(max_rate)
+        self.concurrency = float(initial_concurrency)
+        self.max_concurrency = float(max_concurrency)
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance
+        self.cooldown = cooldown
+        self.baseline_window = baseline_window
+
+        self.latency_ewma = None
+        self.latency_baseline = None
+        # (时间, 平滑延迟)的单调递增队列，队首为窗口内的最小值
+        self.latency_window = deque()
+        self.last_decrease = 0.0
+        self.successes = 0
+        self.backoffs = 0
+
+    def _observe_latency(self, latency: float):
+        now = time.monotonic()
+        if self.latency_ewma is None:
+            self.latency_ewma = latency
+        else:
+            self.latency_ewma = 0.8 * self.latency_ewma + 0.2 * latency
+        # 基线取最近baseline_window秒内平滑延迟的最小值
+        while self.latency_window and self.latency_window[-1][1] >= self.latency_ewma:
+            self.latency_window.pop()
+        self.latency_window.append((now, self.latency_ewma))
+        while self.latency_window[0][0] < now - self.baseline_window:
+            self.latency_window.popleft()
+        self.latency_baseline = self.latency_window[0][1]
+
+    def on_success(self, latency: float):
+        self.successes += 1
+        self._observe_latency(latency)
+        if self.latency_ewma > self.latency_baseline * self.latency_tolerance:
+            # 延迟明显上升，保持当前速率
+            return
+        # 每次成功增加 increase/并发上限，相当于每个往返窗口增加 increase
+        self.rate = min(self.max_rate, self.rate + self.increase / max(self.concurrency, 1.0))
+        self.concurrency = min(self.max_concurrency,
+                               self.concurrency + self.increase / max(self.concurrency, 1.0))
+
+    def on_backoff(self) -> bool:
+        """
+        :return: 本次是否实际降速（冷却期内的重复信号会被忽略）
+        """
+        now = time.monotonic()
+        if now - self.last_decrease < self.cooldown:
+            return False
+        self.last_decrease = now
+        self.backoffs += 1
+        self.rate = max(self.min_rate, self.rate * self.decrease)
+        self.concurrency = max(1.0, self.concurrency * self.decrease)
+        return True
+
+
+class HostLimiter:
+    def __init__(self, host: str, config: Dict):
+        self.host = host
+        controller_config = {key: value for key, value in config.items() if key != 'burst'}
+        self.controller = AIMDController(**controller_config)
+        self.bucket = TokenBucket(self.controller.rate, capacity=config.get('burst'))
+        self.in_flight = 0
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        with self.condition:
+            while self.in_flight >= int(self.controller.concurrency):
+                self.condition.wait()
+            self.in_flight += 1
+        self.bucket.acquire()
+
+    def release(self, latency: float, status_code: Optional[int]):
+        with self.condition:
+            self.in_flight -= 1
+            throttled = status_code is None or status_code == 429 or status_code >= 500
+            if throttled:
+                if self.controller.on_backoff():
+                    logger.warning(f"{self.host} 请求被限流或出错(状态码: {status_code})，"
+                                   f"速率降至 {self.controller.rate:.2f} 次/秒，并发上限 {int(self.controller.concurrency)}")
+            else:
+                self.controller.on_success(latency)
+            self.bucket.set_rate(self.controller.rate)
+            self.condition.notify_all()
+
+    def stats(self) -> Dict:
+        with self.condition:
+            return {
+                'rate': round(self.controller.rate, 3),
+                'concurrency_limit': int(self.controller.concurrency),
+                'in_flight': self.in_flight,
+                'latency_ms': round(self.controller.latency_ewma * 1000, 1) if self.controller.latency_ewma else None,
+                'successes': self.controller.successes,
+                'backoffs': self.controller.backoffs
+            }
+
+
+class AdaptiveRateLimiter:
+    def __init__(self, config: Optional[Dict] = None):
+        """
+        按主机划分的自适应限流器，每个主机一个令牌桶和一个AIMD控制器
+        :param config: AIMDController参数，另可包含burst（令牌桶容量）
+        """
+        self.config = dict(config or {})
+        self.hosts: Dict[str, HostLimiter] = {}
+        self.lock = threading.Lock()
+
+    def _get_host(self, host: str) -> HostLimiter:
+        with self.lock:
+            limiter = self.hosts.get(host)
+            if limiter is None:
+                limiter = HostLimiter(host, self.config)
+                self.hosts[host] = limiter
+            return limiter
+
+    def acquire(self, host: str):
+        """
+        请求发出前调用，等待并发槽位和令牌
+        """
+        self._get_host(host).acquire()
+
+    def release(self, host: str, latency: float, status_code: Optional[int]):
+        """
+        请求结束后调用，status_code为None表示连接失败或超时
+        """
+        self._get_host(host).release(latency, status_code)
+
+    def current_rate(self, host: str) -> float:
+        return self._get_host(host).controller.rate
+
+    def stats(self) -> Dict[str, Dict]:
+        with self.lock:
+            hosts = list(self.hosts.items())
+        return {host: limiter.stats() for host, limiter in hosts}
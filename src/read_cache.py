@@ -0,0 +1,267 @@
+import json
+import logging
+import pickle
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional
+
+from single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# 各类对象的默认缓存有效期（秒）；DataStorage按快照类型，数据库查询按表名
+DEFAULT_TTL = {
+    'video': 300,
+    'user': 1800,
+    'hashtag': 300,
+    'trending': 60,
+    'videos': 300,
+    'accounts': 1800
+}
+
+# StorageBase的写入方法会修改的表（集合），写入后这些表上的查询缓存全部失效
+STORE_TABLES = (
+    'videos', 'accounts',
+    'video_snapshots', 'video_snapshots_hourly', 'video_snapshots_daily',
+    'account_snapshots', 'account_snapshots_hourly', 'account_snapshots_daily'
+)
+
+# 条目的固定开销估算（字节）：键、OrderedDict节点和元数据
+ENTRY_OVERHEAD = 200
+
+SQL_TABLE_PATTERN = re.compile(r'\b(?:FROM|JOIN)\s+`?(\w+)`?', re.IGNORECASE)
+
+
+class _Entry:
+    __slots__ = ('payload', 'size', 'expires_at', 'generations')
+
+    def __init__(self, payload: bytes, expires_at: float, generations: tuple):
+        self.payload = payload
+        self.size = len(payload) + ENTRY_OVERHEAD
+        self.expires_at = expires_at
+        self.generations = generations
+
+
+class ReadCache:
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, ttl: Optional[Dict[str, float]] = None,
+                 default_ttl: float = 60.0):
+        """
+        读穿透的内存缓存，按最近最少使用淘汰
+        值以pickle序列化保存：大小按序列化后的字节数计入内存预算，每次命中返回独立的副本，调用方修改结果不会影响缓存
+        失效方式：
+        - invalidate(kind, key) 删除单个条目，写入对象后调用
+        - invalidate_kind(kind) 递增该类型的版本号，依赖该类型的条目在下次读取时视为过期，用于无法按键失效的查询缓存
+        :param max_bytes: 内存预算，单个超过预算四分之一的值不缓存
+        :param ttl: 各类型的有效期（秒），未指定的使用DEFAULT_TTL，再没有的使用default_ttl
+        """
+        self.max_bytes = max_bytes
+        self.ttl = dict(DEFAULT_TTL)
+        if ttl:
+            self.ttl.update(ttl)
+        self.default_ttl = default_ttl
+        self.lock = threading.Lock()
+        self.entries: 'OrderedDict[tuple, _Entry]' = OrderedDict()
+        self.size = 0
+        self.generations: Dict[str, int] = {}
+        # 正在加载的键，加载期间被失效的键加载完成后不写入缓存
+        self.loading: Dict[tuple, bool] = {}
+        self.single_flight = SingleFlight()
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.oversized = 0
+        self.by_kind: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, kind: str, name: str):
+        counts = self.by_kind.setdefault(kind, {'hits': 0, 'misses': 0})
+        counts[name] += 1
+
+    def _generations(self, tags: Iterable[str]) -> tuple:
+        return tuple(self.generations.get(tag, 0) for tag in tags)
+
+    def _remove(self, cache_key: tuple):
+        entry = self.entries.pop(cache_key, None)
+        if entry is not None:
+            self.size -= entry.size
+
+    def _lookup(self, cache_key: tuple, tags: tuple):
+        """
+        :return: 命中时返回条目，否则返回None；过期或已失效的条目同时被删除
+        """
+        entry = self.entries.get(cache_key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic() or entry.generations != self._generations(tags):
+            self._remove(cache_key)
+            self.expired += 1
+            return None
+        self.entries.move_to_end(cache_key)
+        return entry
+
+    def _store(self, cache_key: tuple, kind: str, payload: bytes, generations: tuple):
+        if len(payload) + ENTRY_OVERHEAD > self.max_bytes // 4:
+            self.oversized += 1
+            return
+        self._remove(cache_key)
+        entry = _Entry(payload, time.monotonic() + self.ttl.get(kind, self.default_ttl), generations)
+        self.entries[cache_key] = entry
+        self.size += entry.size
+        while self.size > self.max_bytes and self.entries:
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= evicted.size
+            self.evictions += 1
+
+    @staticmethod
+    def _dumps(kind: str, value: Any) -> Optional[bytes]:
+        try:
+            return pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError) as e:
+            logger.debug(f"{kind} 的值无法序列化，不缓存: {str(e)}")
+            return None
+
+    def get_or_load(self, kind: str, key: Hashable, loader: Callable[[], Any],
+                    tags: Iterable[str] = ()) -> Any:
+        """
+        命中时返回缓存的值，否则调用loader读取并写入缓存；同一个键的并发未命中只读取一次
+        loader返回None（不存在或读取失败）时不缓存
+        :param kind: 对象类型，决定有效期
+        :param tags: 值还依赖的其他类型，其中任一类型invalidate_kind()后条目失效
+        """
+        cache_key = (kind, key)
+        tags = (kind,) + tuple(tag for tag in tags if tag != kind)
+        with self.lock:
+            entry = self._lookup(cache_key, tags)
+            if entry is not None:
+                self.hits += 1
+                self._count(kind, 'hits')
+                return pickle.loads(entry.payload)
+            self.misses += 1
+            self._count(kind, 'misses')
+
+        def load():
+            with self.lock:
+                self.loading[cache_key] = False
+                # 读取前记录版本号，读取期间发生的invalidate_kind()会使写入的条目立即失效
+                generations = self._generations(tags)
+            payload = None
+            try:
+                value = loader()
+                if value is not None:
+                    payload = self._dumps(kind, value)
+            finally:
+                # 序列化之后再在同一个锁内检查并写入，加载和序列化期间发生的invalidate都不会被漏掉
+                with self.lock:
+                    stale = self.loading.pop(cache_key, True)
+                    if payload is not None and not stale:
+                        self._store(cache_key, kind, payload, generations)
+            return value, payload
+
+        # 等待方共享同一次读取的结果，各自从序列化的副本还原
+        value, payload = self.single_flight.do(cache_key, load)
+        return pickle.loads(payload) if payload is not None else value
+
+    def invalidate(self, kind: str, key: Hashable):
+        cache_key = (kind, key)
+        with self.lock:
+            self._remove(cache_key)
+            if cache_key in self.loading:
+                self.loading[cache_key] = True
+            self.invalidations += 1
+
+    def invalidate_kind(self, kind: str):
+        with self.lock:
+            self.generations[kind] = self.generations.get(kind, 0) + 1
+            self.invalidations += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+            for cache_key in self.loading:
+                self.loading[cache_key] = True
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'expired': self.expired,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'oversized': self.oversized,
+                'entries': len(self.entries),
+                'size_bytes': self.size,
+                'max_bytes': self.max_bytes,
+                'by_kind': {
+                    kind: dict(counts, hit_rate=counts['hits'] / (counts['hits'] + counts['misses']))
+                    for kind, counts in self.by_kind.items()
+                }
+            }
+
+
+def create_read_cache(config: Optional[Dict]) -> Optional[ReadCache]:
+    """
+    从配置创建缓存：max_mb（内存预算，默认64MB）、ttl（各类型有效期）、default_ttl；配置为None时不启用
+    """
+    if config is None:
+        return None
+    return ReadCache(
+        max_bytes=int(config.get('max_mb', 64) * 1024 * 1024),
+        ttl=config.get('ttl'),
+        default_ttl=config.get('default_ttl', 60.0)
+    )
+
+
+class CachedStorage:
+    def __init__(self, storage, cache: ReadCache):
+        """
+        StorageBase的读穿透缓存包装：retrieve_data按查询缓存，store_data/store_many/compact_snapshots
+        之后使写入的表上的查询缓存全部失效；其他方法直接转发给被包装的存储
+        MySQL/SQLite查询的类型取FROM/JOIN的表名，MongoDB查询同时读取videos和accounts
+        """
+        self.storage = storage
+        self.cache = cache
+
+    def __getattr__(self, name):
+        if name in ('storage', 'cache'):
+            raise AttributeError(name)
+        return getattr(self.storage, name)
+
+    def retrieve_data(self, query, *args, **kwargs):
+        if isinstance(query, str):
+            tables = list(dict.fromkeys(table.lower() for table in SQL_TABLE_PATTERN.findall(query))) or ['query']
+            key = (query, repr(args), repr(sorted(kwargs.items())))
+        else:
+            tables = ['videos', 'accounts']
+            key = (json.dumps(query, sort_keys=True, default=str), repr(args), repr(sorted(kwargs.items())))
+        return self.cache.get_or_load(tables[0], key, lambda: self.storage.retrieve_data(query, *args, **kwargs),
+                                      tags=tables[1:])
+
+    def _invalidate_writes(self):
+        for table in STORE_TABLES:
+            self.cache.invalidate_kind(table)
+
+    def store_data(self, data):
+        try:
+            return self.storage.store_data(data)
+        finally:
+            self._invalidate_writes()
+
+    def store_many(self, records):
+        try:
+            return self.storage.store_many(records)
+        finally:
+            self._invalidate_writes()
+
+    def compact_snapshots(self, *args, **kwargs):
+        try:
+            return self.storage.compact_snapshots(*args, **kwargs)
+        finally:
+            self._invalidate_writes()
@@ -0,0 +1,274 @@
+import argparse
+import heapq
+import itertools
+import json
+import logging
+import os
+import signal
+import threading
+import time
+from typing import Dict, List, Optional
+from rate_limiter import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# 用于计算增长速度的指标
+VELOCITY_METRICS = {
+    'video': ['likes', 'comments', 'shares'],
+    'user': ['follower_count']
+}
+
+
+class TrackedItem:
+    def __init__(self, kind: str, entity_id: str, next_refresh: float = 0.0, interval: Optional[float] = None,
+                 velocity: float = 0.0, last_metrics: Optional[Dict[str, int]] = None,
+                 last_fetched_at: Optional[float] = None):
+        self.kind = kind
+        self.entity_id = entity_id
+        self.next_refresh = next_refresh
+        self.interval = interval
+        self.velocity = velocity
+        self.last_metrics = last_metrics
+        self.last_fetched_at = last_fetched_at
+
+    def to_dict(self) -> Dict:
+        return dict(self.__dict__)
+
+
+class RefreshScheduler:
+    def __init__(self, data_getter, data_storage, requests_per_hour: float = 600, min_interval: float = 300,
+                 max_interval: float = 86400, target_delta: float = 100, smoothing: float = 0.5,
+                 state_path: Optional[str] = None):
+        """
+        按增长速度安排刷新的调度器
+        每个跟踪对象的下次刷新时间由相邻两次快照之间的互动增量（点赞、评论、分享或粉丝数）决定：
+        预计累积target_delta次互动所需的时间即为刷新间隔，并限制在[min_interval, max_interval]之间。
+        所有刷新共用一个固定的请求预算，增长快的对象刷新间隔短，自然获得更多预算。
+        :param requests_per_hour: 每小时的请求预算
+        :param target_delta: 每次刷新期望观察到的互动增量
+        :param smoothing: 增长速度的平滑系数，越大越偏向最新一次的观测
+        :param state_path: 跟踪状态文件，重启后恢复各对象的增长速度和刷新时间
+        """
+        self.data_getter = data_getter
+        self.data_storage = data_storage
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.target_delta = target_delta
+        self.smoothing = smoothing
+        self.state_path = state_path
+        self.budget = TokenBucket(requests_per_hour / 3600.0, capacity=1)
+
+        self.items: Dict[tuple, TrackedItem] = {}
+        self.queue: List[tuple] = []
+        self.counter = itertools.count()
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.refreshed = 0
+        self.failed = 0
+
+        if state_path and os.path.exists(state_path):
+            self._load_state()
+
+    def _push(self, item: TrackedItem):
+        heapq.heappush(self.queue, (item.next_refresh, next(self.counter), item.kind, item.entity_id))
+
+    def track(self, kind: str, entity_id: str):
+        """
+        加入跟踪，新对象立即刷新一次
+        """
+        if kind not in VELOCITY_METRICS:
+            raise ValueError(f"不支持的跟踪类型: {kind}")
+        with self.lock:
+            key = (kind, entity_id)
+            if key in self.items:
+                return
+            item = TrackedItem(kind, entity_id, next_refresh=time.time())
+            self.items[key] = item
+            self._push(item)
+
+    def untrack(self, kind: str, entity_id: str):
+        with self.lock:
+            # 队列中的旧条目在出队时被忽略
+            self.items.pop((kind, entity_id), None)
+
+    def _compute_interval(self, item: TrackedItem, metrics: Dict[str, int], now: float) -> float:
+        if item.last_metrics is not None and item.last_fetched_at is not None:
+            hours = max(now - item.last_fetched_at, 1.0) / 3600.0
+            delta = sum(max(metrics.get(name, 0) - item.last_metrics.get(name, 0), 0)
+                        for name in VELOCITY_METRICS[item.kind])
+            observed = delta / hours
+            item.velocity = self.smoothing * observed + (1 - self.smoothing) * item.velocity
+        item.last_metrics = metrics
+        item.last_fetched_at = now
+
+        if item.velocity <= 0:
+            return self.max_interval if item.interval is not None else self.min_interval
+        interval = self.target_delta / item.velocity * 3600.0
+        return min(self.max_interval, max(self.min_interval, interval))
+
+    def _fetch_and_save(self, item: TrackedItem) -> Optional[Dict]:
+        if item.kind == 'video':
+            data = self.data_getter.get_video_data(item.entity_id)
+            if data and self.data_storage.save_video_data(data):
+                return data
+        else:
+            data = self.data_getter.get_user_data(item.entity_id)
+            if data and self.data_storage.save_user_data(data):
+                return data
+        return None
+
+    def _next_due(self) -> Optional[TrackedItem]:
+        """
+        等待并取出下一个到期的对象，调度器停止时返回None
+        """
+        while not self.stop_event.is_set():
+            with self.lock:
+                if self.queue:
+                    due, _, kind, entity_id = self.queue[0]
+                    item = self.items.get((kind, entity_id))
+                    if item is None or item.next_refresh != due:
+                        heapq.heappop(self.queue)
+                        continue
+                    wait = due - time.time()
+                    if wait <= 0:
+                        heapq.heappop(self.queue)
+                        return item
+                else:
+                    wait = 60
+            self.stop_event.wait(min(wait, 60))
+        return None
+
+    def run_once(self, item: TrackedItem):
+        now = time.time()
+        try:
+            data = self._fetch_and_save(item)
+        except Exception as e:
+            logger.error(f"刷新 {item.kind} {item.entity_id} 失败: {str(e)}")
+            data = None
+
+        with self.lock:
+            if data is None:
+                self.failed += 1
+                # 失败后按最小间隔重试，不更新增长速度
+                interval = self.min_interval
+            else:
+                self.refreshed += 1
+                metrics = {name: data.get(name, 0) for name in VELOCITY_METRICS[item.kind]}
+                interval = self._compute_interval(item, metrics, now)
+            item.interval = interval
+            item.next_refresh = now + interval
+            if (item.kind, item.entity_id) in self.items:
+                self._push(item)
+        logger.info(f"刷新 {item.kind} {item.entity_id}: 增长速度 {item.velocity:.1f}/小时, "
+                    f"{interval / 60:.1f} 分钟后再次刷新")
+
+    def run_forever(self, save_interval: float = 300):
+        """
+        持续运行，直到调用stop()
+        """
+        last_save = time.time()
+        while True:
+            item = self._next_due()
+            if item is None:
+                break
+            # 请求预算用尽时在这里等待，到期的对象按到期时间先后获得预算
+            delay = self.budget.try_acquire()
+            while delay > 0 and not self.stop_event.wait(delay):
+                delay = self.budget.try_acquire()
+            if self.stop_event.is_set():
+                break
+            self.run_once(item)
+            if self.state_path and time.time() - last_save >= save_interval:
+                self.save_state()
+                last_save = time.time()
+        if self.state_path:
+            self.save_state()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def stats(self) -> Dict:
+        with self.lock:
+            return {
+                'tracked': len(self.items),
+                'refreshed': self.refreshed,
+                'failed': self.failed,
+                'next_refresh_in': max(0.0, self.queue[0][0] - time.time()) if self.queue else None
+            }
+
+    def save_state(self):
+        with self.lock:
+            state = [item.to_dict() for item in self.items.values()]
+        tmp_path = f'{self.state_path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(tmp_path, self.state_path)
+
+    def _load_state(self):
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except Exception as e:
+            logger.error(f"加载调度状态失败: {str(e)}")
+            return
+        for entry in state:
+            item = TrackedItem(**entry)
+            self.items[(item.kind, item.entity_id)] = item
+            self._push(item)
+        logger.info(f"已恢复 {len(state)} 个跟踪对象")
+
+
+def main():
+    from data_getter import DataGetter
+    from data_storage import DataStorage
+
+    parser = argparse.ArgumentParser(description='抖音数据刷新调度器')
+    parser.add_argument('--config', type=str, default='config/data_getter_config.json',
+                        help='数据获取器配置文件路径')
+    parser.add_argument('--targets', type=str, required=True,
+                        help='跟踪对象文件，格式: {"videos": [...], "users": [...]}')
+    parser.add_argument('--storage_type', type=str, choices=['file', 'log', 'parquet', 'mysql', 'mongodb'], default='file',
+                        help='数据存储类型')
+    parser.add_argument('--storage_config', type=str, default=None,
+                        help='数据库配置文件路径')
+    parser.add_argument('--budget', type=float, default=600, help='每小时请求预算')
+    parser.add_argument('--min_interval', type=float, default=300, help='最短刷新间隔（秒）')
+    parser.add_argument('--max_interval', type=float, default=86400, help='最长刷新间隔（秒）')
+    parser.add_argument('--state', type=str, default='data/scheduler_state.json', help='调度状态文件')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    with open(args.targets, 'r', encoding='utf-8') as f:
+        targets = json.load(f)
+    storage_config = None
+    if args.storage_type != 'file' and args.storage_config:
+        with open(args.storage_config, 'r', encoding='utf-8') as f:
+            storage_config = json.load(f)
+
+    data_storage = DataStorage(storage_type=args.storage_type, storage_path='data/', db_config=storage_config)
+    scheduler = RefreshScheduler(
+        DataGetter(args.config),
+        data_storage,
+        requests_per_hour=args.budget,
+        min_interval=args.min_interval,
+        max_interval=args.max_interval,
+        state_path=args.state
+    )
+    for video_id in targets.get('videos', []):
+        scheduler.track('video', str(video_id))
+    for user_id in targets.get('users', []):
+        scheduler.track('user', str(user_id))
+
+    signal.signal(signal.SIGINT, lambda *_: scheduler.stop())
+    signal.signal(signal.SIGTERM, lambda *_: scheduler.stop())
+    logger.info(f"调度器启动，跟踪 {scheduler.stats()['tracked']} 个对象，每小时预算 {args.budget} 次请求")
+    try:
+        scheduler.run_forever()
+    finally:
+        data_storage.close()
+    logger.info(f"调度器已停止: {scheduler.stats()}")
+
+
+if __name__ == "__main__":
+    main()
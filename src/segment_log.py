@@ -0,0 +1,404 @@
+import argparse
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_PATTERN = re.compile(r'^(\d{8})\.jsonl(\.gz)?$')
+READ_CHUNK = 1024 * 1024
+# 损坏记录之后重新同步时查找的记录开头：未压缩记录总是以kind字段开头，压缩记录是gzip成员
+RECORD_HEADER = b'{"kind":'
+GZIP_HEADER = b'\x1f\x8b\x08'
+
+
+def _parse(data: bytes) -> Optional[Dict]:
+    try:
+        record = json.loads(data)
+    except ValueError:
+        return None
+    return record if isinstance(record, dict) and 'kind' in record and 'id' in record else None
+
+
+class SegmentLog:
+    def __init__(self, log_dir: str = 'data/log', segment_size: int = 64 * 1024 * 1024, compress: bool = False,
+                 fsync: bool = False, index_interval: int = 100):
+        """
+        只追加的分段日志存储
+        每次保存追加一条JSON记录（类型、ID、时间戳和数据）到当前段文件，段文件超过segment_size后轮换；
+        SQLite偏移索引只记录每个对象最新快照所在的段和偏移，get()一次定位读取，历史快照通过顺序扫描获得
+        :param segment_size: 单个段文件的字节数上限
+        :param compress: 是否压缩新段，压缩段中每条记录是一个独立的gzip成员，整个段仍是合法的.gz文件
+        :param fsync: 每次追加后是否fsync
+        :param index_interval: 每追加多少条记录提交一次索引，未提交的部分在下次打开时从段文件补齐
+        """
+        os.makedirs(log_dir, exist_ok=True)
+        self.log_dir = log_dir
+        self.segment_size = segment_size
+        self.compress = compress
+        self.fsync = fsync
+        self.index_interval = index_interval
+        self.lock = threading.Lock()
+        self.readers: Dict[int, object] = {}
+        self.unindexed = 0
+        self.appended = 0
+
+        self.conn = sqlite3.connect(os.path.join(log_dir, 'index.sqlite'), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS latest (
+                kind TEXT,
+                entity_id TEXT,
+                segment INTEGER,
+                offset INTEGER,
+                length INTEGER,
+                ts REAL,
+                PRIMARY KEY (kind, entity_id)
+            ) WITHOUT ROWID
+        """)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER)")
+        self.conn.commit()
+
+        self._recover()
+        segments = self.segments()
+        if segments and self._segment_path(segments[-1]).endswith('.gz') == compress:
+            self.segment = segments[-1]
+        else:
+            self.segment = segments[-1] + 1 if segments else 1
+        self.writer = open(self._segment_path(self.segment), 'ab')
+
+    def _segment_path(self, segment: int) -> str:
+        for suffix in ('.jsonl', '.jsonl.gz'):
+            path = os.path.join(self.log_dir, f'{segment:08d}{suffix}')
+            if os.path.exists(path):
+                return path
+        return os.path.join(self.log_dir, f'{segment:08d}.jsonl' + ('.gz' if self.compress else ''))
+
+    def segments(self) -> List[int]:
+        return sorted(int(match.group(1)) for match in map(SEGMENT_PATTERN.match, os.listdir(self.log_dir))
+                      if match)
+
+    @staticmethod
+    def _encode(record: Dict, compressed: bool) -> bytes:
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n'
+        if compressed:
+            compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+            return compressor.compress(line) + compressor.flush()
+        return line
+
+    @staticmethod
+    def _decode(data: bytes, compressed: bool) -> Dict:
+        if compressed:
+            data = zlib.decompress(data, 31)
+        return json.loads(data)
+
+    def _iter_segment(self, segment: int, start: int = 0) -> Iterator[Tuple[int, int, Dict]]:
+        """
+        从指定偏移开始顺序读取段文件，产出 (偏移, 长度, 记录)；
+        中间损坏的记录跳过，从下一条可以解码的记录继续；之后没有可以解码的记录时视为不完整的尾部记录并停止
+        """
+        path = self._segment_path(segment)
+        compressed = path.endswith('.gz')
+        offset: Optional[int] = start
+        while offset is not None:
+            bad = yield from self._iter_records(path, compressed, offset)
+            if bad is None:
+                return
+            offset = self._resync(path, compressed, bad + 1)
+            if offset is not None:
+                logger.warning(f"段文件 {path} 偏移 {bad} 处的记录已损坏，跳过 {offset - bad} 字节")
+
+    @staticmethod
+    def _iter_records(path: str, compressed: bool, start: int):
+        """
+        顺序读取记录直到文件末尾或第一条无法解码的记录，返回该记录的偏移；正常读完时返回None
+        """
+        with open(path, 'rb') as f:
+            f.seek(start)
+            offset = start
+            if not compressed:
+                for line in f:
+                    record = _parse(line) if line.endswith(b'\n') else None
+                    if record is None:
+                        return offset
+                    yield offset, len(line), record
+                    offset += len(line)
+                return None
+
+            decompressor = zlib.decompressobj(31)
+            output = b''
+            consumed = 0
+            while True:
+                chunk = f.read(READ_CHUNK)
+                if not chunk:
+                    return offset if consumed else None
+                buffer = chunk
+                while buffer:
+                    try:
+                        output += decompressor.decompress(buffer)
+                    except zlib.error:
+                        return offset
+                    if not decompressor.eof:
+                        consumed += len(buffer)
+                        break
+                    rest = decompressor.unused_data
+                    length = consumed + len(buffer) - len(rest)
+                    record = _parse(output)
+                    if record is None:
+                        return offset
+                    yield offset, length, record
+                    offset += length
+                    buffer = rest
+                    decompressor = zlib.decompressobj(31)
+                    output = b''
+                    consumed = 0
+
+    @staticmethod
+    def _resync(path: str, compressed: bool, start: int) -> Optional[int]:
+        """
+        从start开始查找下一条可以完整解码的记录的偏移，找不到时返回None
+        """
+        header = GZIP_HEADER if compressed else RECORD_HEADER
+        with open(path, 'rb') as f:
+            position = start
+            while True:
+                f.seek(position)
+                chunk = f.read(READ_CHUNK)
+                if len(chunk) < len(header):
+                    return None
+                index = chunk.find(header)
+                while index >= 0:
+                    candidate = position + index
+                    if SegmentLog._decodes_at(f, compressed, candidate):
+                        return candidate
+                    index = chunk.find(header, index + 1)
+                # 相邻两块之间可能正好切开一个记录头
+                position += len(chunk) - len(header) + 1
+
+    @staticmethod
+    def _decodes_at(f, compressed: bool, offset: int) -> bool:
+        f.seek(offset)
+        if not compressed:
+            line = f.readline()
+            return line.endswith(b'\n') and _parse(line) is not None
+        decompressor = zlib.decompressobj(31)
+        output = b''
+        while not decompressor.eof:
+            chunk = f.read(READ_CHUNK)
+            if not chunk:
+                return False
+            try:
+                output += decompressor.decompress(chunk)
+            except zlib.error:
+                return False
+        return _parse(output) is not None
+
+    def _index(self, segment: int, offset: int, length: int, record: Dict):
+        self.conn.execute("""
+            INSERT INTO latest (kind, entity_id, segment, offset, length, ts) VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(kind, entity_id) DO UPDATE SET
+                segment = excluded.segment,
+                offset = excluded.offset,
+                length = excluded.length,
+                ts = excluded.ts
+            WHERE excluded.segment > latest.segment
+               OR (excluded.segment = latest.segment AND excluded.offset >= latest.offset)
+        """, (record['kind'], record['id'], segment, offset, length, record['ts']))
+
+    def _set_position(self, segment: int, offset: int):
+        self.conn.executemany("INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)",
+                              [('segment', segment), ('offset', offset)])
+
+    def _position(self) -> Tuple[int, int]:
+        meta = dict(self.conn.execute("SELECT name, value FROM meta").fetchall())
+        return meta.get('segment', 0), meta.get('offset', 0)
+
+    def _recover(self):
+        """
+        把上次提交索引之后追加的记录补入索引，并截掉异常退出时写了一半的尾部记录；
+        中间损坏的记录由_iter_segment跳过，其后的记录照常补入索引
+        """
+        indexed_segment, indexed_offset = self._position()
+        recovered = 0
+        for segment in self.segments():
+            if segment < indexed_segment:
+                continue
+            start = indexed_offset if segment == indexed_segment else 0
+            end = start
+            for offset, length, record in self._iter_segment(segment, start):
+                self._index(segment, offset, length, record)
+                end = offset + length
+                recovered += 1
+            path = self._segment_path(segment)
+            if os.path.getsize(path) > end:
+                logger.warning(f"段文件 {path} 尾部存在不完整的记录，已截断到 {end} 字节")
+                with open(path, 'r+b') as f:
+                    f.truncate(end)
+            self._set_position(segment, end)
+        self.conn.commit()
+        if recovered:
+            logger.info(f"从段文件补齐索引 {recovered} 条")
+
+    def append(self, kind: str, entity_id: str, data, timestamp: Optional[float] = None) -> Tuple[int, int]:
+        """
+        追加一条快照
+        :return: (段号, 偏移)
+        """
+        record = {'kind': kind, 'id': str(entity_id), 'ts': timestamp or time.time(), 'data': data}
+        with self.lock:
+            payload = self._encode(record, self.writer.name.endswith('.gz'))
+            offset = self.writer.tell()
+            if offset and offset + len(payload) > self.segment_size:
+                self._rotate()
+                offset = 0
+                payload = self._encode(record, self.compress)
+            self.writer.write(payload)
+            self.writer.flush()
+            if self.fsync:
+                os.fsync(self.writer.fileno())
+            self._index(self.segment, offset, len(payload), record)
+            self.appended += 1
+            self.unindexed += 1
+            if self.unindexed >= self.index_interval:
+                self._commit_index()
+            return self.segment, offset
+
+    def _rotate(self):
+        self._commit_index()
+        self.writer.close()
+        self.segment += 1
+        self.writer = open(self._segment_path(self.segment), 'ab')
+        logger.info(f"轮换到新的段文件 {self.writer.name}")
+
+    def _commit_index(self):
+        self._set_position(self.segment, self.writer.tell())
+        self.conn.commit()
+        self.unindexed = 0
+
+    def _read(self, segment: int, offset: int, length: int) -> Dict:
+        reader = self.readers.get(segment)
+        if reader is None:
+            reader = open(self._segment_path(segment), 'rb')
+            self.readers[segment] = reader
+        reader.seek(offset)
+        return self._decode(reader.read(length), reader.name.endswith('.gz'))
+
+    def get(self, kind: str, entity_id: str) -> Optional[Dict]:
+        """
+        获取对象的最新快照数据
+        """
+        record = self.get_record(kind, entity_id)
+        return record['data'] if record else None
+
+    def get_record(self, kind: str, entity_id: str) -> Optional[Dict]:
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT segment, offset, length FROM latest WHERE kind = ? AND entity_id = ?",
+                (kind, str(entity_id))
+            ).fetchone()
+            if row is None:
+                return None
+            return self._read(*row)
+
+    def ids(self, kind: str) -> List[str]:
+        with self.lock:
+            return [row[0] for row in self.conn.execute(
+                "SELECT entity_id FROM latest WHERE kind = ? ORDER BY entity_id", (kind,)
+            )]
+
+    def scan(self, kind: Optional[str] = None) -> Iterator[Dict]:
+        """
+        按写入顺序扫描全部历史记录
+        """
+        with self.lock:
+            self.writer.flush()
+        for segment in self.segments():
+            for _, _, record in self._iter_segment(segment):
+                if kind is None or record['kind'] == kind:
+                    yield record
+
+    def history(self, kind: str, entity_id: str) -> Iterator[Dict]:
+        """
+        按时间顺序产出对象的全部快照记录
+        """
+        entity_id = str(entity_id)
+        for record in self.scan(kind):
+            if record['id'] == entity_id:
+                yield record
+
+    def rebuild_index(self) -> int:
+        """
+        丢弃偏移索引并从全部段文件重建
+        :return: 索引的对象数量
+        """
+        with self.lock:
+            self.writer.flush()
+            self.conn.execute("DELETE FROM latest")
+            self.conn.execute("DELETE FROM meta")
+            self.conn.commit()
+            self._recover()
+            return self.conn.execute("SELECT COUNT(*) FROM latest").fetchone()[0]
+
+    def stats(self) -> Dict:
+        with self.lock:
+            self.writer.flush()
+            rows = self.conn.execute("SELECT kind, COUNT(*) FROM latest GROUP BY kind").fetchall()
+            segments = self.segments()
+            return {
+                'entities': dict(rows),
+                'segments': len(segments),
+                'bytes': sum(os.path.getsize(self._segment_path(segment)) for segment in segments),
+                'appended': self.appended
+            }
+
+    def flush(self):
+        with self.lock:
+            self.writer.flush()
+            os.fsync(self.writer.fileno())
+            self._commit_index()
+
+    def close(self):
+        self.flush()
+        with self.lock:
+            self.writer.close()
+            for reader in self.readers.values():
+                reader.close()
+            self.readers.clear()
+            self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='分段日志存储查看工具')
+    parser.add_argument('log_dir', help='日志目录')
+    parser.add_argument('--get', nargs=2, metavar=('KIND', 'ID'), help='查看对象的最新快照')
+    parser.add_argument('--history', nargs=2, metavar=('KIND', 'ID'), help='查看对象的全部历史快照')
+    parser.add_argument('--rebuild', action='store_true', help='从段文件重建偏移索引')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    with SegmentLog(args.log_dir) as log:
+        if args.rebuild:
+            logger.info(f"索引重建完成，共 {log.rebuild_index()} 个对象")
+        if args.get:
+            print(json.dumps(log.get(*args.get), ensure_ascii=False, indent=2))
+        if args.history:
+            for record in log.history(*args.history):
+                print(json.dumps(record, ensure_ascii=False))
+        print(json.dumps(log.stats(), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
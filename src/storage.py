@@ -1,245 +1,760 @@
-import mysql.connector
-import pymongo
-import logging
-from abc import ABC, abstractmethod
-from typing import Dict, Any
-
-# 配置日志记录
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger(__name__)
-
-class StorageBase(ABC):
-    @abstractmethod
-    def connect(self):
-        pass
-
-    @abstractmethod
-    def create_tables(self):
-        pass
-
-    @abstractmethod
-    def store_data(self, data: Dict[str, Any]):
-        pass
-
-    @abstractmethod
-    def retrieve_data(self, query: str) -> Any:
-        pass
-
-class MySQLStorage(StorageBase):
-    def __init__(self, config: Dict[str, Any]):
-        self.config = config
-        self.connection = None
-        self._validate_config()
-
-    def _validate_config(self):
-        required_fields = ['host', 'user', 'password', 'database']
-        if not all(field in self.config for field in required_fields):
-            raise ValueError("MySQL配置缺少必填字段")
-
-    def connect(self):
-        try:
-            self.connection = mysql.connector.connect(
-                host=self.config['host'],
-                user=self.config['user'],
-                password=self.config['password'],
-                database=self.config['database']
-            )
-            logger.info("成功连接到MySQL数据库")
-        except mysql.connector.Error as err:
-            logger.error(f"连接到MySQL数据库失败：{err}")
-            raise
-
-    def create_tables(self):
-        cursor = self.connection.cursor()
-        try:
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS videos (
-                    id VARCHAR(255) PRIMARY KEY,
-                    title VARCHAR(255),
-                    author VARCHAR(255),
-                    view_count INT,
-                    like_count INT,
-                    comment_count INT,
-                    created_at DATETIME
-                )
-            """)
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS accounts (
-                    id VARCHAR(255) PRIMARY KEY,
-                    username VARCHAR(255),
-                    follower_count INT,
-                    following_count INT,
-                    video_count INT,
-                    description TEXT,
-                    created_at DATETIME
-                )
-            """)
-            self.connection.commit()
-            logger.info("MySQL表结构创建成功")
-        except Exception as e:
-            self.connection.rollback()
-            logger.error(f"MySQL表结构创建失败：{e}")
-            raise
-        finally:
-            cursor.close()
-
-    def store_data(self, data: Dict[str, Any]):
-        cursor = self.connection.cursor()
-        try:
-            cursor.execute("""
-                INSERT INTO videos (id, title, author, view_count, like_count, comment_count, created_at)
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
-            """, (data['id'], data['title'], data['author'],
-                  data['view_count'], data['like_count'],
-                  data['comment_count'], data['created_at']))
-            cursor.execute("""
-                INSERT INTO accounts (id, username, follower_count, following_count, video_count, description, created_at)
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
-            """, (data['id'], data['username'],
-                  data['follower_count'], data['following_count'],
-                  data['video_count'], data['description'],
-                  data['created_at']))
-            self.connection.commit()
-            logger.info("数据存储到MySQL成功")
-        except Exception as e:
-            self.connection.rollback()
-            logger.error(f"存储数据到MySQL失败：{e}")
-            raise
-        finally:
-            cursor.close()
-
-    def retrieve_data(self, query: str):
-        cursor = self.connection.cursor()
-        try:
-            cursor.execute(query)
-            result = cursor.fetchall()
-            return result
-        except Exception as e:
-            logger.error(f"从MySQL查询数据失败：{e}")
-            raise
-        finally:
-            cursor.close()
-
-class MongoDBStorage(StorageBase):
-    def __init__(self, config: Dict[str, Any]):
-        self.config = config
-        self.client = None
-        self.db = None
-        self._validate_config()
-
-    def _validate_config(self):
-        required_fields = ['connection_string', 'database']
-        if not all(field in self.config for field in required_fields):
-            raise ValueError("MongoDB配置缺少必填字段")
-
-    def connect(self):
-        try:
-            self.client = pymongo.MongoClient(self.config['connection_string'])
-            self.db = self.client[self.config['database']]
-            logger.info("成功连接到MongoDB数据库")
-        except Exception as e:
-            logger.error(f"连接到MongoDB数据库失败：{e}")
-            raise
-
-    def create_tables(self):
-        try:
-            self.db.videos.create_index('id', unique=True)
-            self.db.accounts.create_index('id', unique=True)
-            logger.info("MongoDB索引创建成功")
-        except Exception as e:
-            logger.error(f"MongoDB索引创建失败：{e}")
-            raise
-
-    def store_data(self, data: Dict[str, Any]):
-        try:
-            self.db.videos.insert_one({
-                'id': data['id'],
-                'title': data['title'],
-                'author': data['author'],
-                'view_count': data['view_count'],
-                'like_count': data['like_count'],
-                'comment_count': data['comment_count'],
-                'created_at': data['created_at']
-            })
-            self.db.accounts.insert_one({
-                'id': data['id'],
-                'username': data['username'],
-                'follower_count': data['follower_count'],
-                'following_count': data['following_count'],
-                'video_count': data['video_count'],
-                'description': data['description'],
-                'created_at': data['created_at']
-            })
-            logger.info("数据存储到MongoDB成功")
-        except Exception as e:
-            logger.error(f"存储数据到MongoDB失败：{e}")
-            raise
-
-    def retrieve_data(self, query: Dict[str, Any]):
-        try:
-            videos = self.db.videos.find(query)
-            accounts = self.db.accounts.find(query)
-            return {'videos': list(videos), 'accounts': list(accounts)}
-        except Exception as e:
-            logger.error(f"从MongoDB查询数据失败：{e}")
-            raise
-
-class StorageFactory:
-    @staticmethod
-    def create_storage(storage_type: str, config: Dict[str, Any]):
-        if storage_type == 'mysql':
-            return MySQLStorage(config)
-        elif storage_type == 'mongodb':
-            return MongoDBStorage(config)
-        else:
-            raise ValueError("不支持的存储类型")
-
-if __name__ == "__main__":
-    mysql_config = {
-        'host': 'localhost',
-        'user': 'root',
-        'password': 'password',
-        'database': 'douyin_analysis'
-    }
-
-    mongodb_config = {
-        'connection_string': 'mongodb://localhost:27017/',
-        'database': 'douyin_analysis'
-    }
-
-    mysql_storage = StorageFactory.create_storage('mysql', mysql_config)
-    mysql_storage.connect()
-    mysql_storage.create_tables()
-
-    mongodb_storage = StorageFactory.create_storage('mongodb', mongodb_config)
-    mongodb_storage.connect()
-    mongodb_storage.create_tables()
-
-    data = {
-        'id': '12345',
-        'title': '示例视频标题',
-        'author': '示例作者',
-        'view_count': 10000,
-        'like_count': 2000,
-        'comment_count': 500,
-        'created_at': '2025-02-17 08:00:00',
-        'username': '示例用户名',
-        'follower_count': 100000,
-        'following_count': 500,
-        'video_count': 50,
-        'description': '示例描述',
-    }
-
-    mysql_storage.store_data(data)
-    mongodb_storage.store_data(data)
-
-    query = "SELECT * FROM videos WHERE view_count > 10000"
-    mysql_result = mysql_storage.retrieve_data(query)
-    print("MySQL查询结果：", mysql_result)
-
-    mongodb_query = {'view_count': {'$gt': 10000}}
-    mongodb_result = mongodb_storage.retrieve_data(mongodb_query)
-    print("MongoDB查询结果：", mongodb_result)
+import mysql.connector
+import pymongo
+import logging
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from datetime import date, datetime, timedelta
+from itertools import islice
+from typing import Dict, Any, Iterator, List, Optional, Sequence
+
+# 配置日志记录
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# 时序快照表：原始快照以 (对象ID, 抓取时间) 为主键、按天分区，压缩后的汇总表以 (对象ID, 时间桶) 为主键
+SNAPSHOT_TABLES = {
+    'video': {'table': 'video_snapshots', 'key': 'video_id',
+              'metrics': ['view_count', 'like_count', 'comment_count']},
+    'account': {'table': 'account_snapshots', 'key': 'account_id',
+                'metrics': ['follower_count', 'following_count', 'video_count']},
+}
+
+# 汇总级别及其时间桶表达式
+ROLLUP_LEVELS = {
+    'hourly': "TIMESTAMP(DATE({column}), MAKETIME(HOUR({column}), 0, 0))",
+    'daily': "TIMESTAMP(DATE({column}))",
+}
+
+def _to_days(day: date) -> int:
+    # 与MySQL的TO_DAYS()一致
+    return day.toordinal() + 365
+
+def _to_chunk(rows: List[Any], columns: Optional[Sequence[str]], as_dataframe: bool):
+    if as_dataframe:
+        import pandas as pd
+        if columns is None:
+            return pd.DataFrame(rows)
+        return pd.DataFrame.from_records(rows, columns=columns)
+    return rows
+
+def clean_data(data, columns: Sequence[str]):
+    """
+    清洗数据：去除完全重复的行，计数列转换为非负整数，无法解析或缺失的值记为0
+    分块处理时每块单独调用，重复行只在块内去除
+    :param data: pandas DataFrame
+    :param columns: 计数列，文件中不存在的列忽略
+    """
+    import pandas as pd
+    data = data.drop_duplicates()
+    converted = {}
+    for column in columns:
+        if column not in data.columns:
+            continue
+        values = data[column]
+        if not pd.api.types.is_numeric_dtype(values):
+            # 带千位分隔符的数字，如 "1,234"
+            values = values.str.replace(',', '', regex=False)
+        converted[column] = pd.to_numeric(values, errors='coerce').fillna(0).clip(lower=0).astype('int64')
+    return data.assign(**converted)
+
+class StorageBase(ABC):
+    @abstractmethod
+    def connect(self):
+        pass
+
+    @abstractmethod
+    def create_tables(self):
+        pass
+
+    @abstractmethod
+    def store_data(self, data: Dict[str, Any]):
+        pass
+
+    @abstractmethod
+    def retrieve_data(self, query: str) -> Any:
+        pass
+
+class MySQLStorage(StorageBase):
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.connection = None
+        # 流式查询使用的连接池，第一次流式查询时创建
+        self.stream_pool = None
+        self.lock = threading.Lock()
+        self._validate_config()
+
+    def _validate_config(self):
+        required_fields = ['host', 'user', 'password', 'database']
+        if not all(field in self.config for field in required_fields):
+            raise ValueError("MySQL配置缺少必填字段")
+
+    def connect(self):
+        try:
+            self.connection = mysql.connector.connect(
+                host=self.config['host'],
+                user=self.config['user'],
+                password=self.config['password'],
+                database=self.config['database']
+            )
+            logger.info("成功连接到MySQL数据库")
+        except mysql.connector.Error as err:
+            logger.error(f"连接到MySQL数据库失败：{err}")
+            raise
+
+    def create_tables(self):
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS videos (
+                    id VARCHAR(255) PRIMARY KEY,
+                    title VARCHAR(255),
+                    author VARCHAR(255),
+                    view_count INT,
+                    like_count INT,
+                    comment_count INT,
+                    created_at DATETIME
+                )
+            """)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS accounts (
+                    id VARCHAR(255) PRIMARY KEY,
+                    username VARCHAR(255),
+                    follower_count INT,
+                    following_count INT,
+                    video_count INT,
+                    description TEXT,
+                    created_at DATETIME
+                )
+            """)
+            self._create_snapshot_tables(cursor)
+            self.connection.commit()
+            logger.info("MySQL表结构创建成功")
+        except Exception as e:
+            self.connection.rollback()
+            logger.error(f"MySQL表结构创建失败：{e}")
+            raise
+        finally:
+            cursor.close()
+        self.ensure_partitions()
+
+    def _create_snapshot_tables(self, cursor):
+        """
+        videos/accounts只保存每个对象的最新状态，每次抓取的指标另外写入时序快照表：
+        原始快照按抓取日期分区，主键 (对象ID, 抓取时间) 同时用于按对象查询时间范围；
+        压缩后的小时、天汇总表保存每个时间桶内各指标的最小值、最大值和最后一次的值
+        """
+        for spec in SNAPSHOT_TABLES.values():
+            key, table = spec['key'], spec['table']
+            metrics = ''.join(f"{metric} BIGINT,\n" for metric in spec['metrics'])
+            # 建表时只有历史分区和兜底分区，按天的分区由ensure_partitions()提前创建
+            cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS {table} (
+                    {key} VARCHAR(255) NOT NULL,
+                    captured_at DATETIME NOT NULL,
+                    {metrics}
+                    PRIMARY KEY ({key}, captured_at),
+                    KEY idx_captured_at (captured_at)
+                )
+                PARTITION BY RANGE (TO_DAYS(captured_at)) (
+                    PARTITION p_history VALUES LESS THAN ({_to_days(date.today())}),
+                    PARTITION p_future VALUES LESS THAN MAXVALUE
+                )
+            """)
+            rollup_metrics = ''.join(f"{metric}_min BIGINT,\n{metric}_max BIGINT,\n{metric}_last BIGINT,\n"
+                                     for metric in spec['metrics'])
+            for level in ROLLUP_LEVELS:
+                cursor.execute(f"""
+                    CREATE TABLE IF NOT EXISTS {table}_{level} (
+                        {key} VARCHAR(255) NOT NULL,
+                        bucket DATETIME NOT NULL,
+                        samples INT NOT NULL,
+                        last_at DATETIME NOT NULL,
+                        {rollup_metrics}
+                        PRIMARY KEY ({key}, bucket),
+                        KEY idx_bucket (bucket)
+                    )
+                """)
+
+    def _partitions(self, cursor, table: str) -> List[tuple]:
+        """
+        按顺序返回表的分区 (名称, TO_DAYS上界)，兜底分区的上界为None
+        """
+        cursor.execute("""
+            SELECT PARTITION_NAME, PARTITION_DESCRIPTION FROM information_schema.PARTITIONS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+            ORDER BY PARTITION_ORDINAL_POSITION
+        """, (table,))
+        return [(name, None if bound == 'MAXVALUE' else int(bound)) for name, bound in cursor.fetchall()]
+
+    def ensure_partitions(self, days_ahead: int = 7):
+        """
+        把兜底分区拆分为按天的分区，一直创建到days_ahead天之后；
+        兜底分区中已有的数据在拆分时移动到对应的日期分区
+        """
+        last_day = date.today() + timedelta(days=days_ahead)
+        cursor = self.connection.cursor()
+        try:
+            for spec in SNAPSHOT_TABLES.values():
+                table = spec['table']
+                bounds = [bound for _, bound in self._partitions(cursor, table) if bound is not None]
+                day = date.fromordinal(max(bounds) - 365) if bounds else date.today()
+                partitions = []
+                while day <= last_day:
+                    partitions.append(f"PARTITION p{day:%Y%m%d} VALUES LESS THAN ({_to_days(day + timedelta(days=1))})")
+                    day += timedelta(days=1)
+                if not partitions:
+                    continue
+                partitions.append("PARTITION p_future VALUES LESS THAN MAXVALUE")
+                cursor.execute(f"ALTER TABLE {table} REORGANIZE PARTITION p_future INTO ({', '.join(partitions)})")
+                logger.info(f"{table} 新增 {len(partitions) - 1} 个日期分区")
+        finally:
+            cursor.close()
+
+    def store_data(self, data: Dict[str, Any]):
+        self.store_many([data])
+
+    def store_many(self, records: List[Dict[str, Any]]):
+        """
+        在一个事务中用executemany批量写入
+        """
+        captured_at = datetime.now().replace(microsecond=0)
+        cursor = self.connection.cursor()
+        try:
+            # 最新状态表：同一id重复抓取时更新已有记录
+            cursor.executemany("""
+                INSERT INTO videos (id, title, author, view_count, like_count, comment_count, created_at)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                    title = VALUES(title),
+                    author = VALUES(author),
+                    view_count = VALUES(view_count),
+                    like_count = VALUES(like_count),
+                    comment_count = VALUES(comment_count),
+                    created_at = VALUES(created_at)
+            """, [(data['id'], data['title'], data['author'],
+                   data['view_count'], data['like_count'],
+                   data['comment_count'], data['created_at']) for data in records])
+            cursor.executemany("""
+                INSERT INTO accounts (id, username, follower_count, following_count, video_count, description, created_at)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                    username = VALUES(username),
+                    follower_count = VALUES(follower_count),
+                    following_count = VALUES(following_count),
+                    video_count = VALUES(video_count),
+                    description = VALUES(description),
+                    created_at = VALUES(created_at)
+            """, [(data['id'], data['username'],
+                   data['follower_count'], data['following_count'],
+                   data['video_count'], data['description'],
+                   data['created_at']) for data in records])
+            # 时序快照：每次抓取一行，同一秒内重复写入时保留最后一次的值
+            for spec in SNAPSHOT_TABLES.values():
+                metrics = spec['metrics']
+                cursor.executemany(f"""
+                    INSERT INTO {spec['table']} ({spec['key']}, captured_at, {', '.join(metrics)})
+                    VALUES (%s, %s, {', '.join(['%s'] * len(metrics))})
+                    ON DUPLICATE KEY UPDATE {', '.join(f'{metric} = VALUES({metric})' for metric in metrics)}
+                """, [(data['id'], data.get('captured_at', captured_at), *(data[metric] for metric in metrics))
+                      for data in records])
+            self.connection.commit()
+            logger.info(f"数据存储到MySQL成功，共 {len(records)} 条")
+        except Exception as e:
+            self.connection.rollback()
+            logger.error(f"存储数据到MySQL失败：{e}")
+            raise
+        finally:
+            cursor.close()
+
+    def retrieve_data(self, query: str):
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(query)
+            result = cursor.fetchall()
+            return result
+        except Exception as e:
+            logger.error(f"从MySQL查询数据失败：{e}")
+            raise
+        finally:
+            cursor.close()
+
+    def retrieve_snapshots(self, kind: str, entity_id: str, start, end, resolution: str = 'auto') -> List[tuple]:
+        """
+        查询一个对象在 [start, end] 时间范围内的指标，按主键 (对象ID, 时间) 范围扫描，原始快照表只扫描范围内的日期分区
+        :param kind: video 或 account
+        :param resolution: raw/hourly/daily 只查询对应的表，返回该表的列；
+                           auto 合并三张表，返回 (时间, 各指标)，汇总数据取时间桶内最后一次的值、时间为时间桶起点
+        """
+        spec = SNAPSHOT_TABLES[kind]
+        key, table, metrics = spec['key'], spec['table'], spec['metrics']
+        if resolution == 'raw':
+            query = (f"SELECT captured_at, {', '.join(metrics)} FROM {table} "
+                     f"WHERE {key} = %s AND captured_at BETWEEN %s AND %s ORDER BY captured_at")
+            params = (entity_id, start, end)
+        elif resolution in ROLLUP_LEVELS:
+            columns = ', '.join(f"{metric}_min, {metric}_max, {metric}_last" for metric in metrics)
+            query = (f"SELECT bucket, samples, {columns} FROM {table}_{resolution} "
+                     f"WHERE {key} = %s AND bucket BETWEEN %s AND %s ORDER BY bucket")
+            params = (entity_id, start, end)
+        elif resolution == 'auto':
+            # 压缩后原始数据被删除，三张表的时间范围互不重叠
+            last_values = ', '.join(f"{metric}_last" for metric in metrics)
+            query = " UNION ALL ".join(
+                [f"SELECT bucket, {last_values} FROM {table}_{level} WHERE {key} = %s AND bucket BETWEEN %s AND %s"
+                 for level in ('daily', 'hourly')] +
+                [f"SELECT captured_at, {', '.join(metrics)} FROM {table} "
+                 f"WHERE {key} = %s AND captured_at BETWEEN %s AND %s"]
+            ) + " ORDER BY 1"
+            params = (entity_id, start, end) * 3
+        else:
+            raise ValueError(f"不支持的时间粒度：{resolution}")
+
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(query, params)
+            return cursor.fetchall()
+        except Exception as e:
+            logger.error(f"从MySQL查询时序快照失败：{e}")
+            raise
+        finally:
+            cursor.close()
+
+    def _rollup(self, cursor, spec: Dict[str, Any], level: str, cutoff: datetime) -> int:
+        """
+        把时间早于cutoff的数据汇总到level表：hourly从原始快照汇总，daily从hourly表汇总
+        cutoff是整点（天），汇总的时间桶都是完整的；重复执行时用重新计算的结果覆盖，中断后可以安全重跑
+        """
+        key, table, metrics = spec['key'], spec['table'], spec['metrics']
+        raw = level == 'hourly'
+        source = table if raw else f"{table}_hourly"
+        time_column = 'captured_at' if raw else 'bucket'
+        at_column = 'captured_at' if raw else 'last_at'
+        bucket = ROLLUP_LEVELS[level].format(column=time_column)
+
+        inner = [key, f"{bucket} AS bucket", f"{'1' if raw else 'samples'} AS samples", f"{at_column} AS sampled_at"]
+        outer = [key, 'bucket', 'SUM(samples)', 'MAX(sampled_at)']
+        columns = [key, 'bucket', 'samples', 'last_at']
+        for metric in metrics:
+            low, high, last = (metric, metric, metric) if raw else (f"{metric}_min", f"{metric}_max", f"{metric}_last")
+            inner += [f"{low} AS {metric}_min", f"{high} AS {metric}_max",
+                      f"FIRST_VALUE({last}) OVER w AS {metric}_last"]
+            # 同一时间桶内的最后一次值都相同，MAX只是取出这个值
+            outer += [f"MIN({metric}_min)", f"MAX({metric}_max)", f"MAX({metric}_last)"]
+            columns += [f"{metric}_min", f"{metric}_max", f"{metric}_last"]
+
+        cursor.execute(f"""
+            INSERT INTO {table}_{level} ({', '.join(columns)})
+            SELECT {', '.join(outer)} FROM (
+                SELECT {', '.join(inner)} FROM {source}
+                WHERE {time_column} < %s
+                WINDOW w AS (PARTITION BY {key}, {bucket} ORDER BY {at_column} DESC)
+            ) AS t
+            GROUP BY {key}, bucket
+            ON DUPLICATE KEY UPDATE {', '.join(f'{column} = VALUES({column})' for column in columns[2:])}
+        """, (cutoff,))
+        return cursor.rowcount
+
+    def compact_snapshots(self, raw_days: int = 7, hourly_days: int = 90) -> Dict[str, Dict[str, int]]:
+        """
+        压缩时序快照：早于raw_days天的原始快照汇总为小时数据，早于hourly_days天的小时数据汇总为天数据，
+        汇总后删除原始数据；完全过期的原始快照分区直接DROP PARTITION，不逐行删除
+        :return: 每种对象汇总和删除的行数
+        """
+        if hourly_days < raw_days:
+            raise ValueError("hourly_days不能小于raw_days")
+        today = datetime.combine(date.today(), datetime.min.time())
+        raw_cutoff = today - timedelta(days=raw_days)
+        hourly_cutoff = today - timedelta(days=hourly_days)
+        result = {}
+        cursor = self.connection.cursor()
+        try:
+            for kind, spec in SNAPSHOT_TABLES.items():
+                table = spec['table']
+                counts = {'hourly_rows': self._rollup(cursor, spec, 'hourly', raw_cutoff)}
+                self.connection.commit()
+
+                # DDL会隐式提交，因此在汇总提交之后执行；中途失败时重跑会重新汇总尚未删除的数据
+                expired = [name for name, bound in self._partitions(cursor, table)
+                           if bound is not None and bound <= _to_days(raw_cutoff.date())]
+                if expired:
+                    cursor.execute(f"ALTER TABLE {table} DROP PARTITION {', '.join(expired)}")
+                cursor.execute(f"DELETE FROM {table} WHERE captured_at < %s", (raw_cutoff,))
+                counts['dropped_partitions'] = len(expired)
+                counts['raw_deleted'] = cursor.rowcount
+
+                counts['daily_rows'] = self._rollup(cursor, spec, 'daily', hourly_cutoff)
+                cursor.execute(f"DELETE FROM {table}_hourly WHERE bucket < %s", (hourly_cutoff,))
+                counts['hourly_deleted'] = cursor.rowcount
+                self.connection.commit()
+                result[kind] = counts
+                logger.info(f"{table} 压缩完成：{counts}")
+        except Exception as e:
+            self.connection.rollback()
+            logger.error(f"压缩MySQL时序快照失败：{e}")
+            raise
+        finally:
+            cursor.close()
+        return result
+
+    def close(self):
+        if self.connection:
+            self.connection.close()
+            self.connection = None
+        with self.lock:
+            if self.stream_pool is not None:
+                self.stream_pool.close()
+                self.stream_pool = None
+
+    def iter_data(self, query: str, params: Optional[Sequence[Any]] = None, chunk_size: int = 1000,
+                  as_dataframe: bool = False) -> Iterator[Any]:
+        """
+        流式查询：使用无缓冲游标，按chunk_size行一块产出结果，内存占用与结果集大小无关
+        无缓冲游标读完之前连接不能执行其他语句，因此查询从单独的连接池借用连接；
+        连接池大小由配置项stream_pool_size决定（默认4），同时进行的流式查询超过时等待，最多等待pool_timeout秒
+        :param as_dataframe: 是否以pandas DataFrame产出每一块
+        """
+        with self._stream_pool().connection() as connection:
+            cursor = connection.cursor(buffered=False)
+            try:
+                cursor.execute(query, params)
+                while True:
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    yield _to_chunk(rows, cursor.column_names, as_dataframe)
+            except Exception as e:
+                logger.error(f"从MySQL流式查询数据失败：{e}")
+                raise
+            finally:
+                # 提前结束迭代时丢弃未读取的结果，连接才能归还连接池
+                try:
+                    connection.consume_results()
+                except mysql.connector.Error:
+                    pass
+                cursor.close()
+
+    def _stream_pool(self):
+        with self.lock:
+            if self.stream_pool is None:
+                from db_pool import MySQLPool
+                self.stream_pool = MySQLPool(
+                    self.config,
+                    pool_size=self.config.get('stream_pool_size', 4),
+                    checkout_timeout=self.config.get('pool_timeout', 10.0),
+                    pool_name='douyin_stream'
+                )
+            return self.stream_pool
+
+class MongoDBStorage(StorageBase):
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.client = None
+        self.db = None
+        self._validate_config()
+
+    def _validate_config(self):
+        required_fields = ['connection_string', 'database']
+        if not all(field in self.config for field in required_fields):
+            raise ValueError("MongoDB配置缺少必填字段")
+
+    def connect(self):
+        try:
+            self.client = pymongo.MongoClient(self.config['connection_string'])
+            self.db = self.client[self.config['database']]
+            logger.info("成功连接到MongoDB数据库")
+        except Exception as e:
+            logger.error(f"连接到MongoDB数据库失败：{e}")
+            raise
+
+    def create_tables(self):
+        try:
+            self.db.videos.create_index('id', unique=True)
+            self.db.accounts.create_index('id', unique=True)
+            logger.info("MongoDB索引创建成功")
+        except Exception as e:
+            logger.error(f"MongoDB索引创建失败：{e}")
+            raise
+
+    def store_data(self, data: Dict[str, Any]):
+        self.store_many([data])
+
+    def store_many(self, records: List[Dict[str, Any]]):
+        """
+        按id批量upsert，每个集合一次无序bulk_write，重复存储同一条记录不会产生重复文档
+        """
+        videos = {}
+        accounts = {}
+        for data in records:
+            # 同一批中id相同的记录以最后一条为准
+            videos[data['id']] = {
+                'id': data['id'],
+                'title': data['title'],
+                'author': data['author'],
+                'view_count': data['view_count'],
+                'like_count': data['like_count'],
+                'comment_count': data['comment_count'],
+                'created_at': data['created_at']
+            }
+            accounts[data['id']] = {
+                'id': data['id'],
+                'username': data['username'],
+                'follower_count': data['follower_count'],
+                'following_count': data['following_count'],
+                'video_count': data['video_count'],
+                'description': data['description'],
+                'created_at': data['created_at']
+            }
+        try:
+            for collection, documents in (('videos', videos), ('accounts', accounts)):
+                if documents:
+                    self.db[collection].bulk_write([
+                        pymongo.UpdateOne({'id': doc_id}, {'$set': document}, upsert=True)
+                        for doc_id, document in documents.items()
+                    ], ordered=False)
+            logger.info(f"数据存储到MongoDB成功，共 {len(videos)} 条")
+        except Exception as e:
+            logger.error(f"存储数据到MongoDB失败：{e}")
+            raise
+
+    def retrieve_data(self, query: Dict[str, Any]):
+        try:
+            videos = self.db.videos.find(query)
+            accounts = self.db.accounts.find(query)
+            return {'videos': list(videos), 'accounts': list(accounts)}
+        except Exception as e:
+            logger.error(f"从MongoDB查询数据失败：{e}")
+            raise
+
+    def iter_data(self, query: Dict[str, Any], collection: str = 'videos', projection: Optional[Dict] = None,
+                  chunk_size: int = 1000, as_dataframe: bool = False) -> Iterator[Any]:
+        """
+        流式查询单个集合：游标每次从服务器取chunk_size条，按块产出结果
+        :param as_dataframe: 是否以pandas DataFrame产出每一块
+        """
+        cursor = self.db[collection].find(query, projection, batch_size=chunk_size)
+        try:
+            while True:
+                documents = list(islice(cursor, chunk_size))
+                if not documents:
+                    break
+                yield _to_chunk(documents, None, as_dataframe)
+        except Exception as e:
+            logger.error(f"从MongoDB流式查询数据失败：{e}")
+            raise
+        finally:
+            cursor.close()
+
+class SQLiteStorage(StorageBase):
+    def __init__(self, config: Dict[str, Any]):
+        """
+        嵌入式SQLite存储，无需数据库服务，适合单机部署和测试
+        配置项：database（数据库文件路径），batch_size（每个事务写入的记录数，默认500），
+        synchronous（同步级别，默认NORMAL，WAL模式下断电最多丢失最后提交的事务）
+        多个线程共享同一个连接，每次使用连接时持有self.lock
+        """
+        self.config = config
+        self.connection = None
+        self.lock = threading.Lock()
+        self.batch_size = config.get('batch_size', 500)
+        self._validate_config()
+
+    def _validate_config(self):
+        if 'database' not in self.config:
+            raise ValueError("SQLite配置缺少必填字段")
+
+    def connect(self):
+        try:
+            self.connection = sqlite3.connect(self.config['database'], check_same_thread=False,
+                                              cached_statements=256)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute(f"PRAGMA synchronous={self.config.get('synchronous', 'NORMAL')}")
+            self.connection.execute("PRAGMA temp_store=MEMORY")
+            logger.info("成功连接到SQLite数据库")
+        except sqlite3.Error as err:
+            logger.error(f"连接到SQLite数据库失败：{err}")
+            raise
+
+    def create_tables(self):
+        try:
+            with self.lock, self.connection:
+                self.connection.execute("""
+                    CREATE TABLE IF NOT EXISTS videos (
+                        id TEXT PRIMARY KEY,
+                        title TEXT,
+                        author TEXT,
+                        view_count INTEGER,
+                        like_count INTEGER,
+                        comment_count INTEGER,
+                        created_at TEXT
+                    )
+                """)
+                self.connection.execute("""
+                    CREATE TABLE IF NOT EXISTS accounts (
+                        id TEXT PRIMARY KEY,
+                        username TEXT,
+                        follower_count INTEGER,
+                        following_count INTEGER,
+                        video_count INTEGER,
+                        description TEXT,
+                        created_at TEXT
+                    )
+                """)
+                self.connection.execute("CREATE INDEX IF NOT EXISTS idx_videos_author ON videos (author)")
+                self.connection.execute("CREATE INDEX IF NOT EXISTS idx_videos_view_count ON videos (view_count)")
+                self.connection.execute("CREATE INDEX IF NOT EXISTS idx_videos_created_at ON videos (created_at)")
+                self.connection.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_accounts_follower_count ON accounts (follower_count)"
+                )
+            logger.info("SQLite表结构创建成功")
+        except Exception as e:
+            logger.error(f"SQLite表结构创建失败：{e}")
+            raise
+
+    def store_data(self, data: Dict[str, Any]):
+        self.store_many([data])
+
+    def store_many(self, records: List[Dict[str, Any]]):
+        """
+        按batch_size分批写入，每批一个事务；同一id重复写入时更新已有记录
+        """
+        try:
+            for start in range(0, len(records), self.batch_size):
+                batch = records[start:start + self.batch_size]
+                # 同一条SQL文本复用sqlite3缓存的预编译语句
+                with self.lock, self.connection:
+                    self.connection.executemany("""
+                        INSERT INTO videos (id, title, author, view_count, like_count, comment_count, created_at)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)
+                        ON CONFLICT(id) DO UPDATE SET
+                            title = excluded.title,
+                            author = excluded.author,
+                            view_count = excluded.view_count,
+                            like_count = excluded.like_count,
+                            comment_count = excluded.comment_count,
+                            created_at = excluded.created_at
+                    """, [(data['id'], data['title'], data['author'],
+                           data['view_count'], data['like_count'],
+                           data['comment_count'], data['created_at']) for data in batch])
+                    self.connection.executemany("""
+                        INSERT INTO accounts (id, username, follower_count, following_count, video_count, description, created_at)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)
+                        ON CONFLICT(id) DO UPDATE SET
+                            username = excluded.username,
+                            follower_count = excluded.follower_count,
+                            following_count = excluded.following_count,
+                            video_count = excluded.video_count,
+                            description = excluded.description,
+                            created_at = excluded.created_at
+                    """, [(data['id'], data['username'],
+                           data['follower_count'], data['following_count'],
+                           data['video_count'], data['description'],
+                           data['created_at']) for data in batch])
+            logger.info(f"数据存储到SQLite成功，共 {len(records)} 条")
+        except Exception as e:
+            logger.error(f"存储数据到SQLite失败：{e}")
+            raise
+
+    def retrieve_data(self, query: str, params: tuple = ()):
+        try:
+            with self.lock:
+                return self.connection.execute(query, params).fetchall()
+        except Exception as e:
+            logger.error(f"从SQLite查询数据失败：{e}")
+            raise
+
+    def iter_data(self, query: str, params: tuple = (), chunk_size: int = 1000,
+                  as_dataframe: bool = False) -> Iterator[Any]:
+        """
+        流式查询：SQLite逐步执行查询，按chunk_size行一块产出结果
+        只在读取每一块时持有锁，消费结果期间其他线程可以继续使用连接
+        """
+        with self.lock:
+            cursor = self.connection.execute(query, params)
+        columns = [column[0] for column in cursor.description] if cursor.description else None
+        try:
+            while True:
+                with self.lock:
+                    rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield _to_chunk(rows, columns, as_dataframe)
+        finally:
+            with self.lock:
+                cursor.close()
+
+    def close(self):
+        with self.lock:
+            if self.connection:
+                self.connection.close()
+                self.connection = None
+
+class StorageFactory:
+    @staticmethod
+    def create_storage(storage_type: str, config: Dict[str, Any]):
+        """
+        创建存储；config中有read_cache（max_mb, ttl, default_ttl）时返回带读取缓存的CachedStorage，
+        retrieve_data先查内存缓存，通过它调用store_data/store_many/compact_snapshots后相关表的查询缓存失效
+        """
+        if storage_type == 'mysql':
+            storage = MySQLStorage(config)
+        elif storage_type == 'mongodb':
+            storage = MongoDBStorage(config)
+        elif storage_type == 'sqlite':
+            storage = SQLiteStorage(config)
+        else:
+            raise ValueError("不支持的存储类型")
+        if config.get('read_cache'):
+            from read_cache import CachedStorage, create_read_cache
+            storage = CachedStorage(storage, create_read_cache(config['read_cache']))
+        return storage
+
+if __name__ == "__main__":
+    mysql_config = {
+        'host': 'localhost',
+        'user': 'root',
+        'password': 'password',
+        'database': 'douyin_analysis'
+    }
+
+    mongodb_config = {
+        'connection_string': 'mongodb://localhost:27017/',
+        'database': 'douyin_analysis'
+    }
+
+    mysql_storage = StorageFactory.create_storage('mysql', mysql_config)
+    mysql_storage.connect()
+    mysql_storage.create_tables()
+
+    mongodb_storage = StorageFactory.create_storage('mongodb', mongodb_config)
+    mongodb_storage.connect()
+    mongodb_storage.create_tables()
+
+    data = {
+        'id': '12345',
+        'title': '示例视频标题',
+        'author': '示例作者',
+        'view_count': 10000,
+        'like_count': 2000,
+        'comment_count': 500,
+        'created_at': '2025-02-17 08:00:00',
+        'username': '示例用户名',
+        'follower_count': 100000,
+        'following_count': 500,
+        'video_count': 50,
+        'description': '示例描述',
+    }
+
+    mysql_storage.store_data(data)
+    mongodb_storage.store_data(data)
+
+    query = "SELECT * FROM videos WHERE view_count > 10000"
+    mysql_result = mysql_storage.retrieve_data(query)
+    print("MySQL查询结果：", mysql_result)
+
+    mongodb_query = {'view_count': {'$gt': 10000}}
+    mongodb_result = mongodb_storage.retrieve_data(mongodb_query)
+    print("MongoDB查询结果：", mongodb_result)
@@ -0,0 +1,231 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import zlib
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class WriteBehindStorage:
+    def __init__(self, storage, queue_size: int = 1000, workers: int = 2, put_timeout: Optional[float] = None,
+                 max_retries: int = 2, retry_backoff: float = 0.5,
+                 spill_path: str = 'data/write_behind_spill.jsonl'):
+        """
+        异步写入包装：save_*只把记录放入有界队列后立即返回，由后台写入线程调用被包装的DataStorage
+        同一对象的记录总是进入同一个写入线程的队列，保证按提交顺序写入；
+        队列满时save_*阻塞等待（背压），重试后仍写入失败的记录追加到溢出文件，之后可通过replay_spill()重新写入
+        :param storage: 被包装的DataStorage
+        :param queue_size: 所有写入线程队列的总容量
+        :param put_timeout: 队列满时最多等待的秒数，超时后记录直接写入溢出文件；为None时一直等待
+        :param max_retries: 单条记录写入失败后的重试次数
+        :param spill_path: 溢出文件路径
+        """
+        self.storage = storage
+        self.put_timeout = put_timeout
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.spill_path = spill_path
+        self.spill_lock = threading.Lock()
+        self.stats_lock = threading.Lock()
+        self.closed = False
+
+        self.enqueued = 0
+        self.written = 0
+        self.failed = 0
+        self.spilled = 0
+        self.blocked_time = 0.0
+        self.max_blocked = 0.0
+
+        self.queues = [queue.Queue(maxsize=max(1, queue_size // workers)) for _ in range(workers)]
+        self.threads = [
+            threading.Thread(target=self._worker, args=(q,), name=f'write-behind-{index}', daemon=True)
+            for index, q in enumerate(self.queues)
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def __getattr__(self, name):
+        # 读取和统计等其他方法直接转发给被包装的存储
+        if name == 'storage':
+            raise AttributeError(name)
+        return getattr(self.storage, name)
+
+    def _queue_for(self, method: str, args: List) -> queue.Queue:
+        data = args[0]
+        key = method
+        if isinstance(data, dict):
+            key = str(args[1] if len(args) > 1 and args[1] else
+                      data.get('video_id') or data.get('user_id') or data.get('hashtag') or method)
+        return self.queues[zlib.crc32(key.encode('utf-8')) % len(self.queues)]
+
+    def _enqueue(self, method: str, *args) -> bool:
+        if self.closed:
+            raise RuntimeError("写入队列已关闭")
+        item = (method, list(args))
+        start = time.perf_counter()
+        try:
+            self._queue_for(method, item[1]).put(item, timeout=self.put_timeout)
+        except queue.Full:
+            self._spill(item, '写入队列已满')
+            return True
+        finally:
+            blocked = time.perf_counter() - start
+            with self.stats_lock:
+                self.blocked_time += blocked
+                self.max_blocked = max(self.max_blocked, blocked)
+        with self.stats_lock:
+            self.enqueued += 1
+        return True
+
+    def save_video_data(self, video_data: Dict, storage_id: str = None) -> bool:
+        return self._enqueue('save_video_data', video_data, storage_id)
+
+    def save_user_data(self, user_data: Dict, storage_id: str = None) -> bool:
+        return self._enqueue('save_user_data', user_data, storage_id)
+
+    def save_trending_videos(self, videos_data: List[Dict]) -> bool:
+        return self._enqueue('save_trending_videos', videos_data)
+
+    def save_hashtag_data(self, hashtag_data: Dict) -> bool:
+        return self._enqueue('save_hashtag_data', hashtag_data)
+
+    def _write(self, item):
+        method, args = item
+        error = '保存失败'
+        spill = self._spill_once(item)
+        for attempt in range(self.max_retries + 1):
+            try:
+                # 启用写入缓冲时返回True只表示记录已进入缓冲，批量写入最终放弃这条记录时由on_failed转存
+                if getattr(self.storage, method)(*args, on_failed=lambda e: spill(f'批量写入失败: {e}', True)):
+                    with self.stats_lock:
+                        self.written += 1
+                    return
+            except Exception as e:
+                error = str(e)
+            if attempt < self.max_retries:
+                time.sleep(self.retry_backoff * (2 ** attempt))
+        spill(error, False)
+
+    def _spill_once(self, item):
+        # 一条记录的快照和数据库写入可能分别失败，重试时也可能多次进入缓冲，只转存一次
+        lock = threading.Lock()
+
+        def spill(reason: str, deferred: bool):
+            if not lock.acquire(blocking=False):
+                return
+            with self.stats_lock:
+                if deferred:
+                    self.written -= 1
+                self.failed += 1
+            self._spill(item, reason)
+        return spill
+
+    def _worker(self, q: queue.Queue):
+        while True:
+            item = q.get()
+            try:
+                if item is _STOP:
+                    return
+                self._write(item)
+            finally:
+                q.task_done()
+
+    def _spill(self, item, reason: str):
+        method, args = item
+        line = json.dumps({'method': method, 'args': args, 'reason': reason, 'time': time.time()},
+                          ensure_ascii=False)
+        with self.spill_lock:
+            directory = os.path.dirname(self.spill_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.spill_path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+        with self.stats_lock:
+            self.spilled += 1
+        logger.warning(f"{method} 写入溢出文件 {self.spill_path}: {reason}")
+
+    def replay_spill(self) -> int:
+        """
+        把溢出文件中的记录重新放入写入队列，再次失败的记录写入新的溢出文件
+        :return: 重新放入队列的记录数
+        """
+        replay_path = f'{self.spill_path}.replay'
+        with self.spill_lock:
+            # 上次重放中断时留下的.replay文件与新的溢出记录一起重放
+            if os.path.exists(self.spill_path):
+                with open(self.spill_path, 'r', encoding='utf-8') as src, \
+                        open(replay_path, 'a', encoding='utf-8') as dst:
+                    dst.write(src.read())
+                os.remove(self.spill_path)
+            if not os.path.exists(replay_path):
+                return 0
+        count = 0
+        with open(replay_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                self._enqueue(entry['method'], *entry['args'])
+                count += 1
+        os.remove(replay_path)
+        logger.info(f"已重新放入写入队列 {count} 条溢出记录")
+        return count
+
+    def pending(self) -> int:
+        return sum(q.qsize() for q in self.queues)
+
+    def flush(self):
+        """
+        等待队列中已有的记录全部写入，再刷新被包装存储的缓冲
+        """
+        for q in self.queues:
+            q.join()
+        self.storage.flush()
+
+    def stats(self) -> Dict:
+        with self.stats_lock:
+            return {
+                'enqueued': self.enqueued,
+                'written': self.written,
+                'failed': self.failed,
+                'spilled': self.spilled,
+                'pending': self.pending(),
+                'blocked_seconds': self.blocked_time,
+                'max_blocked_ms': self.max_blocked * 1000
+            }
+
+    def close(self, timeout: Optional[float] = None):
+        """
+        停止接收新记录，等待队列写完后关闭被包装的存储；
+        超过timeout仍未写完的记录转存到溢出文件
+        """
+        self.closed = True
+        for q in self.queues:
+            q.put(_STOP)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in self.threads:
+            thread.join(None if deadline is None else max(deadline - time.monotonic(), 0))
+        for q in self.queues:
+            while True:
+                try:
+                    item = q.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not _STOP:
+                    self._spill(item, '关闭时未写入')
+                q.task_done()
+        self.storage.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()